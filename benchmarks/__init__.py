@@ -0,0 +1 @@
+"""Performance benchmarks for WordUp (run with ``python -m benchmarks.<name>``)."""
@@ -0,0 +1,230 @@
+"""Generate a large, realistic WordUp database for benchmarks.
+
+Usage::
+
+    python -m benchmarks.datagen OUTPUT.db [--preset small|medium|large] [--seed 42]
+    python -m benchmarks.datagen OUTPUT.db --chapters 1000 --cards 1000000 --reviews 20000000
+
+The same seed always produces the same database. Chapter sizes are skewed
+(a few large chapters, many small ones). Every card's answers are replayed
+through the Leitner rules, so its box, due date and review counters agree
+with its review history, and the share of due cards is what a learner who
+reviews regularly would see. Rows are bulk-loaded with the secondary
+indexes and triggers dropped; they and the search index are rebuilt at
+the end.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+
+from src.models import db
+from src.services.normalization import normalized_card_key
+from src.services.schema import upgrade_schema
+from src.services.search import FTS_TABLE
+from src.services.srs import SRSService
+
+PRESETS = {
+    'small': {'chapters': 20, 'cards': 10000, 'reviews': 100000},
+    'medium': {'chapters': 200, 'cards': 100000, 'reviews': 2000000},
+    'large': {'chapters': 1000, 'cards': 1000000, 'reviews': 20000000},
+}
+
+# Rows per executemany call
+LOAD_BATCH_SIZE = 50000
+
+SYLLABLES = ('ba', 'be', 'da', 'de', 'en', 'er', 'ge', 'ha', 'in', 'ka', 'la', 'le', 'ma', 'na',
+             'ne', 'ra', 're', 'sa', 'sch', 'st', 'ta', 'te', 'un', 'ver', 'zu')
+LANGUAGES = (('German', 'English'), ('French', 'English'), ('Spanish', 'German'), ('Italian', 'English'))
+
+# Chance of answering correctly by box: recall improves as cards move up
+CORRECT_BY_BOX = {1: 0.70, 2: 0.78, 3: 0.84, 4: 0.88, 5: 0.92}
+
+# Generated data ends here, so runs with the same seed are identical
+REFERENCE_NOW = datetime(2026, 1, 1)
+
+LOADED_TABLES = ('chapters', 'vocabulary_cards', 'review_history')
+
+
+def _timestamp(value: datetime) -> str:
+    # SQLAlchemy's storage format for DateTime on SQLite
+    return value.isoformat(' ', 'microseconds')
+
+
+def _word(rng: random.Random) -> str:
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def _chapter_sizes(rng: random.Random, chapters: int, cards: int):
+    weights = [rng.lognormvariate(0, 1) for _ in range(chapters)]
+    scale = cards / sum(weights)
+    sizes = [int(weight * scale) for weight in weights]
+    for index in range(cards - sum(sizes)):
+        sizes[index % chapters] += 1
+    return sizes
+
+
+def _replay_card(rng: random.Random, review_count: int):
+    """Answers of one card, oldest first, and its final state.
+
+    Returns (answers, box, lapses) where answers are (day offset, correct)
+    and the offsets count days from the first answer.
+    """
+    answers = []
+    box, lapses, day = 1, 0, 0.0
+    for _ in range(review_count):
+        correct = rng.random() < CORRECT_BY_BOX[box]
+        answers.append((day, correct))
+        if not correct and box > 1:
+            lapses += 1
+        box = min(box + 1, 5) if correct else 1
+        # Learners review a little after the card falls due
+        day += SRSService.BOX_INTERVALS[box] * rng.uniform(1.0, 1.5)
+    return answers, box, lapses
+
+
+def _rows(rng, chapters, cards, reviews):
+    """Yield ('chapter' | 'card' | 'review', row) in insertion order."""
+    mean_reviews = reviews / cards if cards else 0
+    card_id = 0
+    for chapter_id, size in enumerate(_chapter_sizes(rng, chapters, cards), start=1):
+        source_language, target_language = rng.choice(LANGUAGES)
+        chapter_created = REFERENCE_NOW - timedelta(days=rng.uniform(30, 730))
+        yield 'chapter', (chapter_id, f'{source_language} {chapter_id}', source_language,
+                          target_language, _timestamp(chapter_created))
+
+        for _ in range(size):
+            card_id += 1
+            review_count = int(rng.expovariate(1 / mean_reviews)) if mean_reviews else 0
+            answers, box, lapses = _replay_card(rng, review_count)
+            source_word, target_word = _word(rng), _word(rng)
+
+            if answers:
+                # Place the history so the last answer lies somewhere in the
+                # current interval, or a bit past it (the card is due)
+                interval = SRSService.BOX_INTERVALS[box]
+                last_answer = REFERENCE_NOW - timedelta(days=rng.uniform(0, interval * 1.3))
+                first_answer = last_answer - timedelta(days=answers[-1][0])
+                created = first_answer - timedelta(hours=rng.uniform(0, 48))
+                next_review = last_answer + timedelta(days=interval)
+                last_reviewed = _timestamp(last_answer)
+            else:
+                created = REFERENCE_NOW - timedelta(days=rng.uniform(0, 14))
+                next_review = created
+                last_reviewed = None
+
+            yield 'card', (
+                card_id, source_word, target_word,
+                f'{source_word.capitalize()} ist {_word(rng)}.' if rng.random() < 0.6 else None,
+                _word(rng) if rng.random() < 0.5 else '',
+                normalized_card_key(source_word, target_word), _timestamp(created), box,
+                _timestamp(next_review), len(answers), sum(1 for _, correct in answers if correct),
+                lapses, last_reviewed, chapter_id,
+            )
+            for day, correct in answers:
+                yield 'review', (int(correct), rng.choice(('source_to_target', 'target_to_source')),
+                                 _timestamp(first_answer + timedelta(days=day)), card_id)
+
+
+INSERTS = {
+    'chapter': 'INSERT INTO chapters (id, name, source_language, target_language, created_at) '
+               'VALUES (?, ?, ?, ?, ?)',
+    'card': 'INSERT INTO vocabulary_cards (id, source_word, target_word, example_sentence, context_hint, '
+            'normalized_key, created_at, box_level, next_review, review_count, correct_count, '
+            'lapse_count, last_reviewed_at, chapter_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+    'review': 'INSERT INTO review_history (correct, direction, reviewed_at, card_id) VALUES (?, ?, ?, ?)',
+}
+
+
+def generate_dataset(path: str, chapters: int, cards: int, reviews: int, seed: int = 42) -> dict:
+    """Create the database at ``path`` and return row counts and timing."""
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    started = time.perf_counter()
+
+    engine = create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)
+    upgrade_schema(engine)
+    engine.dispose()
+
+    connection = sqlite3.connect(path, isolation_level=None)
+    try:
+        connection.execute('PRAGMA journal_mode = OFF')
+        connection.execute('PRAGMA synchronous = OFF')
+        connection.execute('PRAGMA cache_size = -200000')
+
+        # Secondary indexes and triggers are far cheaper to build once at the end
+        deferred = connection.execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') "
+            f"AND sql IS NOT NULL AND tbl_name IN {LOADED_TABLES}"
+        ).fetchall()
+        connection.execute('BEGIN')
+        for kind, name, _ in deferred:
+            connection.execute(f'DROP {kind.upper()} {name}')
+
+        counts = {kind: 0 for kind in INSERTS}
+        batches = {kind: [] for kind in INSERTS}
+        for kind, row in _rows(random.Random(seed), chapters, cards, reviews):
+            batch = batches[kind]
+            batch.append(row)
+            if len(batch) >= LOAD_BATCH_SIZE:
+                connection.executemany(INSERTS[kind], batch)
+                counts[kind] += len(batch)
+                batch.clear()
+        for kind, batch in batches.items():
+            connection.executemany(INSERTS[kind], batch)
+            counts[kind] += len(batch)
+        loaded = time.perf_counter()
+
+        for _, _, sql in deferred:
+            connection.execute(sql)
+        connection.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        connection.execute('COMMIT')
+        connection.execute('ANALYZE')
+        connection.execute('PRAGMA journal_mode = WAL')
+    finally:
+        connection.close()
+
+    finished = time.perf_counter()
+    return {
+        'chapters': counts['chapter'], 'cards': counts['card'], 'reviews': counts['review'], 'seed': seed,
+        'load_seconds': round(loaded - started, 2), 'index_seconds': round(finished - loaded, 2),
+        'size_mb': round(os.path.getsize(path) / 1024 / 1024, 1),
+    }
+
+
+def dataset_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the dataset size options shared by the benchmark runners."""
+    parser.add_argument('--preset', choices=PRESETS, default='small')
+    parser.add_argument('--chapters', type=int, help='Overrides the preset')
+    parser.add_argument('--cards', type=int, help='Overrides the preset')
+    parser.add_argument('--reviews', type=int, help='Overrides the preset')
+    parser.add_argument('--seed', type=int, default=42)
+
+
+def dataset_size(args) -> dict:
+    size = dict(PRESETS[args.preset])
+    for key in size:
+        if getattr(args, key) is not None:
+            size[key] = getattr(args, key)
+    return size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('output', help='Database file to create')
+    dataset_arguments(parser)
+    args = parser.parse_args(argv)
+
+    stats = generate_dataset(args.output, seed=args.seed, **dataset_size(args))
+    print(f"{stats['chapters']} chapters, {stats['cards']} cards, {stats['reviews']} reviews "
+          f"(seed {stats['seed']}): loaded in {stats['load_seconds']} s, "
+          f"indexed in {stats['index_seconds']} s, {stats['size_mb']} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+"""Simulate concurrent learners against a locally started WordUp server.
+
+Usage::
+
+    python -m benchmarks.loadtest [--learners 20] [--duration 60] [--scenario steady]
+                                  [--server werkzeug|gunicorn] [--dataset data.db] [--output results.json]
+    python -m benchmarks.loadtest --url http://127.0.0.1:5000 ...   # an already running server
+
+Every virtual learner keeps its own session cookie and repeats the
+learning loop: open the session setup page, create a session, then for
+each card load the review page, think, and post the answer through the
+JSON API, and finally open the completion page. Think times, answer
+correctness and chapter choice come from a per-learner random generator
+seeded from ``--seed``, so a scenario replays the same way every time.
+
+The report gives throughput, latency percentiles per step, errors by
+kind, and how often the server logged ``database is locked``.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from benchmarks.datagen import dataset_arguments, dataset_size, generate_dataset
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# think: distribution of the pause before each answer, in seconds
+SCENARIOS = {
+    'steady': {'think': 'exponential', 'think_mean': 2.0, 'cards': 20, 'correct': 0.8},
+    'mobile': {'think': 'lognormal', 'think_mean': 4.0, 'cards': 10, 'correct': 0.75},
+    'burst': {'think': 'none', 'think_mean': 0.0, 'cards': 50, 'correct': 0.8},
+}
+
+STEPS = ('start_session', 'create_session', 'review_card', 'api_submit_answer', 'session_complete')
+
+REQUEST_TIMEOUT = 30
+
+# The review page's answer script, and the dashboard's chapter links
+CARD_PATTERN = re.compile(r"card_id: (\d+),\s*correct: [^,]+,\s*direction: '(\w+)'")
+CHAPTER_LINK_PATTERN = re.compile(r'href="/chapters/(\d+)"')
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def think_time(rng: random.Random, scenario: dict) -> float:
+    mean = scenario['think_mean']
+    if scenario['think'] == 'exponential':
+        return rng.expovariate(1 / mean)
+    if scenario['think'] == 'lognormal':
+        # sigma 0.8: most pauses near the median, a long tail of distracted learners
+        return rng.lognormvariate(0, 0.8) * mean / 1.377
+    if scenario['think'] == 'uniform':
+        return rng.uniform(0, 2 * mean)
+    return 0.0
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Each step is timed on its own, so redirects are not followed
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {step: [] for step in STEPS}
+        self.errors = {}
+        self.sessions = 0
+        self.cookie_bytes = []
+
+    def record(self, step, seconds):
+        with self.lock:
+            self.latencies[step].append(seconds)
+
+    def error(self, kind):
+        with self.lock:
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+
+
+class Learner:
+    """One virtual learner with its own cookie jar and random generator."""
+
+    def __init__(self, base_url, chapter_ids, scenario, seed, stats, stop):
+        self.base_url = base_url.rstrip('/')
+        self.chapter_ids = chapter_ids
+        self.scenario = scenario
+        self.rng = random.Random(seed)
+        self.stats = stats
+        self.stop = stop
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def request(self, step, path, data=None, json_body=None):
+        """Send a request; return (status, body) or None after an error."""
+        headers = {}
+        if json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            data = urllib.parse.urlencode(data).encode()
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers)
+
+        started = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=REQUEST_TIMEOUT) as response:
+                status, body = response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            status, body = exc.code, exc.read()
+        except (urllib.error.URLError, OSError) as exc:
+            self.stats.error(f'{step}: {exc.__class__.__name__}')
+            return None
+        elapsed = time.perf_counter() - started
+
+        if status >= 400:
+            self.stats.error(f'{step}: HTTP {status}')
+            return None
+        self.stats.record(step, elapsed)
+        self.stats.cookie_bytes.append(sum(len(cookie.value) for cookie in self.cookies))
+        return status, body
+
+    def run(self):
+        while not self.stop.is_set():
+            self.run_session()
+
+    def run_session(self):
+        chapter_id = self.rng.choice(self.chapter_ids)
+        if self.request('start_session', f'/learn/chapter/{chapter_id}') is None:
+            return
+        form = {'context_mode': 'word', 'practice_mode': 'all_cards', 'direction': 'random',
+                'limit': self.scenario['cards']}
+        if self.request('create_session', f'/learn/chapter/{chapter_id}/session', data=form) is None:
+            return
+
+        while not self.stop.is_set():
+            result = self.request('review_card', '/learn/review')
+            if result is None:
+                return
+            status, body = result
+            if status in (301, 302, 303):  # No cards left
+                break
+            match = CARD_PATTERN.search(body.decode('utf-8', 'replace'))
+            if match is None:
+                self.stats.error('review_card: no card in page')
+                return
+            self.stop.wait(think_time(self.rng, self.scenario))
+            answer = {'card_id': int(match.group(1)), 'direction': match.group(2),
+                      'correct': self.rng.random() < self.scenario['correct']}
+            if self.request('api_submit_answer', '/learn/api/answer', json_body=answer) is None:
+                return
+        else:
+            return
+
+        if self.request('session_complete', '/learn/session-complete') is not None:
+            with self.stats.lock:
+                self.stats.sessions += 1
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, database, log_path, workers, threads):
+    """Start WordUp on a free port; return (process, base URL)."""
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}', WORDUP_HOST='127.0.0.1',
+               WORDUP_PORT=str(port), WORDUP_WORKERS=str(workers), WORDUP_THREADS=str(threads),
+               PYTHONPATH=PROJECT_ROOT)
+    if kind == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+    else:
+        command = [sys.executable, '-m', 'flask', '--app', 'src.app:create_app', 'run',
+                   '--port', str(port), '--with-threads']
+    log = open(log_path, 'w')
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    log.close()
+
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server exited with status {process.returncode}; see {log_path}')
+        try:
+            with urllib.request.urlopen(f'{base_url}/healthz', timeout=1):
+                return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'Server did not start within 60 seconds; see {log_path}')
+
+
+def report(stats, duration, learners, locked):
+    requests = sum(len(values) for values in stats.latencies.values())
+    errors = sum(stats.errors.values())
+    summary = {
+        'learners': learners,
+        'duration_s': round(duration, 1),
+        'requests_per_s': round(requests / duration, 1),
+        'answers_per_s': round(len(stats.latencies['api_submit_answer']) / duration, 1),
+        'sessions_completed': stats.sessions,
+        'error_rate': round(errors / (requests + errors), 4) if requests + errors else 0.0,
+        'errors': dict(sorted(stats.errors.items())),
+        'database_locked': locked,
+        'cookie_bytes_max': max(stats.cookie_bytes, default=0),
+        'steps': {},
+    }
+    for step, values in stats.latencies.items():
+        if values:
+            summary['steps'][step] = {
+                'count': len(values),
+                'p50_ms': round(statistics.median(values) * 1000, 1),
+                'p95_ms': round(_percentile(values, 0.95) * 1000, 1),
+                'p99_ms': round(_percentile(values, 0.99) * 1000, 1),
+            }
+    return summary
+
+
+def print_report(summary):
+    print(f"{summary['learners']} learners for {summary['duration_s']} s: "
+          f"{summary['requests_per_s']} requests/s, {summary['answers_per_s']} answers/s, "
+          f"{summary['sessions_completed']} sessions completed")
+    print(f"\n{'step':<18} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for step, values in summary['steps'].items():
+        print(f"{step:<18} {values['count']:>7} {values['p50_ms']:>8.1f} "
+              f"{values['p95_ms']:>8.1f} {values['p99_ms']:>8.1f}")
+    print(f"\nError rate {summary['error_rate'] * 100:.2f}%, 'database is locked' in server log: "
+          f"{summary['database_locked']}, largest session cookie: {summary['cookie_bytes_max']} bytes")
+    for kind, count in summary['errors'].items():
+        print(f'  {kind}: {count}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--learners', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=60.0, help='Seconds of load after ramp-up')
+    parser.add_argument('--ramp', type=float, default=5.0, help='Seconds over which learners start')
+    parser.add_argument('--scenario', choices=SCENARIOS, default='steady')
+    parser.add_argument('--think', choices=('exponential', 'lognormal', 'uniform', 'none'),
+                        help="Overrides the scenario's think-time distribution")
+    parser.add_argument('--think-mean', type=float, help="Overrides the scenario's mean think time")
+    parser.add_argument('--url', help='Use a running server instead of starting one')
+    parser.add_argument('--server', choices=('werkzeug', 'gunicorn'), default='werkzeug')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    parser.add_argument('--dataset', help='Database to reuse; generated there if missing')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    dataset_arguments(parser)
+    args = parser.parse_args(argv)
+
+    scenario = dict(SCENARIOS[args.scenario])
+    if args.think:
+        scenario['think'] = args.think
+    if args.think_mean is not None:
+        scenario['think_mean'] = args.think_mean
+
+    workdir = tempfile.mkdtemp(prefix='wordup-loadtest-')
+    process = None
+    log_path = os.path.join(workdir, 'server.log')
+    try:
+        if args.url:
+            base_url = args.url
+            with urllib.request.urlopen(base_url.rstrip('/') + '/') as response:
+                page = response.read().decode('utf-8', 'replace')
+            chapter_ids = sorted({int(found) for found in CHAPTER_LINK_PATTERN.findall(page)})
+        else:
+            dataset = args.dataset or os.path.join(workdir, 'dataset.db')
+            if not os.path.exists(dataset):
+                generate_dataset(dataset, seed=args.seed, **dataset_size(args))
+            database = os.path.join(workdir, 'loadtest.db')
+            shutil.copyfile(dataset, database)
+            with sqlite3.connect(database) as connection:
+                chapter_ids = [row[0] for row in connection.execute(
+                    'SELECT DISTINCT chapter_id FROM vocabulary_cards ORDER BY chapter_id')]
+            process, base_url = start_server(args.server, database, log_path, args.workers, args.threads)
+
+        stats = Stats()
+        stop = threading.Event()
+        learners = [Learner(base_url, chapter_ids, scenario, args.seed * 1000 + index, stats, stop)
+                    for index in range(args.learners)]
+        threads = [threading.Thread(target=learner.run, daemon=True) for learner in learners]
+        for index, thread in enumerate(threads):
+            thread.start()
+            if index + 1 < len(threads):
+                time.sleep(args.ramp / len(threads))
+
+        started = time.perf_counter()
+        time.sleep(args.duration)
+        stop.set()
+        duration = time.perf_counter() - started
+        for thread in threads:
+            thread.join(REQUEST_TIMEOUT)
+
+        locked = 0
+        if process is not None:
+            process.terminate()
+            process.wait(30)
+            with open(log_path, errors='replace') as handle:
+                locked = handle.read().count('database is locked')
+
+        summary = report(stats, duration, args.learners, locked)
+        summary['scenario'] = dict(scenario, name=args.scenario, seed=args.seed)
+        print_report(summary)
+        if args.output:
+            with open(args.output, 'w') as handle:
+                json.dump(summary, handle, indent=2)
+    finally:
+        if process is not None and process.poll() is None:
+            process.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
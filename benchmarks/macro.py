@@ -0,0 +1,259 @@
+"""Time the main pages and jobs against a large generated dataset.
+
+Usage::
+
+    python -m benchmarks.macro [--preset small] [--dataset data.db] [--output results.json]
+                               [--baseline baseline.json] [--tolerance 0.2]
+
+Cases run in one process through the Flask test client:
+``main.dashboard``, ``chapters.view_chapter`` (largest chapter),
+``learning.create_session``, ``learning.api_submit_answer``, the full
+export job and the JSON import job. The data comes from
+``benchmarks.datagen``. Pass ``--dataset`` to keep the generated
+database and reuse it on later runs; each run works on a copy.
+
+Results are written as JSON. With ``--baseline`` the medians are compared
+against an earlier results file, and the exit status is 1 when a case got
+slower than the tolerance allows.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+
+from benchmarks.datagen import dataset_arguments, dataset_size, generate_dataset
+from src.app import create_app
+from src.models import Chapter, VocabularyCard, db
+from src.services.transfer import build_chapter_export
+
+SESSION_FORM = {'context_mode': 'word', 'practice_mode': 'due_only',
+                'direction': 'source_to_target', 'limit': 20}
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Cases:
+    """The benchmarked requests.
+
+    ``setup_<case>`` runs untimed before and ``check_<case>`` untimed
+    after each timed ``run_<case>``.
+    """
+
+    def __init__(self, app):
+        self.client = app.test_client()
+        self.session_cards = []
+        self.imports = 0
+        with app.app_context():
+            count = func.count(VocabularyCard.id)
+            self.chapter_id = db.session.execute(
+                select(VocabularyCard.chapter_id).group_by(VocabularyCard.chapter_id).order_by(count.desc()).limit(1)
+            ).scalar()
+            # A typical chapter to import: the median size
+            sizes = db.session.execute(
+                select(VocabularyCard.chapter_id).group_by(VocabularyCard.chapter_id).order_by(count)
+            ).scalars().all()
+            chapter = db.session.get(Chapter, sizes[len(sizes) // 2])
+            self.import_data = build_chapter_export(chapter)
+            db.session.remove()
+        self.import_file = None
+
+    def _check_job(self, response):
+        status = self.client.get(f"{response.headers['Location']}/status").get_json()
+        if status['status'] != 'succeeded':
+            raise RuntimeError(f"{status['kind']} job failed: {status['error']}")
+
+    def run_dashboard(self):
+        return self.client.get('/')
+
+    def run_view_chapter(self):
+        return self.client.get(f'/chapters/{self.chapter_id}')
+
+    def run_create_session(self):
+        return self.client.post(f'/learn/chapter/{self.chapter_id}/session', data=SESSION_FORM)
+
+    def setup_api_submit_answer(self):
+        if not self.session_cards:
+            self.run_create_session()
+            with self.client.session_transaction() as flask_session:
+                self.session_cards = [entry['card_id'] for entry in flask_session['learning_session']['cards']]
+
+    def run_api_submit_answer(self):
+        card_id = self.session_cards.pop(0)
+        # Correct answers only: a wrong one past the session's end is an error
+        return self.client.post('/learn/api/answer', json={
+            'card_id': card_id, 'correct': True, 'direction': 'source_to_target'
+        })
+
+    def run_export_all_data(self):
+        return self.client.post('/admin/export/all')
+
+    def check_export_all_data(self, response):
+        self._check_job(response)
+
+    def setup_import_json(self):
+        # Chapters must have new names to be imported
+        self.imports += 1
+        self.import_data['chapter']['name'] = f'Imported {self.imports}'
+        self.import_file = json.dumps(self.import_data).encode('utf-8')
+
+    def run_import_json(self):
+        return self.client.post('/admin/import', data={'file': (io.BytesIO(self.import_file), 'chapter.json')},
+                                content_type='multipart/form-data')
+
+    def check_import_json(self, response):
+        self._check_job(response)
+
+
+# (name, runs multiplier): jobs are much slower, so they run fewer times
+CASES = [
+    ('dashboard', 1.0),
+    ('view_chapter', 1.0),
+    ('create_session', 1.0),
+    ('api_submit_answer', 1.0),
+    ('export_all_data', 0.2),
+    ('import_json', 0.2),
+]
+
+
+def run_cases(app, repeat, warmup, names):
+    cases = Cases(app)
+    results = {}
+    for name, share in CASES:
+        if names and name not in names:
+            continue
+        setup = getattr(cases, f'setup_{name}', None)
+        run = getattr(cases, f'run_{name}')
+        check = getattr(cases, f'check_{name}', None)
+        runs = max(1, int(repeat * share))
+        durations = []
+        for index in range(warmup + runs):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            response = run()
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise RuntimeError(f'{name} answered {response.status_code}')
+            if check:
+                check(response)
+            if index >= warmup:
+                durations.append(elapsed)
+        results[name] = {
+            'runs': runs,
+            'median_ms': round(statistics.median(durations) * 1000, 3),
+            'p95_ms': round(_percentile(durations, 0.95) * 1000, 3),
+            'min_ms': round(min(durations) * 1000, 3),
+            'max_ms': round(max(durations) * 1000, 3),
+        }
+        print(f'{name:<18} {results[name]["median_ms"]:>10.2f} ms median '
+              f'{results[name]["p95_ms"]:>10.2f} ms p95  ({runs} runs)', flush=True)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Print each case against the baseline; return the names that regressed."""
+    if baseline['dataset'] != results['dataset']:
+        print('WARNING: the baseline was measured on a different dataset')
+    regressions = []
+    print(f'\n{"case":<18} {"baseline":>10} {"now":>10} {"change":>8}')
+    for name, result in results['cases'].items():
+        before = baseline['cases'].get(name)
+        if before is None:
+            print(f'{name:<18} {"-":>10} {result["median_ms"]:>10.2f}')
+            continue
+        ratio = result['median_ms'] / before['median_ms'] if before['median_ms'] else 1.0
+        flag = ''
+        if ratio > 1 + tolerance:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 - tolerance:
+            flag = '  faster'
+        print(f'{name:<18} {before["median_ms"]:>10.2f} {result["median_ms"]:>10.2f} '
+              f'{(ratio - 1) * 100:>+7.0f}%{flag}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    dataset_arguments(parser)
+    parser.add_argument('--dataset', help='Database to reuse; generated there if missing')
+    parser.add_argument('--repeat', type=int, default=30, help='Timed runs per page case')
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--cases', help=f'Comma-separated subset of: {", ".join(name for name, _ in CASES)}')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against an earlier results file')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed slowdown of the median before a case counts as a regression')
+    args = parser.parse_args(argv)
+
+    size = dataset_size(args)
+    workdir = tempfile.mkdtemp(prefix='wordup-bench-macro-')
+    try:
+        dataset = args.dataset or os.path.join(workdir, 'dataset.db')
+        if not os.path.exists(dataset):
+            stats = generate_dataset(dataset, seed=args.seed, **size)
+            print(f"Generated {stats['cards']} cards and {stats['reviews']} reviews in "
+                  f"{stats['load_seconds'] + stats['index_seconds']:.1f} s")
+        with sqlite3.connect(dataset) as connection:
+            counts = {table: connection.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                      for table in ('chapters', 'vocabulary_cards', 'review_history')}
+        database = os.path.join(workdir, 'bench.db')
+        shutil.copyfile(dataset, database)
+
+        app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}',
+            'JOBS_RUN_INLINE': True,
+            'SQLITE_OPTIMIZE_ON_EXIT': False,
+        })
+        names = set(args.cases.split(',')) if args.cases else None
+        results = {
+            'dataset': {'chapters': counts['chapters'], 'cards': counts['vocabulary_cards'],
+                        'reviews': counts['review_history']},
+            'environment': {
+                'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform(), 'commit': _git_commit(),
+                'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            },
+            'cases': run_cases(app, args.repeat, args.warmup, names),
+        }
+        with app.app_context():
+            db.engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(results, json.load(handle), args.tolerance)
+        if regressions:
+            print(f'\nSlower than the baseline: {", ".join(regressions)}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Show the query-plan and timing effect of each indexing migration.
+
+Usage::
+
+    python -m benchmarks.migrations [--chapters 20] [--cards 50000] [--reviews 200000]
+
+A database is seeded once. For every migration with ``plan_queries`` its
+indexes are dropped, the queries are planned and timed, the migration's
+indexes are created again and the queries are measured once more.
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.pool import NullPool
+
+from src.models import Chapter, ReviewHistory, VocabularyCard, db
+from src.services.schema import MIGRATIONS, create_model_indexes, full_scans, query_plan, upgrade_schema
+
+
+def seed(engine, chapters, cards, reviews):
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(insert(Chapter.__table__), [
+            {'id': index, 'name': f'Chapter {index}', 'source_language': 'German',
+             'target_language': 'English'}
+            for index in range(1, chapters + 1)
+        ])
+        connection.execute(insert(VocabularyCard.__table__), [
+            {'id': index, 'source_word': f'Wort {index}', 'target_word': f'word {index}',
+             'chapter_id': rng.randint(1, chapters), 'box_level': rng.randint(1, 5),
+             'next_review': start + timedelta(minutes=rng.randint(0, 200000))}
+            for index in range(1, cards + 1)
+        ])
+        connection.execute(insert(ReviewHistory.__table__), [
+            {'card_id': rng.randint(1, cards), 'correct': rng.random() < 0.7,
+             'direction': 'source_to_target', 'reviewed_at': start + timedelta(minutes=index)}
+            for index in range(reviews)
+        ])
+
+
+def measure(engine, queries, repeat):
+    # NullPool: a fresh connection per measurement, so no statement
+    # prepared against the old schema is reused
+    results = []
+    with engine.connect() as connection:
+        for label, sql, params in queries:
+            plan = query_plan(connection, sql, params)
+            started = time.perf_counter()
+            for _ in range(repeat):
+                connection.execute(text(sql), params).fetchall()
+            elapsed = (time.perf_counter() - started) / repeat
+            results.append((label, plan, elapsed))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--chapters', type=int, default=20)
+    parser.add_argument('--cards', type=int, default=50000)
+    parser.add_argument('--reviews', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per query and state')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='wordup-bench-migrations-')
+    try:
+        engine = create_engine(f'sqlite:///{os.path.join(workdir, "bench.db")}', poolclass=NullPool)
+        db.metadata.create_all(engine)
+        upgrade_schema(engine)
+        seed(engine, args.chapters, args.cards, args.reviews)
+        with engine.begin() as connection:
+            connection.exec_driver_sql('ANALYZE')
+
+        for step in MIGRATIONS:
+            if not step.plan_queries:
+                continue
+            with engine.begin() as connection:
+                for _, index_name in step.indexes:
+                    connection.exec_driver_sql(f'DROP INDEX IF EXISTS {index_name}')
+            before = measure(engine, step.plan_queries, args.repeat)
+            with engine.begin() as connection:
+                create_model_indexes(connection, step.indexes)
+            after = measure(engine, step.plan_queries, args.repeat)
+
+            print(f'Migration {step.version}: {step.description}')
+            for (label, plan_before, time_before), (_, plan_after, time_after) in zip(before, after):
+                speedup = time_before / time_after if time_after else float('inf')
+                print(f'  {label}: {time_before * 1000:.2f} ms -> {time_after * 1000:.2f} ms ({speedup:.0f}x)')
+                print(f'    before: {"; ".join(plan_before)}')
+                print(f'    after:  {"; ".join(plan_after)}')
+                if full_scans(plan_after):
+                    print(f'    WARNING: still scanning: {"; ".join(full_scans(plan_after))}')
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
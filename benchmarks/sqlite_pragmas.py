@@ -0,0 +1,150 @@
+"""Compare SQLite settings and the write queue under concurrent answers and dashboard reads.
+
+Usage::
+
+    python -m benchmarks.sqlite_pragmas [--cards 2000] [--writers 4] [--readers 4] [--duration 10]
+
+Each profile gets a fresh database. Writer threads record answers the way
+the learning routes do while reader threads load the dashboard and a
+chapter page through the test client. The ``queued`` profile sends the
+answers through the single-writer queue (services/writer.py).
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+
+from src.app import create_app
+from src.models import Chapter, VocabularyCard, db
+from src.services.card_stats import record_answer
+from src.services.database import DEFAULT_SQLITE_SETTINGS
+from src.services.writer import PRIORITY_ANSWER, WriteQueueError, get_write_queue, run_write
+
+# SQLite's own defaults: rollback journal, full fsync on every commit
+LEGACY_SETTINGS = {key: '' for key in DEFAULT_SQLITE_SETTINGS}
+LEGACY_SETTINGS.update({'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL'})
+
+PROFILES = {
+    'legacy': LEGACY_SETTINGS,
+    'tuned': dict(DEFAULT_SQLITE_SETTINGS),
+    'queued': dict(DEFAULT_SQLITE_SETTINGS, WRITE_QUEUE_ENABLED=True),
+}
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def _seed(app, card_count):
+    with app.app_context():
+        db.create_all()
+        chapter = Chapter(name='Benchmark', source_language='German', target_language='English')
+        db.session.add(chapter)
+        db.session.commit()
+        now = datetime.now(timezone.utc)
+        rows = [{
+            'chapter_id': chapter.id, 'source_word': f'Wort {index}', 'target_word': f'word {index}',
+            'box_level': 1, 'next_review': now, 'created_at': now
+        } for index in range(card_count)]
+        for start in range(0, len(rows), 500):
+            db.session.execute(insert(VocabularyCard.__table__).values(rows[start:start + 500]))
+        db.session.commit()
+        return chapter.id
+
+
+def _writer(app, card_count, stop, results):
+    rng = random.Random()
+    with app.app_context():
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                run_write(record_answer, rng.randint(1, card_count), rng.random() < 0.7,
+                          'source_to_target', priority=PRIORITY_ANSWER)
+            except (OperationalError, WriteQueueError):
+                results['errors'] += 1
+                continue
+            results['answers'].append(time.perf_counter() - started)
+
+
+def _reader(app, chapter_id, stop, results):
+    client = app.test_client()
+    paths = ['/', f'/chapters/{chapter_id}']
+    index = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = client.get(paths[index % len(paths)])
+        index += 1
+        if response.status_code != 200:
+            results['errors'] += 1
+            continue
+        results['reads'].append(time.perf_counter() - started)
+
+
+def run_profile(name, settings, cards, writers, readers, duration):
+    workdir = tempfile.mkdtemp(prefix=f'wordup-bench-{name}-')
+    try:
+        config = {
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(workdir, "bench.db")}',
+            'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': writers + readers + 2},
+        }
+        config.update(settings)
+        config['SQLITE_OPTIMIZE_ON_EXIT'] = False
+        app = create_app(config)
+        chapter_id = _seed(app, cards)
+
+        results = {'answers': [], 'reads': [], 'errors': 0}
+        stop = threading.Event()
+        threads = [threading.Thread(target=_writer, args=(app, cards, stop, results)) for _ in range(writers)]
+        threads += [threading.Thread(target=_reader, args=(app, chapter_id, stop, results)) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        if app.config.get('WRITE_QUEUE_ENABLED'):
+            get_write_queue(app).stop()
+        with app.app_context():
+            db.engine.dispose()
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cards', type=int, default=2000)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per profile')
+    parser.add_argument('--profiles', default=','.join(PROFILES), help='Comma-separated profile names')
+    args = parser.parse_args(argv)
+
+    header = f'{"profile":<8} {"answers/s":>10} {"p50 ms":>8} {"p95 ms":>8} {"reads/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"errors":>7}'
+    print(header)
+    print('-' * len(header))
+    for name in args.profiles.split(','):
+        results = run_profile(name, PROFILES[name], args.cards, args.writers, args.readers, args.duration)
+        answers, reads = results['answers'], results['reads']
+        print(f'{name:<8} {len(answers) / args.duration:>10.1f} '
+              f'{statistics.median(answers) * 1000 if answers else 0:>8.1f} {_percentile(answers, 0.95) * 1000:>8.1f} '
+              f'{len(reads) / args.duration:>8.1f} '
+              f'{statistics.median(reads) * 1000 if reads else 0:>8.1f} {_percentile(reads, 0.95) * 1000:>8.1f} '
+              f'{results["errors"]:>7}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Gunicorn settings for WordUp: ``gunicorn -c gunicorn.conf.py wsgi:app``.
+
+Everything is configured through WORDUP_* environment variables, like the
+development server in main.py.
+"""
+import os
+
+bind = f"{os.getenv('WORDUP_HOST', '127.0.0.1')}:{os.getenv('WORDUP_PORT', '5000')}"
+
+# SQLite has a single writer, so a few processes with several threads each
+# serve WordUp better than many single-threaded workers
+workers = int(os.getenv('WORDUP_WORKERS', 2))
+threads = int(os.getenv('WORDUP_THREADS', 4))
+worker_class = 'gthread'
+
+timeout = int(os.getenv('WORDUP_TIMEOUT', 30))  # Seconds before a stuck worker is restarted
+graceful_timeout = int(os.getenv('WORDUP_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('WORDUP_KEEPALIVE', 5))
+
+# Recycle workers after this many requests (0 disables), jittered so they
+# do not all restart at once
+max_requests = int(os.getenv('WORDUP_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('WORDUP_MAX_REQUESTS_JITTER', 100))
+
+# Import the app (and run migrations) once in the master before forking
+preload_app = os.getenv('WORDUP_PRELOAD', 'true').lower() in ('1', 'true', 'yes', 'on')
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('WORDUP_LOG_LEVEL', 'info')
+
+# Heartbeat files on tmpfs; a disk-backed /tmp can stall workers in containers
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+
+def post_fork(server, worker):
+    """Drop database connections inherited from the master process."""
+    if not preload_app:
+        return
+    from src.models import db
+
+    app = worker.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -23,9 +23,61 @@ def create_app(config_overrides=None):
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    # Background jobs (imports/exports)
+    app.config['JOB_WORKERS'] = int(os.getenv('WORDUP_JOB_WORKERS', 2))
+    app.config['JOB_RESULT_TTL'] = int(os.getenv('WORDUP_JOB_RESULT_TTL', 24 * 60 * 60))
+    # Seconds without a heartbeat before a running job counts as lost
+    app.config['JOB_LEASE_TIMEOUT'] = int(os.getenv('WORDUP_JOB_LEASE_TIMEOUT', 120))
+    app.config['JOBS_RUN_INLINE'] = False
+
+    # Let the reverse proxy send theming backgrounds: '', 'x-accel-redirect' or 'x-sendfile'
+    from src.services.theming import BACKGROUND_OFFLOAD_MODES
+    app.config['THEMING_OFFLOAD'] = os.getenv('WORDUP_THEMING_OFFLOAD', '').lower()
+    app.config['THEMING_X_ACCEL_PREFIX'] = os.getenv('WORDUP_THEMING_X_ACCEL_PREFIX', '/_wordup_theming/')
+
+    # Gzip HTML and JSON responses; turn off when the reverse proxy compresses
+    from src.services.compression import DEFAULT_COMPRESS_LEVEL, DEFAULT_COMPRESS_MIN_SIZE
+    app.config['COMPRESS_ENABLED'] = os.getenv('WORDUP_COMPRESS', 'true').lower() in ('1', 'true', 'yes', 'on')
+    app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('WORDUP_COMPRESS_MIN_SIZE', DEFAULT_COMPRESS_MIN_SIZE))
+    app.config['COMPRESS_LEVEL'] = int(os.getenv('WORDUP_COMPRESS_LEVEL', DEFAULT_COMPRESS_LEVEL))
+
+    # Per-request timing (see services/instrumentation.py): off by default
+    from src.services.instrumentation import DEFAULT_SLOW_REQUEST_MS
+    app.config['INSTRUMENTATION_ENABLED'] = os.getenv('WORDUP_INSTRUMENTATION', 'false').lower() in ('1', 'true', 'yes', 'on')
+    app.config['SLOW_REQUEST_MS'] = float(os.getenv('WORDUP_SLOW_REQUEST_MS', DEFAULT_SLOW_REQUEST_MS))
+
+    # On-demand profiling under /admin/profiling (see services/profiling.py): off without a token
+    app.config['PROFILING_TOKEN'] = os.getenv('WORDUP_PROFILING_TOKEN', '')
+
+    # Prometheus metrics at /metrics, merged across worker processes: off by
+    # default; with a token set, scrapes must send it as a bearer token
+    app.config['METRICS_ENABLED'] = os.getenv('WORDUP_METRICS', 'false').lower() in ('1', 'true', 'yes', 'on')
+    app.config['METRICS_TOKEN'] = os.getenv('WORDUP_METRICS_TOKEN', '')
+
+    # Seconds a /readyz result is reused
+    app.config['READY_CACHE_SECONDS'] = float(os.getenv('WORDUP_READY_CACHE_SECONDS', 5))
+
+    # Lazy relationship loads raise instead of querying (on in tests)
+    app.config['STRICT_LOADING'] = os.getenv('WORDUP_STRICT_LOADING', 'false').lower() in ('1', 'true', 'yes', 'on')
+
+    # Single-writer queue (see services/writer.py): off by default
+    app.config['WRITE_QUEUE_ENABLED'] = os.getenv('WORDUP_WRITE_QUEUE', 'false').lower() in ('1', 'true', 'yes', 'on')
+    app.config['WRITE_QUEUE_SIZE'] = int(os.getenv('WORDUP_WRITE_QUEUE_SIZE', 1000))
+    app.config['WRITE_QUEUE_TIMEOUT'] = float(os.getenv('WORDUP_WRITE_QUEUE_TIMEOUT', 5))
+    app.config['WRITE_BATCH_SIZE'] = int(os.getenv('WORDUP_WRITE_BATCH_SIZE', 50))
+
+    # SQLite tuning applied to every connection (see services/database.py).
+    # Set a WORDUP_SQLITE_* variable to an empty value to keep SQLite's default.
+    from src.services.database import DEFAULT_SQLITE_SETTINGS
+    for key, default in DEFAULT_SQLITE_SETTINGS.items():
+        app.config[key] = os.getenv(f'WORDUP_{key}', default)
+
     if config_overrides:
         app.config.update(config_overrides)
 
+    if app.config['THEMING_OFFLOAD'] not in BACKGROUND_OFFLOAD_MODES:
+        raise ValueError(f"WORDUP_THEMING_OFFLOAD must be one of {', '.join(filter(None, BACKGROUND_OFFLOAD_MODES))}")
+
     # Normalize SQLite relative paths after overrides applied
     database_url = app.config['SQLALCHEMY_DATABASE_URI']
     if database_url.startswith('sqlite:///') and not os.path.isabs(database_url[10:]):
@@ -50,7 +102,21 @@ def create_app(config_overrides=None):
     
     # Initialize extensions
     from src.models import db
+    from src.services.database import configure_sqlite, enable_strict_loading
     db.init_app(app)
+    if app.config['STRICT_LOADING']:
+        enable_strict_loading(app)
+    with app.app_context():
+        configure_sqlite(app, db.engine)
+        if app.config['METRICS_ENABLED']:
+            from src.services.metrics import init_metrics
+            init_metrics(app, db.engine)
+        if app.config['INSTRUMENTATION_ENABLED']:
+            from src.services.instrumentation import init_instrumentation
+            init_instrumentation(app, db.engine)
+        if app.config['PROFILING_TOKEN']:
+            from src.services.profiling import init_profiling
+            init_profiling(app)
     
     # Register blueprints
     from src.routes.main import main_bp
@@ -58,19 +124,40 @@ def create_app(config_overrides=None):
     from src.routes.cards import cards_bp
     from src.routes.learning import learning_bp
     from src.routes.admin import admin_bp
+    from src.routes.assets import assets_bp, asset_url
     
     app.register_blueprint(main_bp)
     app.register_blueprint(chapters_bp, url_prefix='/chapters')
     app.register_blueprint(cards_bp, url_prefix='/cards')
     app.register_blueprint(learning_bp, url_prefix='/learn')
     app.register_blueprint(admin_bp, url_prefix='/admin')
+    app.register_blueprint(assets_bp, url_prefix='/assets')
+    app.add_template_global(asset_url)
+
+    # Register CLI commands
+    from src.commands import register_commands
+    register_commands(app)
+
+    if app.config['COMPRESS_ENABLED']:
+        from src.services.compression import compress_response
+        app.after_request(compress_response)
+
+    from src.services.writer import WriteQueueError
+
+    @app.errorhandler(WriteQueueError)
+    def write_queue_unavailable(exc):
+        from flask import jsonify, request
+        headers = {'Retry-After': '1'}
+        if request.is_json or request.blueprint == 'learning':
+            return jsonify({'error': str(exc)}), 503, headers
+        return str(exc), 503, headers
 
     @app.context_processor
     def inject_theming_config():
-        from src.models import AppConfig
+        from src.services.config_cache import get_cached_config
         config = None
         try:
-            config = AppConfig.get_config()
+            config = get_cached_config(app)
         except Exception:
             db.session.rollback()
         return {'theming_config': config}
@@ -80,5 +167,7 @@ def create_app(config_overrides=None):
             # Ensure data directory exists
             os.makedirs('data', exist_ok=True)
             db.create_all()
+            from src.services.schema import upgrade_schema
+            upgrade_schema(db.engine)
     
     return app
\ No newline at end of file
@@ -0,0 +1,104 @@
+import os
+
+import click
+from flask import current_app
+
+
+def register_commands(app):
+    """Register WordUp's ``flask`` CLI commands on the application."""
+
+    @app.cli.command('snapshot')
+    @click.argument('output', required=False)
+    @click.option('--compact', is_flag=True, help='Rewrite the snapshot with VACUUM INTO.')
+    @click.option('--pages', default=None, type=int, help='Pages copied per backup step.')
+    def snapshot_command(output, compact, pages):
+        """Write a consistent copy of the live database."""
+        from src.services.backup import (
+            SNAPSHOT_PAGES_PER_STEP,
+            create_snapshot,
+            get_snapshot_folder,
+            snapshot_filename,
+        )
+
+        if not output:
+            output = os.path.join(get_snapshot_folder(current_app), snapshot_filename(compact))
+
+        try:
+            path = create_snapshot(current_app, output, compact=compact,
+                                   pages=pages or SNAPSHOT_PAGES_PER_STEP)
+        except ValueError as exc:
+            raise click.ClickException(str(exc))
+        click.echo(f'Snapshot written to {path} ({os.path.getsize(path)} bytes)')
+
+    @app.cli.command('restore-snapshot')
+    @click.argument('snapshot', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--yes', is_flag=True, help='Do not ask for confirmation.')
+    def restore_snapshot_command(snapshot, yes):
+        """Replace the database file with SNAPSHOT (stop the server first)."""
+        from src.services.backup import restore_snapshot
+        from src.services.config_cache import invalidate_config_cache
+
+        if not yes:
+            click.confirm('This replaces the current database. Continue?', abort=True)
+
+        try:
+            previous = restore_snapshot(current_app, snapshot)
+        except ValueError as exc:
+            raise click.ClickException(str(exc))
+        invalidate_config_cache(current_app)
+        click.echo('Database restored from snapshot.')
+        if previous:
+            click.echo(f'Previous database kept at {previous}')
+
+    @app.cli.command('rebuild-card-stats')
+    def rebuild_card_stats_command():
+        """Recompute every card's review counters from the review history."""
+        from src.models import db
+        from src.services.card_stats import rebuild_card_stats
+
+        with db.engine.begin() as connection:
+            count = rebuild_card_stats(connection)
+        click.echo(f'Rebuilt review counters for {count} cards.')
+
+    @app.cli.command('db-upgrade')
+    @click.option('--to', 'target', default=None, type=int, help='Stop after this schema version.')
+    def db_upgrade_command(target):
+        """Create missing tables and apply pending schema migrations."""
+        from src.models import db
+        from src.services.schema import MIGRATIONS, upgrade_schema
+
+        db.create_all()
+        applied = upgrade_schema(db.engine, target=target)
+        descriptions = {step.version: step.description for step in MIGRATIONS}
+        for version in applied:
+            click.echo(f'Applied migration {version}: {descriptions[version]}')
+        if not applied:
+            click.echo('Database schema is up to date.')
+
+    @app.cli.command('db-status')
+    @click.option('--plans', is_flag=True,
+                  help='Show the query plans the migrations are meant to fix and those of the hot queries.')
+    def db_status_command(plans):
+        """Show the schema version, pending migrations and unindexed foreign keys."""
+        from src.models import db
+        from src.services.hot_queries import HOT_QUERIES, explain, plan_problems
+        from src.services.schema import MIGRATIONS, full_scans, query_plan, schema_status
+
+        status = schema_status(db.engine)
+        click.echo(f"Schema version {status['version']} (latest {status['latest']})")
+        for version, description in status['pending']:
+            click.echo(f'  pending {version}: {description}')
+        for column in status['unindexed_foreign_keys']:
+            click.echo(f'  foreign key without index: {column}')
+
+        if plans:
+            with db.engine.connect() as connection:
+                for step in MIGRATIONS:
+                    for label, sql, params in step.plan_queries:
+                        plan = query_plan(connection, sql, params)
+                        marker = 'SCAN' if full_scans(plan) else 'ok'
+                        click.echo(f'  [{marker}] {label}: {"; ".join(plan)}')
+                for query in HOT_QUERIES.values():
+                    plan = explain(connection, query.build(**query.example))
+                    marker = 'SCAN' if plan_problems(plan, query.indexes) else 'ok'
+                    click.echo(f'  [{marker}] {query.name}: {"; ".join(plan)}')
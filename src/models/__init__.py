@@ -1,6 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from datetime import datetime, timedelta, timezone
 import json
+import secrets
+
+from src.services.normalization import normalized_card_key
 
 db = SQLAlchemy()
 
@@ -13,61 +17,76 @@ class Chapter(db.Model):
     target_language = db.Column(db.String(50), nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     
-    # Relationship to vocabulary cards
-    cards = db.relationship('VocabularyCard', backref='chapter', lazy=True, cascade='all, delete-orphan')
+    # Relationship to vocabulary cards (deleted by the database: ON DELETE CASCADE)
+    cards = db.relationship('VocabularyCard', backref='chapter', lazy=True, cascade='all, delete-orphan',
+                            passive_deletes=True)
     
     def get_success_rate(self):
         """Calculate success rate for this chapter"""
-        if not self.cards:
-            return 0
-        
-        total_reviews = sum(len(card.reviews) for card in self.cards)
+        from src.services.hot_queries import chapter_review_totals
+        total_reviews, successful_reviews = db.session.execute(chapter_review_totals(self.id)).one()
         if total_reviews == 0:
             return 0
-            
-        successful_reviews = sum(
-            len([r for r in card.reviews if r.correct]) 
-            for card in self.cards
-        )
         
         return round((successful_reviews / total_reviews) * 100, 1)
     
     def get_due_count(self):
         """Get count of cards due for review"""
-        now = datetime.now(timezone.utc)
-        return len([card for card in self.cards if card.is_due()])
+        from src.services.hot_queries import due_card_count
+        return db.session.scalar(due_card_count(self.id, datetime.now(timezone.utc)))
     
-    def to_dict(self):
+    def to_dict(self, stats=None):
+        """``stats`` from ``SRSService.calculate_stats_for_chapters`` saves the count queries"""
+        if stats is None:
+            from src.services.srs import SRSService
+            stats = SRSService.calculate_chapter_stats(self)
         return {
             'id': self.id,
             'name': self.name,
             'source_language': self.source_language,
             'target_language': self.target_language,
-            'card_count': len(self.cards),
-            'success_rate': self.get_success_rate(),
-            'due_count': self.get_due_count(),
+            'card_count': stats['total_cards'],
+            'success_rate': stats['success_rate'],
+            'due_count': stats['due_cards'],
             'created_at': self.created_at.isoformat()
         }
 
 class VocabularyCard(db.Model):
     __tablename__ = 'vocabulary_cards'
+    __table_args__ = (
+        # Duplicate lookups during bulk import are always scoped to a chapter
+        db.Index('ix_vocabulary_cards_chapter_normalized_key', 'chapter_id', 'normalized_key'),
+        # Keyset-paginated card list: one index per sort order (rowid is the implicit tie-breaker)
+        db.Index('ix_vocabulary_cards_chapter_id', 'chapter_id'),
+        db.Index('ix_vocabulary_cards_chapter_next_review', 'chapter_id', 'next_review'),
+        db.Index('ix_vocabulary_cards_chapter_box_level', 'chapter_id', 'box_level'),
+        db.Index('ix_vocabulary_cards_chapter_source_word', 'chapter_id', 'source_word'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     source_word = db.Column(db.String(200), nullable=False)
     target_word = db.Column(db.String(200), nullable=False)
     example_sentence = db.Column(db.Text)
     context_hint = db.Column(db.String(500), default='')  # Context or hint for the word pair
+    normalized_key = db.Column(db.String(500))  # normalized_card_key(source_word, target_word)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     
     # SRS fields
     box_level = db.Column(db.Integer, default=1)  # Leitner box (1-5)
     next_review = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)  # Index for due card queries
     
+    # Review counters, denormalized from review_history (see services/card_stats.py)
+    review_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    correct_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    lapse_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Wrong answers outside box 1
+    last_reviewed_at = db.Column(db.DateTime)
+    
     # Foreign key
-    chapter_id = db.Column(db.Integer, db.ForeignKey('chapters.id'), nullable=False)
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapters.id', ondelete='CASCADE'), nullable=False)
     
-    # Relationships
-    reviews = db.relationship('ReviewHistory', backref='card', lazy=True, cascade='all, delete-orphan')
+    # Relationships (reviews are deleted by the database: ON DELETE CASCADE)
+    reviews = db.relationship('ReviewHistory', backref='card', lazy=True, cascade='all, delete-orphan',
+                              passive_deletes=True)
     
     def is_due(self):
         """Check if card is due for review"""
@@ -85,6 +104,33 @@ class VocabularyCard(db.Model):
         from src.services.srs import SRSService
         self.box_level, self.next_review = SRSService.calculate_next_review(self.box_level, correct)
     
+    def record_review(self, correct, direction):
+        """Apply an answer: update SRS data, counters and review history.
+        
+        Counters are incremented with SQL expressions, so concurrent answers
+        for the same card never overwrite each other's counts.
+        """
+        from src.services.card_stats import is_lapse
+        lapsed = is_lapse(self.box_level, correct)
+        self.update_srs(correct)
+        
+        now = datetime.now(timezone.utc)
+        cls = type(self)
+        self.review_count = cls.review_count + 1
+        self.correct_count = cls.correct_count + (1 if correct else 0)
+        self.lapse_count = cls.lapse_count + (1 if lapsed else 0)
+        self.last_reviewed_at = now
+        
+        review = ReviewHistory(card_id=self.id, correct=correct, direction=direction, reviewed_at=now)
+        db.session.add(review)
+        return review
+    
+    def get_success_rate(self):
+        """Success rate of this card's answers in percent"""
+        if not self.review_count:
+            return 0
+        return round((self.correct_count / self.review_count) * 100, 1)
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -95,11 +141,36 @@ class VocabularyCard(db.Model):
             'box_level': self.box_level,
             'next_review': self.next_review.isoformat(),
             'is_due': self.is_due(),
+            'review_count': self.review_count,
+            'correct_count': self.correct_count,
+            'lapse_count': self.lapse_count,
+            'last_reviewed_at': self.last_reviewed_at.isoformat() if self.last_reviewed_at else None,
             'chapter_id': self.chapter_id
         }
 
+@event.listens_for(VocabularyCard, 'before_insert')
+@event.listens_for(VocabularyCard, 'before_update')
+def _set_normalized_key(mapper, connection, card):
+    """Keep the duplicate-detection key in sync with the word pair."""
+    card.normalized_key = normalized_card_key(card.source_word, card.target_word)
+
+@event.listens_for(VocabularyCard.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    """Create the FTS5 search index together with the cards table."""
+    from src.services.search import create_search_index
+    create_search_index(connection)
+
+@event.listens_for(VocabularyCard.__table__, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    from src.services.search import drop_search_index
+    drop_search_index(connection)
+
 class ReviewHistory(db.Model):
     __tablename__ = 'review_history'
+    __table_args__ = (
+        # A card's history in order: replaying answers, deleting a card
+        db.Index('ix_review_history_card_reviewed_at', 'card_id', 'reviewed_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     correct = db.Column(db.Boolean, nullable=False)
@@ -107,7 +178,7 @@ class ReviewHistory(db.Model):
     reviewed_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)  # Index for statistics queries
     
     # Foreign key
-    card_id = db.Column(db.Integer, db.ForeignKey('vocabulary_cards.id'), nullable=False)
+    card_id = db.Column(db.Integer, db.ForeignKey('vocabulary_cards.id', ondelete='CASCADE'), nullable=False)
     
     def to_dict(self):
         return {
@@ -140,4 +211,64 @@ class AppConfig(db.Model):
         return {
             'theming_enabled': self.theming_enabled,
             'theming_background': self.theming_background
-        }
\ No newline at end of file
+        }
+
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.String(32), primary_key=True, default=lambda: secrets.token_hex(16))
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, succeeded, failed
+    progress = db.Column(db.Integer, default=0)
+    total = db.Column(db.Integer)
+    message = db.Column(db.String(500))
+    params = db.Column(db.Text)  # JSON-encoded handler parameters
+    input_path = db.Column(db.String(500))  # Uploaded file the job reads from
+    result = db.Column(db.Text)  # JSON-encoded result summary
+    artifact_path = db.Column(db.String(500))  # Downloadable file produced by the job
+    artifact_name = db.Column(db.String(255))
+    artifact_mimetype = db.Column(db.String(100))
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # Renewed while a worker runs the job
+    finished_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime, index=True)  # Artifact and row are purged after this
+
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
+
+    def get_params(self):
+        return json.loads(self.params) if self.params else {}
+
+    def get_result(self):
+        return json.loads(self.result) if self.result else {}
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress or 0,
+            'total': self.total,
+            'message': self.message,
+            'result': self.get_result(),
+            'error': self.error,
+            'has_artifact': bool(self.artifact_path),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_data_version(target, connection, **kw):
+    """Create the data version counter once every table it watches exists."""
+    from src.services.http_cache import create_data_version
+    create_data_version(connection)
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_data_version(target, connection, **kw):
+    from src.services.http_cache import drop_data_version
+    drop_data_version(connection)
@@ -1,13 +1,26 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, send_from_directory, current_app, jsonify, abort
 from datetime import datetime
-from src.models import Chapter, VocabularyCard, ReviewHistory, AppConfig, db
+from sqlalchemy import func, select
+from src.models import Chapter, ReviewHistory, AppConfig, Job, VocabularyCard, db
 import json
 import io
-import zipfile
 from werkzeug.utils import secure_filename
-import tempfile
 import os
 
+from src.services.backup import create_temporary_snapshot, snapshot_filename
+from src.services.config_cache import get_cached_config, invalidate_config_cache
+from src.services.jobs import enqueue_job, recover_lost_jobs, save_job_input
+from src.services.profiling import (
+    DEFAULT_SAMPLE_INTERVAL,
+    DEFAULT_SAMPLE_SECONDS,
+    MAX_PROFILED_REQUESTS,
+    MAX_SAMPLE_SECONDS,
+    MIN_SAMPLE_INTERVAL,
+    PROFILE_SUFFIXES,
+    get_profiler,
+    profiling_token_required,
+)
+from src.services.transfer import build_chapter_export
 from src.services.theming import (
     delete_background_image,
     get_theming_folder,
@@ -20,7 +33,7 @@ admin_bp = Blueprint('admin', __name__)
 def admin_dashboard():
     """Admin dashboard showing export/import options"""
     chapters = Chapter.query.all()
-    config = AppConfig.get_config()
+    config = get_cached_config(current_app)
     background_url = None
     if config.theming_background:
         background_url = url_for('main.theming_background', filename=config.theming_background)
@@ -28,7 +41,10 @@ def admin_dashboard():
     
     # Calculate overall statistics
     total_chapters = len(chapters)
-    total_cards = sum(len(chapter.cards) for chapter in chapters)
+    card_counts = dict(db.session.execute(
+        select(VocabularyCard.chapter_id, func.count()).group_by(VocabularyCard.chapter_id)
+    ).all())
+    total_cards = sum(card_counts.values())
     total_reviews = ReviewHistory.query.count()
     
     stats = {
@@ -40,6 +56,7 @@ def admin_dashboard():
     return render_template(
         'admin/dashboard.html',
         chapters=chapters,
+        card_counts=card_counts,
         stats=stats,
         theming_config=config,
         background_url=background_url,
@@ -63,6 +80,7 @@ def theming_settings():
             config.theming_background = None
             config.theming_enabled = False
             db.session.commit()
+            invalidate_config_cache(current_app)
             flash('Background image removed and theming disabled.', 'success')
             return redirect(url_for('admin.theming_settings'))
 
@@ -77,12 +95,14 @@ def theming_settings():
                 flash(str(exc), 'error')
                 return redirect(url_for('admin.theming_settings'))
 
-            delete_background_image(current_app, config.theming_background)
+            if config.theming_background != new_filename:
+                delete_background_image(current_app, config.theming_background)
             config.theming_background = new_filename
             background_url = url_for('main.theming_background', filename=config.theming_background)
 
         config.theming_enabled = enable_theming and bool(config.theming_background)
         db.session.commit()
+        invalidate_config_cache(current_app)
 
         if enable_theming and not config.theming_background:
             flash('Upload a background image before enabling theming.', 'error')
@@ -104,42 +124,7 @@ def theming_settings():
 def export_chapter(chapter_id):
     """Export a single chapter with all its data"""
     chapter = Chapter.query.get_or_404(chapter_id)
-    
-    # Prepare chapter data
-    chapter_data = {
-        'chapter': {
-            'name': chapter.name,
-            'source_language': chapter.source_language,
-            'target_language': chapter.target_language,
-            'created_at': chapter.created_at.isoformat() if chapter.created_at else None
-        },
-        'cards': [],
-        'review_history': []
-    }
-    
-    # Add vocabulary cards
-    for card in chapter.cards:
-        card_data = {
-            'source_word': card.source_word,
-            'target_word': card.target_word,
-            'example_sentence': card.example_sentence,
-            'context_hint': card.context_hint,
-            'box_level': card.box_level,
-            'next_review': card.next_review.isoformat() if card.next_review else None
-        }
-        chapter_data['cards'].append(card_data)
-        
-        # Add review history for this card
-        reviews = ReviewHistory.query.filter_by(card_id=card.id).all()
-        for review in reviews:
-            review_data = {
-                'card_source_word': card.source_word,  # For reference during import
-                'card_target_word': card.target_word,  # For reference during import
-                'review_date': review.reviewed_at.isoformat(),
-                'correct': review.correct,
-                'direction': review.direction
-            }
-            chapter_data['review_history'].append(review_data)
+    chapter_data = build_chapter_export(chapter)
     
     # Create JSON response
     filename = f"wordup_chapter_{secure_filename(chapter.name)}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
@@ -155,70 +140,44 @@ def export_chapter(chapter_id):
         mimetype='application/json'
     )
 
-@admin_bp.route('/export/all')
+@admin_bp.route('/export/all', methods=['POST'])
 def export_all_data():
-    """Export all chapters and data as a ZIP file"""
-    chapters = Chapter.query.all()
-    
-    # Create ZIP file in memory
-    zip_buffer = io.BytesIO()
-    
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for chapter in chapters:
-            # Prepare chapter data (same as single export)
-            chapter_data = {
-                'chapter': {
-                    'name': chapter.name,
-                    'source_language': chapter.source_language,
-                    'target_language': chapter.target_language,
-                    'created_at': chapter.created_at.isoformat() if chapter.created_at else None
-                },
-                'cards': [],
-                'review_history': []
-            }
-            
-            # Add vocabulary cards and reviews
-            for card in chapter.cards:
-                card_data = {
-                    'source_word': card.source_word,
-                    'target_word': card.target_word,
-                    'example_sentence': card.example_sentence,
-                    'context_hint': card.context_hint,
-                    'box_level': card.box_level,
-                    'next_review': card.next_review.isoformat() if card.next_review else None
-                }
-                chapter_data['cards'].append(card_data)
-                
-                # Add review history
-                reviews = ReviewHistory.query.filter_by(card_id=card.id).all()
-                for review in reviews:
-                    review_data = {
-                        'card_source_word': card.source_word,
-                        'card_target_word': card.target_word,
-                        'review_date': review.reviewed_at.isoformat(),
-                        'correct': review.correct,
-                        'direction': review.direction
-                    }
-                    chapter_data['review_history'].append(review_data)
-            
-            # Add to ZIP
-            json_data = json.dumps(chapter_data, indent=2, ensure_ascii=False)
-            filename = f"chapter_{secure_filename(chapter.name)}.json"
-            zip_file.writestr(filename, json_data.encode('utf-8'))
-    
-    # Rewind buffer to beginning for reading
-    zip_buffer.seek(0)
-    
-    return send_file(
-        zip_buffer,
+    """Queue a ZIP export of all chapters and data"""
+    job = enqueue_job(current_app, 'export_all')
+    return redirect(url_for('admin.job_status', job_id=job.id))
+
+@admin_bp.route('/near-duplicates', methods=['POST'])
+def near_duplicates():
+    """Queue a near-duplicate report for one chapter or all cards"""
+    chapter_id = request.form.get('chapter_id', type=int)
+    if chapter_id:
+        Chapter.query.get_or_404(chapter_id)
+    job = enqueue_job(current_app, 'near_duplicates', params={'chapter_id': chapter_id})
+    return redirect(url_for('admin.job_status', job_id=job.id))
+
+@admin_bp.route('/backup/snapshot')
+def download_snapshot():
+    """Download a consistent SQLite snapshot of the live database"""
+    compact = request.args.get('compact') == '1'
+    try:
+        snapshot_path = create_temporary_snapshot(current_app, compact=compact)
+    except ValueError as e:
+        flash(f'Snapshot failed: {str(e)}', 'error')
+        return redirect(url_for('admin.admin_dashboard'))
+
+    response = send_file(
+        snapshot_path,
         as_attachment=True,
-        download_name=f"wordup_full_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
-        mimetype='application/zip'
+        download_name=snapshot_filename(compact),
+        mimetype='application/vnd.sqlite3',
+        conditional=False
     )
+    response.call_on_close(lambda: os.path.exists(snapshot_path) and os.remove(snapshot_path))
+    return response
 
 @admin_bp.route('/import', methods=['GET', 'POST'])
 def import_data():
-    """Import chapter data from JSON file"""
+    """Queue an import of chapter data from a JSON or ZIP file"""
     if request.method == 'POST':
         if 'file' not in request.files:
             flash('No file selected', 'error')
@@ -233,127 +192,86 @@ def import_data():
             flash('Please upload a JSON or ZIP file', 'error')
             return redirect(request.url)
         
-        try:
-            if file.filename and file.filename.lower().endswith('.zip'):
-                # Handle ZIP file import
-                import_count = _import_zip_file(file)
-                flash(f'Successfully imported {import_count} chapters from ZIP file', 'success')
-            else:
-                # Handle single JSON file import
-                _import_json_file(file)
-                flash('Chapter imported successfully', 'success')
-                
-        except Exception as e:
-            flash(f'Import failed: {str(e)}', 'error')
-            db.session.rollback()
-        
-        return redirect(url_for('admin.admin_dashboard'))
+        input_path = save_job_input(current_app, file)
+        job = enqueue_job(current_app, 'import_data',
+                          params={'filename': file.filename,
+                                  'check_near_duplicates': bool(request.form.get('check_near_duplicates'))},
+                          input_path=input_path)
+        return redirect(url_for('admin.job_status', job_id=job.id))
     
     return render_template('admin/import.html')
 
-def _import_json_file(file):
-    """Import a single JSON file"""
-    data = json.load(file)
-    
-    # Validate data structure
-    if 'chapter' not in data or 'cards' not in data:
-        raise ValueError('Invalid file format: missing chapter or cards data')
-    
-    chapter_info = data['chapter']
-    
-    # Check if chapter already exists
-    existing_chapter = Chapter.query.filter_by(
-        name=chapter_info['name'],
-        source_language=chapter_info['source_language'],
-        target_language=chapter_info['target_language']
-    ).first()
-    
-    if existing_chapter:
-        raise ValueError(f'Chapter "{chapter_info["name"]}" already exists')
+@admin_bp.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Show progress and result of a background job"""
+    job = Job.query.get_or_404(job_id)
+    return render_template('admin/job.html', job=job, params=job.get_params(), result=job.get_result())
+
+@admin_bp.route('/jobs/<job_id>/status')
+def job_status_api(job_id):
+    """Job progress for polling (JSON)"""
+    job = Job.query.get_or_404(job_id)
+    if not job.is_finished and recover_lost_jobs(current_app):
+        db.session.refresh(job)
+    return jsonify(job.to_dict())
+
+@admin_bp.route('/jobs/<job_id>/download')
+def job_download(job_id):
+    """Download the artifact produced by a finished job"""
+    job = Job.query.get_or_404(job_id)
+    if job.status != 'succeeded' or not job.artifact_path or not os.path.exists(job.artifact_path):
+        abort(404)
     
-    # Create new chapter
-    chapter = Chapter(
-        name=chapter_info['name'],
-        source_language=chapter_info['source_language'],
-        target_language=chapter_info['target_language']
+    return send_file(
+        job.artifact_path,
+        as_attachment=True,
+        download_name=job.artifact_name,
+        mimetype=job.artifact_mimetype
     )
-    
-    if chapter_info.get('created_at'):
-        try:
-            chapter.created_at = datetime.fromisoformat(chapter_info['created_at'])
-        except:
-            pass  # Use default if parsing fails
-    
-    db.session.add(chapter)
-    db.session.flush()  # Get the chapter ID
-    
-    # Import vocabulary cards
-    card_mapping = {}  # Map old card identifiers to new card objects
-    
-    for card_data in data['cards']:
-        card = VocabularyCard(
-            chapter_id=chapter.id,
-            source_word=card_data['source_word'],
-            target_word=card_data['target_word'],
-            example_sentence=card_data.get('example_sentence', ''),
-            context_hint=card_data.get('context_hint', ''),
-            box_level=card_data.get('box_level', 1)
-        )
-        
-        if card_data.get('next_review'):
-            try:
-                card.next_review = datetime.fromisoformat(card_data['next_review'])
-            except:
-                pass  # Use default if parsing fails
-        
-        db.session.add(card)
-        
-        # Store mapping for review history
-        card_key = f"{card_data['source_word']}:{card_data['target_word']}"
-        card_mapping[card_key] = card
-    
-    db.session.flush()  # Get card IDs
-    
-    # Import review history if available
-    if 'review_history' in data:
-        for review_data in data['review_history']:
-            card_key = f"{review_data['card_source_word']}:{review_data['card_target_word']}"
-            if card_key in card_mapping:
-                card = card_mapping[card_key]
-                
-                review = ReviewHistory(
-                    card_id=card.id,
-                    correct=review_data['correct'],
-                    direction=review_data.get('direction', 'source_to_target')
-                )
-                
-                if review_data.get('review_date'):
-                    try:
-                        review.reviewed_at = datetime.fromisoformat(review_data['review_date'])
-                    except:
-                        pass  # Use default if parsing fails
-                
-                db.session.add(review)
-    
-    db.session.commit()
 
-def _import_zip_file(file):
-    """Import multiple chapters from a ZIP file"""
-    import_count = 0
+@admin_bp.route('/profiling')
+@profiling_token_required
+def profiling_status():
+    """Profiling state of the answering worker and the saved profiles (JSON)"""
+    profiler = get_profiler(current_app)
+    return jsonify(dict(profiler.status(), files=profiler.files()))
+
+@admin_bp.route('/profiling/requests', methods=['POST'])
+@profiling_token_required
+def profile_requests():
+    """Run the next requests to an endpoint under cProfile"""
+    endpoint = request.values.get('endpoint', '')
+    count = request.values.get('count', 1, type=int)
+    if endpoint not in current_app.view_functions:
+        return jsonify({'error': f'Unknown endpoint: {endpoint}'}), 400
+    if not 1 <= count <= MAX_PROFILED_REQUESTS:
+        return jsonify({'error': f'count must be between 1 and {MAX_PROFILED_REQUESTS}'}), 400
     
-    with zipfile.ZipFile(file, 'r') as zip_file:
-        for filename in zip_file.namelist():
-            if filename.endswith('.json'):
-                with zip_file.open(filename) as json_file:
-                    json_data = json_file.read().decode('utf-8')
-                    # Create a file-like object for the JSON data
-                    json_file_obj = io.StringIO(json_data)
-                    
-                    try:
-                        _import_json_file(json_file_obj)
-                        import_count += 1
-                    except ValueError as e:
-                        # Skip chapters that already exist or have errors
-                        continue
+    profiler = get_profiler(current_app)
+    profiler.arm(endpoint, count)
+    return jsonify(profiler.status()), 202
+
+@admin_bp.route('/profiling/sample', methods=['POST'])
+@profiling_token_required
+def sample_stacks():
+    """Sample the stacks of all threads of the answering worker for a while"""
+    seconds = request.values.get('seconds', DEFAULT_SAMPLE_SECONDS, type=float)
+    interval = request.values.get('interval_ms', DEFAULT_SAMPLE_INTERVAL * 1000, type=float) / 1000
+    if not 0 < seconds <= MAX_SAMPLE_SECONDS:
+        return jsonify({'error': f'seconds must be between 0 and {MAX_SAMPLE_SECONDS}'}), 400
+    interval = max(interval, MIN_SAMPLE_INTERVAL)
     
-    return import_count
\ No newline at end of file
+    profiler = get_profiler(current_app)
+    try:
+        profiler.start_sampler(seconds, interval)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(profiler.status()), 202
+
+@admin_bp.route('/profiling/files/<filename>')
+@profiling_token_required
+def profile_download(filename):
+    """Download a saved .pstats or .collapsed file"""
+    if not filename.endswith(PROFILE_SUFFIXES):
+        abort(404)
+    return send_from_directory(get_profiler(current_app).folder, filename, as_attachment=True)
@@ -0,0 +1,38 @@
+from flask import Blueprint, abort, current_app, request, url_for
+
+from src.services.assets import ASSET_MAX_AGE, get_asset_manifest
+
+assets_bp = Blueprint('assets', __name__)
+
+
+def asset_url(filename):
+    """URL of a static file under its content-hashed name (template global)."""
+    asset = get_asset_manifest(current_app).get(filename)
+    if asset is None:
+        return url_for('static', filename=filename)
+    return url_for('assets.asset', filename=asset.hashed_name)
+
+
+@assets_bp.route('/<path:filename>')
+def asset(filename):
+    """Serve a fingerprinted static file, gzip-compressed when accepted."""
+    asset = get_asset_manifest(current_app).lookup(filename)
+    if asset is None:
+        abort(404)
+
+    use_gzip = asset.gzipped is not None and request.accept_encodings['gzip'] > 0
+    # Each encoding is a different representation with its own strong ETag
+    etag = f'{asset.etag}-gz' if use_gzip else asset.etag
+    headers = {
+        'Cache-Control': f'public, max-age={ASSET_MAX_AGE}, immutable',
+        'Vary': 'Accept-Encoding',
+        'ETag': f'"{etag}"',
+    }
+    if request.if_none_match.contains(etag):
+        return current_app.response_class(status=304, headers=headers)
+
+    response = current_app.response_class(asset.gzipped if use_gzip else asset.data,
+                                          mimetype=asset.mimetype, headers=headers)
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
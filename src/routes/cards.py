@@ -1,17 +1,100 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from datetime import datetime
-from src.models import Chapter, VocabularyCard, db
+import io
+from sqlalchemy import delete
+from sqlalchemy.orm import joinedload
+from werkzeug.datastructures import FileStorage
+from src.models import Chapter, ReviewHistory, VocabularyCard, db
+from src.services.database import deletes_cascade
+from src.services.card_listing import DEFAULT_PAGE_SIZE, InvalidCursor, fetch_card_page, parse_card_filters
+from src.services.http_cache import conditional_page
+from src.services.jobs import enqueue_job, save_job_input
+from src.services.search import DEFAULT_SEARCH_LIMIT, chapter_names, search_cards
 from src.services.srs import SRSService
+from src.services.writer import run_write
 
 cards_bp = Blueprint('cards', __name__)
 
+
+def _create_card(values):
+    card = VocabularyCard(**values)
+    db.session.add(card)
+    db.session.flush()
+    return card.id
+
+
+def _update_card(card_id, values):
+    card = db.session.get(VocabularyCard, card_id)
+    for key, value in values.items():
+        setattr(card, key, value)
+
+
+def _delete_card(card_id):
+    card = db.session.get(VocabularyCard, card_id)
+    if card is not None:
+        # The database deletes the history through ON DELETE CASCADE, so the
+        # reviews are never loaded; without enforced foreign keys it is one statement
+        if not deletes_cascade(current_app, db.engine):
+            db.session.execute(delete(ReviewHistory).where(ReviewHistory.card_id == card.id))
+        db.session.delete(card)
+
+
 @cards_bp.route('/chapter/<int:chapter_id>')
+@conditional_page
 def list_cards(chapter_id):
-    """List all cards in a chapter"""
+    """List the first page of cards in a chapter"""
     chapter = Chapter.query.get_or_404(chapter_id)
-    cards = VocabularyCard.query.filter_by(chapter_id=chapter_id).all()
+    filters = parse_card_filters(request.args)
+    cards, next_cursor = fetch_card_page(chapter_id, filters)
+    
+    return render_template('cards/list.html', chapter=chapter, cards=cards,
+                           filters=filters, next_cursor=next_cursor)
+
+@cards_bp.route('/chapter/<int:chapter_id>/page')
+@conditional_page
+def card_page(chapter_id):
+    """Next page of cards for infinite scroll (HTML fragment or JSON)"""
+    chapter = Chapter.query.get_or_404(chapter_id)
+    filters = parse_card_filters(request.args)
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    
+    try:
+        cards, next_cursor = fetch_card_page(chapter.id, filters,
+                                             cursor=request.args.get('cursor'), limit=limit)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if request.args.get('format') == 'json':
+        return jsonify({'cards': [card.to_dict() for card in cards], 'next_cursor': next_cursor})
+    
+    html = render_template('cards/_card_items.html', cards=cards)
+    return jsonify({'html': html, 'next_cursor': next_cursor, 'count': len(cards)})
+
+@cards_bp.route('/search')
+def search():
+    """Full-text search across all chapters or within one chapter"""
+    query = request.args.get('q', '').strip()
+    chapter_id = request.args.get('chapter_id', type=int)
+    limit = request.args.get('limit', DEFAULT_SEARCH_LIMIT, type=int)
     
-    return render_template('cards/list.html', chapter=chapter, cards=cards)
+    results = search_cards(query, chapter_id=chapter_id, limit=limit) if query else []
+    names = chapter_names(card.chapter_id for card, _ in results)
+    
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'query': query,
+            'chapter_id': chapter_id,
+            'results': [
+                dict(card.to_dict(), chapter_name=names.get(card.chapter_id), score=score)
+                for card, score in results
+            ]
+        })
+    
+    chapters = db.session.execute(
+        db.select(Chapter.id, Chapter.name).order_by(Chapter.name)
+    ).all()
+    return render_template('cards/search.html', query=query, chapter_id=chapter_id,
+                           results=results, chapter_names=names, chapters=chapters)
 
 @cards_bp.route('/chapter/<int:chapter_id>/new', methods=['GET', 'POST'])
 def new_card(chapter_id):
@@ -28,18 +111,15 @@ def new_card(chapter_id):
             flash('Source and target words are required', 'error')
             return render_template('cards/form.html', chapter=chapter)
         
-        card = VocabularyCard(
-            source_word=source_word,
-            target_word=target_word,
-            example_sentence=example_sentence if example_sentence else None,
-            context_hint=context_hint if context_hint else '',
-            chapter_id=chapter_id,
-            box_level=1,
-            next_review=datetime.utcnow()
-        )
-        
-        db.session.add(card)
-        db.session.commit()
+        run_write(_create_card, {
+            'source_word': source_word,
+            'target_word': target_word,
+            'example_sentence': example_sentence if example_sentence else None,
+            'context_hint': context_hint if context_hint else '',
+            'chapter_id': chapter_id,
+            'box_level': 1,
+            'next_review': datetime.utcnow()
+        })
         
         flash(f'Card "{source_word} → {target_word}" created successfully', 'success')
         return redirect(url_for('cards.list_cards', chapter_id=chapter_id))
@@ -47,27 +127,31 @@ def new_card(chapter_id):
     return render_template('cards/form.html', chapter=chapter)
 
 @cards_bp.route('/<int:card_id>')
+@conditional_page
 def view_card(card_id):
     """View card details"""
-    card = VocabularyCard.query.get_or_404(card_id)
+    card = VocabularyCard.query.options(joinedload(VocabularyCard.chapter)).populate_existing().get_or_404(card_id)
     return render_template('cards/detail.html', card=card)
 
 @cards_bp.route('/<int:card_id>/edit', methods=['GET', 'POST'])
 def edit_card(card_id):
     """Edit vocabulary card"""
-    card = VocabularyCard.query.get_or_404(card_id)
+    card = VocabularyCard.query.options(joinedload(VocabularyCard.chapter)).populate_existing().get_or_404(card_id)
     
     if request.method == 'POST':
-        card.source_word = request.form.get('source_word', '').strip()
-        card.target_word = request.form.get('target_word', '').strip()
-        card.example_sentence = request.form.get('example_sentence', '').strip() or None
-        card.context_hint = request.form.get('context_hint', '').strip()
-        
-        if not all([card.source_word, card.target_word]):
+        values = {
+            'source_word': request.form.get('source_word', '').strip(),
+            'target_word': request.form.get('target_word', '').strip(),
+            'example_sentence': request.form.get('example_sentence', '').strip() or None,
+            'context_hint': request.form.get('context_hint', '').strip()
+        }
+        if not all([values['source_word'], values['target_word']]):
+            for key, value in values.items():
+                setattr(card, key, value)
             flash('Source and target words are required', 'error')
             return render_template('cards/form.html', card=card)
         
-        db.session.commit()
+        run_write(_update_card, card.id, values)
         flash('Card updated successfully', 'success')
         return redirect(url_for('cards.view_card', card_id=card.id))
     
@@ -79,61 +163,36 @@ def delete_card(card_id):
     card = VocabularyCard.query.get_or_404(card_id)
     chapter_id = card.chapter_id
     
-    db.session.delete(card)
-    db.session.commit()
+    run_write(_delete_card, card.id)
     
     flash('Card deleted successfully', 'success')
     return redirect(url_for('cards.list_cards', chapter_id=chapter_id))
 
 @cards_bp.route('/bulk-import/chapter/<int:chapter_id>', methods=['GET', 'POST'])
 def bulk_import(chapter_id):
-    """Bulk import cards from text"""
+    """Bulk import cards from text (processed as a background job)"""
     chapter = Chapter.query.get_or_404(chapter_id)
     
     if request.method == 'POST':
         text_data = request.form.get('text_data', '').strip()
-        
-        if not text_data:
-            flash('Please provide card data', 'error')
-            return render_template('cards/bulk_import.html', chapter=chapter)
+        text_file = request.files.get('text_file')
         
         # Parse format: "source_word | target_word | example_sentence | context_hint"
-        lines = text_data.split('\n')
-        imported_count = 0
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            parts = [part.strip() for part in line.split('|')]
-            if len(parts) < 2:
-                continue
-                
-            source_word = parts[0]
-            target_word = parts[1]
-            example_sentence = parts[2] if len(parts) > 2 and parts[2] else None
-            context_hint = parts[3] if len(parts) > 3 and parts[3] else ''
-            
-            card = VocabularyCard(
-                source_word=source_word,
-                target_word=target_word,
-                example_sentence=example_sentence,
-                context_hint=context_hint,
-                chapter_id=chapter_id,
-                box_level=1,
-                next_review=datetime.utcnow()
-            )
-            
-            db.session.add(card)
-            imported_count += 1
-        
-        if imported_count > 0:
-            db.session.commit()
-            flash(f'Successfully imported {imported_count} cards', 'success')
+        if text_file and text_file.filename:
+            # Large lists are uploaded as a file and streamed to disk
+            input_path = save_job_input(current_app, text_file)
+        elif text_data:
+            input_path = save_job_input(current_app, FileStorage(
+                stream=io.BytesIO(text_data.encode('utf-8')), filename='bulk_import.txt'
+            ))
         else:
-            flash('No valid cards found to import', 'warning')
+            flash('Please provide card data', 'error')
+            return render_template('cards/bulk_import.html', chapter=chapter)
         
-        return redirect(url_for('cards.list_cards', chapter_id=chapter_id))
+        job = enqueue_job(current_app, 'bulk_import',
+                          params={'chapter_id': chapter_id,
+                                  'check_near_duplicates': bool(request.form.get('check_near_duplicates'))},
+                          input_path=input_path)
+        return redirect(url_for('admin.job_status', job_id=job.id))
     
     return render_template('cards/bulk_import.html', chapter=chapter)
\ No newline at end of file
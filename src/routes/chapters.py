@@ -1,19 +1,22 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
-from datetime import datetime
-from src.models import Chapter, VocabularyCard, db
+from src.models import Chapter, db
+from src.services.chapter_maintenance import delete_chapter_and_cards, reset_chapter_progress
+from src.services.http_cache import conditional_page
 from src.services.srs import SRSService
 
 chapters_bp = Blueprint('chapters', __name__)
 
 @chapters_bp.route('/')
+@conditional_page
 def list_chapters():
     """List all chapters"""
     chapters = Chapter.query.all()
+    all_stats = SRSService.calculate_stats_for_chapters([chapter.id for chapter in chapters])
     chapter_data = []
     
     for chapter in chapters:
-        stats = SRSService.calculate_chapter_stats(chapter)
-        data = chapter.to_dict()
+        stats = all_stats[chapter.id]
+        data = chapter.to_dict(stats)
         data.update(stats)
         chapter_data.append(data)
     
@@ -46,12 +49,10 @@ def new_chapter():
     return render_template('chapters/form.html')
 
 @chapters_bp.route('/<int:chapter_id>')
+@conditional_page
 def view_chapter(chapter_id):
     """View chapter details"""
-    from sqlalchemy.orm import joinedload
-    chapter = Chapter.query.options(
-        joinedload(Chapter.cards).joinedload(VocabularyCard.reviews)
-    ).get_or_404(chapter_id)
+    chapter = Chapter.query.get_or_404(chapter_id)
     stats = SRSService.calculate_chapter_stats(chapter)
     
     return render_template('chapters/detail.html', chapter=chapter, stats=stats)
@@ -78,8 +79,8 @@ def delete_chapter(chapter_id):
     chapter = Chapter.query.get_or_404(chapter_id)
     chapter_name = chapter.name
     
-    db.session.delete(chapter)
-    db.session.commit()
+    # Deleted in chunks with set-based statements, not loaded and deleted one by one
+    delete_chapter_and_cards(chapter.id)
     
     flash(f'Chapter "{chapter_name}" deleted successfully', 'success')
     return redirect(url_for('chapters.list_chapters'))
@@ -87,19 +88,11 @@ def delete_chapter(chapter_id):
 @chapters_bp.route('/<int:chapter_id>/reset-stats', methods=['POST'])
 def reset_chapter_stats(chapter_id):
     """Reset all statistics for a chapter"""
-    from sqlalchemy.orm import joinedload
-    chapter = Chapter.query.options(
-        joinedload(Chapter.cards).joinedload(VocabularyCard.reviews)
-    ).get_or_404(chapter_id)
+    chapter = Chapter.query.get_or_404(chapter_id)
+    chapter_name = chapter.name
     
-    # Reset all cards to box 1 and clear review history
-    for card in chapter.cards:
-        card.box_level = 1
-        card.next_review = datetime.utcnow()
-        # Clear review history
-        for review in card.reviews:
-            db.session.delete(review)
+    # Reset all cards to box 1 and clear review history, in chunks
+    reset_chapter_progress(chapter.id)
     
-    db.session.commit()
-    flash(f'Statistics reset for chapter "{chapter.name}"', 'success')
-    return redirect(url_for('chapters.view_chapter', chapter_id=chapter.id))
\ No newline at end of file
+    flash(f'Statistics reset for chapter "{chapter_name}"', 'success')
+    return redirect(url_for('chapters.view_chapter', chapter_id=chapter_id))
\ No newline at end of file
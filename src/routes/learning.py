@@ -1,7 +1,11 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session
 from datetime import datetime
-from src.models import Chapter, VocabularyCard, ReviewHistory, db
+from sqlalchemy.orm import joinedload
+from src.models import Chapter, VocabularyCard
+from src.services.card_stats import record_answer
+from src.services.metrics import ANSWERS, LEARNING_SESSIONS
 from src.services.srs import SRSService
+from src.services.writer import PRIORITY_ANSWER, run_write
 import random
 
 learning_bp = Blueprint('learning', __name__)
@@ -10,17 +14,12 @@ learning_bp = Blueprint('learning', __name__)
 def start_session(chapter_id):
     """Start learning session setup"""
     chapter = Chapter.query.get_or_404(chapter_id)
-    due_count = chapter.get_due_count()
-    
-    # Calculate box distribution for display
-    box_distribution = {}
-    for i in range(1, 6):
-        box_distribution[i] = len([card for card in chapter.cards if card.box_level == i])
+    stats = SRSService.calculate_chapter_stats(chapter)
     
     return render_template('learning/setup.html', 
                          chapter=chapter, 
-                         due_count=due_count,
-                         box_distribution=box_distribution)
+                         due_count=stats['due_cards'],
+                         box_distribution=stats['box_distribution'])
 
 @learning_bp.route('/chapter/<int:chapter_id>/session', methods=['POST'])
 def create_session(chapter_id):
@@ -36,7 +35,7 @@ def create_session(chapter_id):
     
     if practice_mode == 'all_cards':
         # Get all cards from the chapter
-        all_cards = list(chapter.cards)
+        all_cards = VocabularyCard.query.filter_by(chapter_id=chapter.id).all()
         random.shuffle(all_cards)
         queue = all_cards[:limit]
         # Set direction for each card
@@ -48,7 +47,7 @@ def create_session(chapter_id):
     elif practice_mode == 'box_specific':
         # Get cards from specific box level
         box_level = int(request.form.get('box_level', 1))
-        box_cards = [card for card in chapter.cards if card.box_level == box_level]
+        box_cards = VocabularyCard.query.filter_by(chapter_id=chapter.id, box_level=box_level).all()
         random.shuffle(box_cards)
         queue = box_cards[:limit]
         # Set direction for each card
@@ -121,6 +120,7 @@ def create_session(chapter_id):
         'wrong_cards': [],  # Track wrong cards for recap mode
         'is_recap': False   # Flag to identify recap sessions
     }
+    LEARNING_SESSIONS.inc(kind='regular')
     
     return redirect(url_for('learning.review_card'))
 
@@ -142,7 +142,7 @@ def review_card():
     card_id = card_info['card_id']
     presentation_mode = card_info['mode']
     
-    card = VocabularyCard.query.get_or_404(card_id)
+    card = VocabularyCard.query.options(joinedload(VocabularyCard.chapter)).populate_existing().get_or_404(card_id)
     
     # Determine direction and question/answer based on presentation mode / stored direction
     stored_direction = card_info.get('direction')
@@ -207,18 +207,8 @@ def submit_answer():
     # Only update SRS data for word mode and non-recap sessions.
     # Context mode and recap sessions never impact SRS scheduling.
     if direction != 'context' and not is_recap:
-        # Update SRS data
-        card.update_srs(correct)
-        
-        # Record review history
-        review = ReviewHistory(
-            card_id=card.id,
-            correct=correct,
-            direction=direction
-        )
-        
-        db.session.add(review)
-        db.session.commit()
+        # Update SRS data, review counters and history
+        run_write(record_answer, card.id, correct, direction, priority=PRIORITY_ANSWER)
     
     # Update session data
     if correct:
@@ -236,6 +226,7 @@ def submit_answer():
     
     session_data['current_index'] += 1
     session['learning_session'] = session_data
+    ANSWERS.inc(result='correct' if correct else 'incorrect')
     
     return jsonify({'success': True})
 
@@ -301,6 +292,7 @@ def start_recap(chapter_id):
         'wrong_cards': [],
         'is_recap': True
     }
+    LEARNING_SESSIONS.inc(kind='recap')
     
     flash(f'Recapping {len(wrong_cards)} card(s) you got wrong', 'info')
     return redirect(url_for('learning.review_card'))
@@ -332,14 +324,7 @@ def api_submit_answer():
 
         # Only update SRS data for word mode and non-recap sessions
         if direction != 'context' and not is_recap:
-            card.update_srs(correct)
-            review = ReviewHistory(
-                card_id=card.id,
-                correct=correct,
-                direction=direction
-            )
-            db.session.add(review)
-            db.session.commit()
+            run_write(record_answer, card.id, correct, direction, priority=PRIORITY_ANSWER)
 
         # Track results & wrong answers
         if correct:
@@ -356,4 +341,5 @@ def api_submit_answer():
         session_data['current_index'] += 1
         session['learning_session'] = session_data
     
+    ANSWERS.inc(result='correct' if correct else 'incorrect')
     return jsonify({'success': True})
\ No newline at end of file
@@ -1,27 +1,34 @@
+import mimetypes
 import os
 
-from flask import Blueprint, render_template, send_from_directory, current_app, abort
-from src.models import Chapter, db, AppConfig
+from flask import Blueprint, render_template, send_from_directory, current_app, abort, jsonify, request
+from src.models import Chapter, db
+from src.services.config_cache import get_cached_config
+from src.services.health import readiness
+from src.services.http_cache import conditional_page
+from src.services.metrics import CONTENT_TYPE, metrics_token_required, render_metrics
 from src.services.srs import SRSService
-from src.services.theming import get_theming_folder
+from src.services.theming import BACKGROUND_MAX_AGE, background_etag, get_theming_folder
 from src.__version__ import __version__, RELEASE_NAME, BUILD_DATE
 
 main_bp = Blueprint('main', __name__)
 
 @main_bp.route('/')
+@conditional_page
 def dashboard():
     """Main dashboard showing chapters and statistics"""
     chapters = Chapter.query.all()
+    all_stats = SRSService.calculate_stats_for_chapters([chapter.id for chapter in chapters])
     
     # Calculate overall statistics
-    total_cards = sum(len(chapter.cards) for chapter in chapters)
-    total_due = sum(chapter.get_due_count() for chapter in chapters)
+    total_cards = sum(stats['total_cards'] for stats in all_stats.values())
+    total_due = sum(stats['due_cards'] for stats in all_stats.values())
     
     # Get chapters with stats
     chapter_stats = []
     for chapter in chapters:
-        stats = SRSService.calculate_chapter_stats(chapter)
-        chapter_data = chapter.to_dict()
+        stats = all_stats[chapter.id]
+        chapter_data = chapter.to_dict(stats)
         chapter_data.update(stats)
         chapter_stats.append(chapter_data)
     
@@ -43,13 +50,50 @@ def help_page():
 
 @main_bp.route('/theming/background/<path:filename>')
 def theming_background(filename):
-    config = AppConfig.get_config()
+    config = get_cached_config(current_app)
     if not config.theming_background or filename != config.theming_background:
         abort(404)
 
+    etag = background_etag(filename)
     folder = get_theming_folder(current_app)
-    file_path = os.path.join(folder, filename)
-    if not os.path.exists(file_path):
-        abort(404)
+    offload = current_app.config.get('THEMING_OFFLOAD')
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    elif offload == 'x-accel-redirect':
+        # nginx serves the file from an internal location mapped to the theming folder
+        prefix = current_app.config.get('THEMING_X_ACCEL_PREFIX', '/_wordup_theming/')
+        response = current_app.response_class(mimetype=mimetypes.guess_type(filename)[0])
+        response.headers['X-Accel-Redirect'] = f"{prefix.rstrip('/')}/{filename}"
+    elif offload == 'x-sendfile':
+        response = current_app.response_class(mimetype=mimetypes.guess_type(filename)[0])
+        response.headers['X-Sendfile'] = os.path.join(folder, filename)
+    else:
+        # Handles Range and If-Range requests itself
+        response = send_from_directory(folder, filename, etag=etag, max_age=BACKGROUND_MAX_AGE)
+
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = BACKGROUND_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+
+@main_bp.route('/healthz')
+def healthz():
+    """Liveness: the process answers requests. Touches nothing else."""
+    return jsonify({'status': 'ok'}), 200, {'Cache-Control': 'no-store'}
+
+
+@main_bp.route('/readyz')
+def readyz():
+    """Readiness: database, writable folders and migrations (cached briefly)."""
+    result = readiness(current_app)
+    status = 200 if result['ready'] else 503
+    return jsonify(result), status, {'Cache-Control': 'no-store'}
+
 
-    return send_from_directory(folder, filename)
\ No newline at end of file
+@main_bp.route('/metrics')
+@metrics_token_required
+def metrics():
+    """Prometheus metrics of all worker processes."""
+    return render_metrics(), 200, {'Content-Type': CONTENT_TYPE, 'Cache-Control': 'no-store'}
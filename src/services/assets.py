@@ -0,0 +1,95 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from typing import Dict, Optional
+
+HASH_LENGTH = 12
+
+# Fingerprinted URLs change with the content, so caches may keep them forever
+ASSET_MAX_AGE = 365 * 24 * 60 * 60
+
+# Smaller files gain nothing from compression
+GZIP_MIN_SIZE = 512
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+_manifest_lock = threading.Lock()
+
+
+class Asset:
+    """One static file with its fingerprinted name and encoded bodies."""
+
+    __slots__ = ('filename', 'hashed_name', 'path', 'mtime', 'mimetype', 'data', 'gzipped', 'etag')
+
+    def __init__(self, folder: str, filename: str):
+        self.filename = filename
+        self.path = os.path.join(folder, filename)
+        self.mtime = os.path.getmtime(self.path)
+        with open(self.path, 'rb') as handle:
+            self.data = handle.read()
+
+        digest = hashlib.sha256(self.data).hexdigest()[:HASH_LENGTH]
+        stem, extension = os.path.splitext(filename)
+        self.hashed_name = f'{stem}.{digest}{extension}'
+        self.etag = digest
+        self.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+        self.gzipped = None
+        if len(self.data) >= GZIP_MIN_SIZE and self.mimetype.startswith(COMPRESSIBLE_TYPES):
+            # mtime=0 keeps the compressed bytes identical between builds
+            compressed = gzip.compress(self.data, compresslevel=9, mtime=0)
+            if len(compressed) < len(self.data):
+                self.gzipped = compressed
+
+
+class AssetManifest:
+    """Content-hashed names of every file in the static folder.
+
+    Files are read, hashed and gzip-compressed once when the manifest is
+    built, so serving an asset is a dictionary lookup.
+    """
+
+    def __init__(self, folder: str, auto_reload: bool = False):
+        self.folder = folder
+        self.auto_reload = auto_reload
+        self._by_name: Dict[str, Asset] = {}
+        self._by_hashed_name: Dict[str, Asset] = {}
+        for directory, _, files in os.walk(folder):
+            for name in sorted(files):
+                if name.startswith('.'):
+                    continue
+                filename = os.path.relpath(os.path.join(directory, name), folder).replace(os.sep, '/')
+                self._add(Asset(folder, filename))
+
+    def _add(self, asset: Asset) -> None:
+        previous = self._by_name.get(asset.filename)
+        if previous is not None:
+            self._by_hashed_name.pop(previous.hashed_name, None)
+        self._by_name[asset.filename] = asset
+        self._by_hashed_name[asset.hashed_name] = asset
+
+    def get(self, filename: str) -> Optional[Asset]:
+        asset = self._by_name.get(filename)
+        if self.auto_reload and (asset is None or os.path.getmtime(asset.path) != asset.mtime):
+            # Development: pick up edited files without a restart
+            if not os.path.isfile(os.path.join(self.folder, filename)):
+                return None
+            asset = Asset(self.folder, filename)
+            self._add(asset)
+        return asset
+
+    def lookup(self, hashed_name: str) -> Optional[Asset]:
+        return self._by_hashed_name.get(hashed_name)
+
+
+def get_asset_manifest(app) -> AssetManifest:
+    """Return the app's asset manifest, building it on first use."""
+    manifest = app.extensions.get('wordup_assets')
+    if manifest is None:
+        with _manifest_lock:
+            manifest = app.extensions.get('wordup_assets')
+            if manifest is None:
+                manifest = AssetManifest(app.static_folder, auto_reload=app.debug)
+                app.extensions['wordup_assets'] = manifest
+    return manifest
@@ -0,0 +1,197 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from typing import Optional
+
+from src.services.storage import get_data_folder, resolve_database_path
+
+# Pages copied per backup step on a rollback-journal database. Between steps
+# the source lock is released so writers (learning sessions, imports) can
+# commit while a snapshot is running.
+SNAPSHOT_PAGES_PER_STEP = 256
+SNAPSHOT_STEP_PAUSE = 0.005
+
+# A commit by another connection restarts a stepped backup from the first
+# page; after this many restarts the rest is copied in one step
+SNAPSHOT_MAX_RESTARTS = 10
+
+REQUIRED_TABLES = {"chapters", "vocabulary_cards", "review_history"}
+
+
+def _require_database_path(app) -> str:
+    db_path = resolve_database_path(app)
+    if not db_path or db_path == ":memory:":
+        raise ValueError("Snapshots require a file-based SQLite database")
+    return db_path
+
+
+def get_snapshot_folder(app) -> str:
+    """Return the folder used for temporary and stored snapshots."""
+    return get_data_folder(app, "snapshots")
+
+
+def snapshot_filename(compact: bool = False) -> str:
+    suffix = "_compact" if compact else ""
+    return f"wordup_snapshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}{suffix}.db"
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _copy_database(source, staging_path: str, pages: int, pause: float) -> None:
+    """Copy ``source`` into a new file at ``staging_path`` with the backup API.
+
+    In WAL mode the whole file is copied in one step: the backup then only
+    holds a read snapshot, which writers do not wait for, and no commit can
+    restart it. Otherwise it is copied in steps of ``pages`` pages, sleeping
+    ``pause`` seconds between steps; after ``SNAPSHOT_MAX_RESTARTS`` restarts
+    caused by other connections' commits the rest is copied in one step.
+    """
+    if source.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal":
+        pages = -1
+
+    progress = {"remaining": None, "restarts": 0}
+
+    def _yield_to_writers(status, remaining, total):
+        # A restart begins again from the first page
+        if progress["remaining"] is not None and remaining > progress["remaining"]:
+            progress["restarts"] += 1
+            if progress["restarts"] > SNAPSHOT_MAX_RESTARTS:
+                raise _TooManyRestarts()
+        progress["remaining"] = remaining
+        if pause:
+            time.sleep(pause)
+
+    destination = sqlite3.connect(staging_path)
+    try:
+        try:
+            source.backup(destination, pages=pages, progress=_yield_to_writers)
+        except _TooManyRestarts:
+            source.backup(destination, pages=-1)
+    finally:
+        destination.close()
+
+
+def create_snapshot(app, target_path: str, compact: bool = False,
+                    pages: int = SNAPSHOT_PAGES_PER_STEP,
+                    pause: float = SNAPSHOT_STEP_PAUSE) -> str:
+    """Write a consistent copy of the live database to ``target_path``.
+
+    The copy is made with SQLite's online backup API (see
+    ``_copy_database``). With ``compact`` the finished snapshot is
+    additionally rewritten with ``VACUUM INTO``.
+    """
+    db_path = _require_database_path(app)
+    if os.path.exists(target_path):
+        raise ValueError(f"Target file already exists: {target_path}")
+
+    staging_path = target_path + ".partial"
+    source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        _copy_database(source, staging_path, pages, pause)
+    except Exception:
+        if os.path.exists(staging_path):
+            os.remove(staging_path)
+        raise
+    finally:
+        source.close()
+
+    try:
+        if compact:
+            staging = sqlite3.connect(staging_path)
+            try:
+                staging.execute("VACUUM INTO ?", (target_path,))
+            finally:
+                staging.close()
+            os.remove(staging_path)
+        else:
+            os.replace(staging_path, target_path)
+        verify_snapshot(target_path)
+    except Exception:
+        for path in (staging_path, target_path):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+    return target_path
+
+
+def create_temporary_snapshot(app, compact: bool = False) -> str:
+    """Create a snapshot in the snapshot folder and return its path."""
+    folder = get_snapshot_folder(app)
+    fd, path = tempfile.mkstemp(prefix="snapshot_", suffix=".db", dir=folder)
+    os.close(fd)
+    os.remove(path)
+    return create_snapshot(app, path, compact=compact)
+
+
+def verify_snapshot(path: str) -> None:
+    """Raise ``ValueError`` unless ``path`` is an intact WordUp database."""
+    if not os.path.isfile(path):
+        raise ValueError(f"Snapshot not found: {path}")
+
+    try:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            result = connection.execute("PRAGMA quick_check").fetchone()
+            tables = {
+                row[0] for row in connection.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'"
+                )
+            }
+        finally:
+            connection.close()
+    except sqlite3.DatabaseError as exc:
+        raise ValueError(f"Not a valid SQLite database: {exc}") from exc
+
+    if not result or result[0] != "ok":
+        raise ValueError(f"Snapshot failed integrity check: {result[0] if result else 'no result'}")
+
+    missing = REQUIRED_TABLES - tables
+    if missing:
+        raise ValueError(f"Snapshot is missing tables: {', '.join(sorted(missing))}")
+
+
+def restore_snapshot(app, snapshot_path: str) -> Optional[str]:
+    """Replace the live database file with ``snapshot_path``.
+
+    The current database is kept next to it as ``<name>.pre-restore-<timestamp>``
+    and that path is returned (``None`` if there was no database yet). Stop
+    the application workers before restoring; open connections keep
+    reading the old file.
+    """
+    from src.models import db
+
+    db_path = _require_database_path(app)
+    verify_snapshot(snapshot_path)
+
+    with app.app_context():
+        db.engine.dispose()
+
+    db_dir = os.path.dirname(db_path)
+    fd, staging_path = tempfile.mkstemp(prefix=".restore_", suffix=".db", dir=db_dir)
+    os.close(fd)
+    shutil.copyfile(snapshot_path, staging_path)
+
+    previous_path = None
+    if os.path.exists(db_path):
+        # Fold any pending WAL content into the old file before keeping it.
+        connection = sqlite3.connect(db_path)
+        try:
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            connection.close()
+        previous_path = f"{db_path}.pre-restore-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        shutil.copyfile(db_path, previous_path)
+
+    # A stale WAL would be replayed on top of the restored file.
+    for suffix in ("-wal", "-shm", "-journal"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    os.replace(staging_path, db_path)
+    return previous_path
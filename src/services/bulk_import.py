@@ -0,0 +1,210 @@
+import sqlite3
+from datetime import datetime, timezone
+from typing import Callable, Iterable, List, Optional
+
+from sqlalchemy import insert, select
+
+from src.models import VocabularyCard, db
+from src.services.near_duplicates import NearDuplicateIndex
+from src.services.normalization import normalized_card_key
+from src.services.writer import BACKGROUND_WRITE_TIMEOUT, PRIORITY_BULK, run_write
+
+# Lines parsed per duplicate lookup / multi-row insert
+BULK_IMPORT_BATCH_SIZE = 500
+
+# Entries kept per report list; the counts always cover everything
+REPORT_LIMIT = 1000
+
+# Bound parameters allowed in one statement (SQLITE_MAX_VARIABLE_NUMBER)
+SQLITE_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+
+def parse_card_line(line: str) -> Optional[dict]:
+    """Parse ``source | target | example | hint``; return None if malformed."""
+    parts = [part.strip() for part in line.split('|')]
+    if len(parts) < 2 or not parts[0] or not parts[1]:
+        return None
+
+    return {
+        'source_word': parts[0],
+        'target_word': parts[1],
+        'example_sentence': parts[2] if len(parts) > 2 and parts[2] else None,
+        'context_hint': parts[3] if len(parts) > 3 and parts[3] else ''
+    }
+
+
+class BulkImportReport:
+    """Counts and (capped) details of a bulk import run."""
+
+    def __init__(self, chapter_id: int):
+        self.chapter_id = chapter_id
+        self.lines = 0
+        self.imported = 0
+        self.duplicate_count = 0
+        self.malformed_count = 0
+        self.near_duplicate_count = 0
+        self.duplicates: List[dict] = []
+        self.malformed: List[dict] = []
+        self.near_duplicates: List[dict] = []
+
+    def add_duplicate(self, line_number: int, card_data: dict, reason: str) -> None:
+        self.duplicate_count += 1
+        if len(self.duplicates) < REPORT_LIMIT:
+            self.duplicates.append({
+                'line': line_number,
+                'source_word': card_data['source_word'],
+                'target_word': card_data['target_word'],
+                'reason': reason
+            })
+
+    def add_malformed(self, line_number: int, line: str) -> None:
+        self.malformed_count += 1
+        if len(self.malformed) < REPORT_LIMIT:
+            self.malformed.append({'line': line_number, 'text': line[:200]})
+
+    def add_near_duplicate(self, line_number: int, card_data: dict, similar: List[dict]) -> None:
+        self.near_duplicate_count += 1
+        if len(self.near_duplicates) < REPORT_LIMIT:
+            self.near_duplicates.append({
+                'line': line_number,
+                'source_word': card_data['source_word'],
+                'target_word': card_data['target_word'],
+                'similar_to': similar
+            })
+
+    def to_dict(self) -> dict:
+        return {
+            'chapter_id': self.chapter_id,
+            'lines': self.lines,
+            'imported': self.imported,
+            'duplicate_count': self.duplicate_count,
+            'malformed_count': self.malformed_count,
+            'near_duplicate_count': self.near_duplicate_count,
+            'duplicates': self.duplicates,
+            'malformed': self.malformed,
+            'near_duplicates': self.near_duplicates
+        }
+
+
+class _NearDuplicateCheck:
+    """Flags imported cards that resemble existing or earlier imported cards."""
+
+    def __init__(self, chapter_id: int):
+        self.index = NearDuplicateIndex()
+        self.labels = {}
+        rows = db.session.execute(
+            select(VocabularyCard.id, VocabularyCard.source_word, VocabularyCard.target_word)
+            .where(VocabularyCard.chapter_id == chapter_id)
+        )
+        for row in rows:
+            self._add(('card', row.id), row.source_word, row.target_word)
+
+    def _add(self, key, source_word: str, target_word: str) -> list:
+        self.labels[key] = (source_word, target_word)
+        return self.index.add(key, source_word, target_word)
+
+    def check(self, line_number: int, card_data: dict, report: BulkImportReport) -> None:
+        matches = self._add(('line', line_number), card_data['source_word'], card_data['target_word'])
+        if not matches:
+            return
+        similar = []
+        for (kind, ident), similarity in matches[:5]:
+            source_word, target_word = self.labels[(kind, ident)]
+            similar.append({
+                'source_word': source_word,
+                'target_word': target_word,
+                'similarity': similarity,
+                'card_id' if kind == 'card' else 'line': ident
+            })
+        report.add_near_duplicate(line_number, card_data, similar)
+
+
+def _insert_new_cards(chapter_id: int, batch: list, report: BulkImportReport,
+                      near_check: Optional[_NearDuplicateCheck] = None) -> None:
+    """Insert the cards of ``batch`` whose keys are not yet in the chapter."""
+    keys = [key for _, key, _ in batch]
+    existing = set(db.session.execute(
+        select(VocabularyCard.normalized_key).where(
+            VocabularyCard.chapter_id == chapter_id,
+            VocabularyCard.normalized_key.in_(keys)
+        )
+    ).scalars())
+
+    now = datetime.now(timezone.utc)
+    rows = []
+    for line_number, key, card_data in batch:
+        if key in existing:
+            report.add_duplicate(line_number, card_data, 'already in chapter')
+            continue
+        if near_check:
+            near_check.check(line_number, card_data, report)
+        rows.append(dict(
+            card_data,
+            chapter_id=chapter_id,
+            normalized_key=key,
+            box_level=1,
+            next_review=now,
+            created_at=now
+        ))
+
+    if rows:
+        # Columns with Python-side defaults are bound too, so count every column
+        chunk_size = max(1, SQLITE_MAX_VARIABLES // len(VocabularyCard.__table__.columns))
+        for start in range(0, len(rows), chunk_size):
+            db.session.execute(insert(VocabularyCard.__table__).values(rows[start:start + chunk_size]))
+        report.imported += len(rows)
+
+
+def _write_batch(chapter_id: int, batch: list, report: BulkImportReport,
+                 near_check: Optional[_NearDuplicateCheck]) -> None:
+    # Each batch is its own low-priority write, so answers submitted while
+    # an import runs are committed between its batches
+    run_write(_insert_new_cards, chapter_id, batch, report, near_check,
+              priority=PRIORITY_BULK, timeout=BACKGROUND_WRITE_TIMEOUT)
+
+
+def import_card_lines(chapter_id: int, lines: Iterable[str],
+                      progress: Optional[Callable] = None,
+                      batch_size: int = BULK_IMPORT_BATCH_SIZE,
+                      check_near_duplicates: bool = False) -> dict:
+    """Import bulk-import lines into ``chapter_id`` skipping duplicates.
+
+    ``lines`` may be any iterable (including an open file), so very large
+    lists are processed in batches without being held in memory. Each batch
+    costs one duplicate lookup and one multi-row INSERT and is committed on
+    its own. With ``check_near_duplicates`` cards resembling existing ones
+    (accents, articles, small typos) are still imported but listed in the
+    report. Returns the report as a dict.
+    """
+    report = BulkImportReport(chapter_id)
+    near_check = _NearDuplicateCheck(chapter_id) if check_near_duplicates else None
+    seen = set()
+    batch = []
+
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip().lstrip('\ufeff')
+        if not line:
+            continue
+
+        report.lines += 1
+        card_data = parse_card_line(line)
+        if card_data is None:
+            report.add_malformed(line_number, line)
+            continue
+
+        key = normalized_card_key(card_data['source_word'], card_data['target_word'])
+        if key in seen:
+            report.add_duplicate(line_number, card_data, 'repeated in import')
+            continue
+        seen.add(key)
+        batch.append((line_number, key, card_data))
+
+        if len(batch) >= batch_size:
+            _write_batch(chapter_id, batch, report, near_check)
+            batch = []
+            if progress:
+                progress(report.lines, message=f'Imported {report.imported} cards')
+
+    if batch:
+        _write_batch(chapter_id, batch, report, near_check)
+    return report.to_dict()
@@ -0,0 +1,125 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, select, tuple_
+
+from src.models import VocabularyCard, db
+from src.services.read_models import CARD_COLUMNS, CardRow, card_rows
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Sort key -> column ordered before the id tie-breaker. Each is backed by a
+# (chapter_id, column) index; SQLite appends the rowid to every index, so
+# the index order already matches (column, id).
+CARD_SORTS = {
+    'created': None,
+    'source': VocabularyCard.source_word,
+    'next_review': VocabularyCard.next_review,
+    'box': VocabularyCard.box_level,
+}
+
+DUE_FILTERS = ('due', 'not_due')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values: list) -> str:
+    payload = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str) -> list:
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (binascii.Error, ValueError, UnicodeError):
+        raise InvalidCursor('Invalid cursor')
+    if not isinstance(values, list) or not values:
+        raise InvalidCursor('Invalid cursor')
+    return values
+
+
+def parse_card_filters(args) -> dict:
+    """Read list filters from request args, dropping unknown values."""
+    filters = {'box': None, 'due': None, 'has_context': False, 'sort': 'created'}
+
+    box = args.get('box', type=int)
+    if box in range(1, 6):
+        filters['box'] = box
+    if args.get('due') in DUE_FILTERS:
+        filters['due'] = args.get('due')
+    filters['has_context'] = args.get('context') == '1'
+    if args.get('sort') in CARD_SORTS:
+        filters['sort'] = args.get('sort')
+    return filters
+
+
+def _cursor_values(card, sort_column) -> list:
+    if sort_column is None:
+        return [card.id]
+    value = getattr(card, sort_column.key)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return [value, card.id]
+
+
+def fetch_card_page(chapter_id: int, filters: dict, cursor: Optional[str] = None,
+                    limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List[CardRow], Optional[str]]:
+    """Return one page of a chapter's cards and the cursor for the next page.
+
+    Pages are selected with a keyset condition on (sort column, id) instead
+    of OFFSET, so every page costs the same regardless of its position.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    sort_column = CARD_SORTS[filters.get('sort', 'created')]
+
+    query = select(*CARD_COLUMNS).where(VocabularyCard.chapter_id == chapter_id)
+
+    if filters.get('box'):
+        query = query.where(VocabularyCard.box_level == filters['box'])
+    if filters.get('due'):
+        now = datetime.now(timezone.utc)
+        if filters['due'] == 'due':
+            query = query.where(VocabularyCard.next_review <= now)
+        else:
+            query = query.where(VocabularyCard.next_review > now)
+    if filters.get('has_context'):
+        # Same definition as the learning context mode
+        query = query.where(
+            and_(VocabularyCard.context_hint.isnot(None), VocabularyCard.context_hint != ''),
+            and_(VocabularyCard.example_sentence.isnot(None), VocabularyCard.example_sentence != '')
+        )
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if sort_column is None:
+            query = query.where(VocabularyCard.id > values[-1])
+        else:
+            if len(values) != 2:
+                raise InvalidCursor('Invalid cursor')
+            sort_value, last_id = values
+            if sort_column is VocabularyCard.next_review and sort_value is not None:
+                try:
+                    sort_value = datetime.fromisoformat(sort_value)
+                except (TypeError, ValueError):
+                    raise InvalidCursor('Invalid cursor')
+            query = query.where(tuple_(sort_column, VocabularyCard.id) > tuple_(sort_value, last_id))
+
+    if sort_column is None:
+        query = query.order_by(VocabularyCard.id)
+    else:
+        query = query.order_by(sort_column, VocabularyCard.id)
+
+    # Fetch one extra row to learn whether another page exists
+    cards = card_rows(db.session.execute(query.limit(limit + 1)))
+    next_cursor = None
+    if len(cards) > limit:
+        cards = cards[:limit]
+        next_cursor = encode_cursor(_cursor_values(cards[-1], sort_column))
+    return cards, next_cursor
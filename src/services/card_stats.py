@@ -0,0 +1,77 @@
+from typing import Iterable, Optional
+
+from sqlalchemy import bindparam, select, update
+
+from src.models import VocabularyCard, db
+from src.services.hot_queries import review_replay
+from src.services.srs import SRSService
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def is_lapse(box_level: Optional[int], correct: bool) -> bool:
+    """A lapse is a wrong answer on a card that had left the first box."""
+    return not correct and (box_level or 1) > 1
+
+
+def record_answer(card_id: int, correct: bool, direction: str) -> None:
+    """Write intent for an answer (see ``services.writer.run_write``)."""
+    card = db.session.get(VocabularyCard, card_id)
+    if card is not None:
+        card.record_review(correct, direction)
+
+
+def rebuild_card_stats(connection, card_ids: Optional[Iterable[int]] = None,
+                       batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """Recompute the review counters of cards from ``review_history``.
+
+    Each card's answers are replayed in order through the Leitner rules,
+    starting from box 1, to find its lapses. Runs on ``connection`` without
+    committing; returns the number of cards updated.
+    """
+    cards = VocabularyCard.__table__
+
+    if card_ids is None:
+        id_query = select(cards.c.id).order_by(cards.c.id)
+        all_ids = [row.id for row in connection.execute(id_query)]
+    else:
+        all_ids = sorted(set(card_ids))
+
+    statement = (
+        update(cards)
+        .where(cards.c.id == bindparam('b_id'))
+        .values(
+            review_count=bindparam('b_review_count'),
+            correct_count=bindparam('b_correct_count'),
+            lapse_count=bindparam('b_lapse_count'),
+            last_reviewed_at=bindparam('b_last_reviewed_at'),
+        )
+    )
+
+    updated = 0
+    for start in range(0, len(all_ids), batch_size):
+        batch = all_ids[start:start + batch_size]
+        stats = {
+            card_id: {'b_id': card_id, 'b_review_count': 0, 'b_correct_count': 0,
+                      'b_lapse_count': 0, 'b_last_reviewed_at': None, 'box': 1}
+            for card_id in batch
+        }
+        rows = connection.execute(review_replay(batch))
+        for row in rows:
+            card = stats[row.card_id]
+            card['b_review_count'] += 1
+            if row.correct:
+                card['b_correct_count'] += 1
+            if is_lapse(card['box'], row.correct):
+                card['b_lapse_count'] += 1
+            card['box'], _ = SRSService.calculate_next_review(card['box'], row.correct)
+            card['b_last_reviewed_at'] = row.reviewed_at
+
+        params = []
+        for card in stats.values():
+            card.pop('box')
+            params.append(card)
+        connection.execute(statement, params)
+        updated += len(params)
+
+    return updated
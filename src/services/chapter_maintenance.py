@@ -0,0 +1,104 @@
+"""Set-based reset and delete of whole chapters.
+
+Both work through the chapter's cards in id order, ``CHUNK_SIZE`` cards
+per write. A reset chunk is one ``DELETE ... WHERE card_id IN (subquery)``
+for the review history and one ``UPDATE`` of the cards; a delete chunk is
+one ``DELETE`` of the cards, whose history goes with them through
+``ON DELETE CASCADE``. Each chunk is its own transaction, so a large
+chapter never holds SQLite's write lock for long and answers from other
+learners get in between. An interrupted run leaves a partly reset or
+deleted chapter; running it again finishes the job.
+"""
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from flask import current_app
+from sqlalchemy import and_, delete, func, select, update
+
+from src.models import Chapter, ReviewHistory, VocabularyCard, db
+from src.services.database import deletes_cascade
+from src.services.writer import PRIORITY_BULK, run_write
+
+CHUNK_SIZE = 2000
+
+
+def _chunk_condition(chapter_id: int, after_id: int, limit: int):
+    """Condition selecting the next ``limit`` cards after ``after_id``, and the last id."""
+    cards = VocabularyCard.__table__
+    chunk = (
+        select(cards.c.id)
+        .where(cards.c.chapter_id == chapter_id, cards.c.id > after_id)
+        .order_by(cards.c.id)
+        .limit(limit)
+        .subquery()
+    )
+    last_id = db.session.scalar(select(func.max(chunk.c.id)))
+    if last_id is None:
+        return None, None
+    # A range on (chapter_id, id) is answered by ix_vocabulary_cards_chapter_id
+    return and_(cards.c.chapter_id == chapter_id, cards.c.id > after_id, cards.c.id <= last_id), last_id
+
+
+def _delete_reviews(condition) -> None:
+    cards = VocabularyCard.__table__
+    history = ReviewHistory.__table__
+    db.session.execute(delete(history).where(history.c.card_id.in_(select(cards.c.id).where(condition))))
+
+
+def _reset_chunk(chapter_id: int, after_id: int, limit: int, now: datetime) -> Optional[int]:
+    """Write intent: reset the next chunk of cards; return its last card id."""
+    condition, last_id = _chunk_condition(chapter_id, after_id, limit)
+    if condition is None:
+        return None
+    _delete_reviews(condition)
+    db.session.execute(
+        update(VocabularyCard.__table__).where(condition).values(
+            box_level=1, next_review=now, review_count=0, correct_count=0,
+            lapse_count=0, last_reviewed_at=None
+        )
+    )
+    return last_id
+
+
+def _delete_chunk(chapter_id: int, after_id: int, limit: int, cascade: bool) -> Optional[int]:
+    """Write intent: delete the next chunk of cards and their reviews; return its last card id."""
+    condition, last_id = _chunk_condition(chapter_id, after_id, limit)
+    if condition is None:
+        return None
+    if not cascade:
+        _delete_reviews(condition)  # SQLite with SQLITE_FOREIGN_KEYS off ignores ON DELETE CASCADE
+    db.session.execute(delete(VocabularyCard.__table__).where(condition))
+    return last_id
+
+
+def _delete_chapter_row(chapter_id: int) -> None:
+    db.session.execute(delete(Chapter.__table__).where(Chapter.__table__.c.id == chapter_id))
+
+
+def _run_chunks(write: Callable, chapter_id: int, chunk_size: int, *args) -> int:
+    chunks = 0
+    last_id = 0
+    while True:
+        last_id = run_write(write, chapter_id, last_id, chunk_size, *args, priority=PRIORITY_BULK)
+        if last_id is None:
+            return chunks
+        chunks += 1
+
+
+def reset_chapter_progress(chapter_id: int, chunk_size: int = CHUNK_SIZE) -> int:
+    """Put every card of a chapter back into box 1, due now, without history.
+
+    Returns the number of chunks written.
+    """
+    return _run_chunks(_reset_chunk, chapter_id, chunk_size, datetime.now(timezone.utc))
+
+
+def delete_chapter_and_cards(chapter_id: int, chunk_size: int = CHUNK_SIZE) -> int:
+    """Delete a chapter with its cards and review history.
+
+    Returns the number of chunks written before the chapter row itself.
+    """
+    cascade = deletes_cascade(current_app, db.engine)
+    chunks = _run_chunks(_delete_chunk, chapter_id, chunk_size, cascade)
+    run_write(_delete_chapter_row, chapter_id, priority=PRIORITY_BULK)
+    return chunks
@@ -0,0 +1,62 @@
+import gzip
+import zlib
+from typing import Iterable, Iterator
+
+from flask import current_app, request
+
+# Below this size the gzip header and CPU time outweigh the saving
+DEFAULT_COMPRESS_MIN_SIZE = 1024
+DEFAULT_COMPRESS_LEVEL = 6
+
+COMPRESSED_MIMETYPES = ('text/html', 'application/json')
+
+
+def _gzip_chunks(chunks: Iterable, level: int) -> Iterator[bytes]:
+    """Compress a streamed body chunk by chunk, flushing after each one."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def compress_response(response):
+    """Gzip HTML and JSON responses for clients that accept it (after_request hook).
+
+    Buffered bodies are compressed when they reach ``COMPRESS_MIN_SIZE``;
+    streamed bodies are compressed as they are produced. Responses that are
+    already encoded, partial or served from a file are left alone.
+    """
+    if (response.mimetype not in COMPRESSED_MIMETYPES
+            or response.status_code != 200
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if request.accept_encodings['gzip'] <= 0:
+        return response
+
+    level = current_app.config.get('COMPRESS_LEVEL', DEFAULT_COMPRESS_LEVEL)
+    if response.is_streamed:
+        response.response = _gzip_chunks(response.response, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config.get('COMPRESS_MIN_SIZE', DEFAULT_COMPRESS_MIN_SIZE):
+            return response
+        response.set_data(gzip.compress(data, compresslevel=level))
+
+    response.headers['Content-Encoding'] = 'gzip'
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # A strong ETag names exact bytes; the compressed body is a different one
+        response.set_etag(f'{etag}-gz')
+    return response
@@ -0,0 +1,76 @@
+import os
+import secrets
+import threading
+from typing import Optional, Tuple
+
+from src.models import AppConfig
+from src.services.metrics import CACHE_REQUESTS
+from src.services.storage import get_data_folder
+
+VERSION_FILENAME = 'app_config.version'
+
+_cache_lock = threading.Lock()
+
+
+class ConfigSnapshot:
+    """Read-only copy of the ``AppConfig`` row, safe to share between requests."""
+
+    __slots__ = ('theming_enabled', 'theming_background')
+
+    def __init__(self, config: AppConfig):
+        self.theming_enabled = bool(config.theming_enabled)
+        self.theming_background = config.theming_background
+
+    def to_dict(self):
+        return {
+            'theming_enabled': self.theming_enabled,
+            'theming_background': self.theming_background
+        }
+
+
+def _version_path(app) -> str:
+    path = app.extensions.get('wordup_app_config_path')
+    if path is None:
+        path = os.path.join(get_data_folder(app, 'cache'), VERSION_FILENAME)
+        app.extensions['wordup_app_config_path'] = path
+    return path
+
+
+def _current_version(app) -> Optional[Tuple[int, int]]:
+    # The file is replaced on every change, so its inode and mtime identify
+    # the version without reading it
+    try:
+        stat = os.stat(_version_path(app))
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def get_cached_config(app) -> ConfigSnapshot:
+    """Return the app configuration, loading it only after it changed.
+
+    Each process keeps a snapshot tagged with the version file's identity;
+    checking it costs a ``stat`` call, so other workers see a change on
+    their next request.
+    """
+    version = _current_version(app)
+    cached = app.extensions.get('wordup_app_config')
+    if cached is not None and cached[0] == version:
+        CACHE_REQUESTS.inc(cache='app_config', result='hit')
+        return cached[1]
+    CACHE_REQUESTS.inc(cache='app_config', result='miss')
+
+    with _cache_lock:
+        snapshot = ConfigSnapshot(AppConfig.get_config())
+        app.extensions['wordup_app_config'] = (version, snapshot)
+    return snapshot
+
+
+def invalidate_config_cache(app) -> None:
+    """Mark the configuration as changed for every process; call after committing it."""
+    path = _version_path(app)
+    temporary = f'{path}.{secrets.token_hex(4)}.tmp'
+    with open(temporary, 'w') as handle:
+        handle.write(secrets.token_hex(8))
+    os.replace(temporary, path)
+    app.extensions.pop('wordup_app_config', None)
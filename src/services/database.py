@@ -0,0 +1,159 @@
+import atexit
+import logging
+import os
+from typing import Dict, Optional
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# app.config key -> (pragma, allowed values or int); None/'' leaves SQLite's default
+SQLITE_PRAGMA_SETTINGS = {
+    'SQLITE_JOURNAL_MODE': ('journal_mode', ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')),
+    'SQLITE_SYNCHRONOUS': ('synchronous', ('OFF', 'NORMAL', 'FULL', 'EXTRA')),
+    'SQLITE_CACHE_SIZE': ('cache_size', int),
+    'SQLITE_MMAP_SIZE': ('mmap_size', int),
+    'SQLITE_TEMP_STORE': ('temp_store', ('DEFAULT', 'FILE', 'MEMORY')),
+    'SQLITE_BUSY_TIMEOUT': ('busy_timeout', int),
+    'SQLITE_FOREIGN_KEYS': ('foreign_keys', bool),
+}
+
+DEFAULT_SQLITE_SETTINGS = {
+    # Readers no longer block the writer and commits append to the WAL
+    'SQLITE_JOURNAL_MODE': 'WAL',
+    # In WAL mode NORMAL only syncs at checkpoints; a power cut can lose the
+    # last commits but never corrupts the database
+    'SQLITE_SYNCHRONOUS': 'NORMAL',
+    'SQLITE_CACHE_SIZE': -32000,  # Negative values are KiB: 32 MB per connection
+    'SQLITE_MMAP_SIZE': 128 * 1024 * 1024,
+    'SQLITE_TEMP_STORE': 'MEMORY',
+    'SQLITE_BUSY_TIMEOUT': 5000,  # Milliseconds to wait for a lock before "database is locked"
+    'SQLITE_FOREIGN_KEYS': True,
+    'SQLITE_OPTIMIZE_ON_EXIT': True,
+}
+
+
+def _parse_value(key: str, value, kind):
+    if isinstance(value, str):
+        value = value.strip()
+        if kind is bool:
+            return value.lower() in ('1', 'true', 'yes', 'on')
+        if kind is int:
+            try:
+                return int(value)
+            except ValueError:
+                raise ValueError(f'{key} must be an integer, got {value!r}')
+        value = value.upper()
+    if isinstance(kind, tuple) and value not in kind:
+        raise ValueError(f'{key} must be one of {", ".join(kind)}, got {value!r}')
+    return value
+
+
+def sqlite_pragmas(config) -> Dict[str, object]:
+    """Return ``{pragma: value}`` for the SQLite settings in ``config``."""
+    pragmas = {}
+    for key, (pragma, kind) in SQLITE_PRAGMA_SETTINGS.items():
+        value = config.get(key)
+        if value is None or value == '':
+            continue
+        value = _parse_value(key, value, kind)
+        if isinstance(value, bool):
+            value = 'ON' if value else 'OFF'
+        pragmas[pragma] = value
+    return pragmas
+
+
+def apply_pragmas(dbapi_connection, pragmas: Dict[str, object]) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in pragmas.items():
+            # Values are validated against SQLITE_PRAGMA_SETTINGS, never raw input
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+    finally:
+        cursor.close()
+
+
+def configure_sqlite(app, engine) -> Optional[Dict[str, object]]:
+    """Apply the configured pragmas to every new connection of ``engine``.
+
+    Returns the pragmas, or None if the engine is not SQLite.
+    """
+    if engine.dialect.name != 'sqlite':
+        return None
+
+    pragmas = sqlite_pragmas(app.config)
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+
+    if _parse_value('SQLITE_OPTIMIZE_ON_EXIT', app.config.get('SQLITE_OPTIMIZE_ON_EXIT', False), bool):
+        pid = os.getpid()
+
+        def _optimize_on_exit():
+            # Forked server workers inherit this hook; only the process
+            # that created the app optimizes
+            if os.getpid() == pid:
+                optimize_database(engine)
+
+        atexit.register(_optimize_on_exit)
+
+    return pragmas
+
+
+def deletes_cascade(app, engine) -> bool:
+    """Whether the database applies the models' ON DELETE CASCADE.
+
+    Other databases always enforce foreign keys; SQLite only with
+    ``SQLITE_FOREIGN_KEYS`` on.
+    """
+    if engine.dialect.name != 'sqlite':
+        return True
+    return sqlite_pragmas(app.config).get('foreign_keys') == 'ON'
+
+
+def optimize_database(engine) -> None:
+    """Run ``PRAGMA optimize`` so SQLite refreshes statistics it is missing."""
+    database = engine.url.database
+    if database and database != ':memory:' and not os.path.exists(database):
+        return  # Do not create an empty database file at shutdown
+    try:
+        with engine.connect() as connection:
+            connection.exec_driver_sql('PRAGMA optimize')
+    except Exception as exc:  # Never fail interpreter shutdown
+        logger.warning('PRAGMA optimize failed: %s', exc)
+
+
+def _raise_on_lazy_loads(execute_state):
+    # Only lazy loads set lazy_loaded_from; selectinload and friends do not
+    if not execute_state.is_select or execute_state.lazy_loaded_from is None:
+        return
+    if has_app_context() and g.get('wordup_strict_loading'):
+        relationship = execute_state.loader_strategy_path.prop
+        raise InvalidRequestError(
+            f'{relationship} was lazy-loaded with STRICT_LOADING on: load it with the query '
+            '(selectinload) or count it with a separate query'
+        )
+
+
+def enable_strict_loading(app) -> None:
+    """Make lazy relationship loads raise while ``app`` handles a request.
+
+    A relationship a view or template touches without loading it up front
+    costs one query per row; in strict mode it fails instead. Many-to-one
+    targets already in the session load without SQL and are still allowed.
+    Scripts, commands and test setup are not affected.
+    """
+    if not event.contains(Session, 'do_orm_execute', _raise_on_lazy_loads):
+        event.listen(Session, 'do_orm_execute', _raise_on_lazy_loads)
+
+    @app.before_request
+    def start_strict_loading():
+        g.wordup_strict_loading = True
+
+    @app.teardown_request
+    def end_strict_loading(exc):
+        g.pop('wordup_strict_loading', None)
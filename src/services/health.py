@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+
+from sqlalchemy import text
+
+from src.models import db
+from src.services.storage import resolve_database_path
+from src.services.theming import get_theming_folder
+
+DEFAULT_READY_CACHE_SECONDS = 5.0
+
+_cache_lock = threading.Lock()
+
+
+def _check_database() -> str:
+    db.session.execute(text('SELECT 1'))
+    return 'ok'
+
+
+def _check_writable(folder: str) -> str:
+    if not os.access(folder, os.W_OK):
+        raise OSError(f'{folder} is not writable')
+    return 'ok'
+
+
+def _check_migrations() -> str:
+    from src.services.schema import current_version, latest_version
+
+    with db.engine.connect() as connection:
+        version = current_version(connection)
+    if version < latest_version():
+        raise RuntimeError(f'schema version {version}, migrations up to {latest_version()} pending')
+    return 'ok'
+
+
+def run_readiness_checks(app) -> dict:
+    """Run every readiness check; returns ``{'ready': bool, 'checks': {...}}``."""
+    database_path = resolve_database_path(app)
+    data_folder = (os.path.dirname(database_path)
+                   if database_path and database_path != ':memory:' else app.instance_path)
+    checks = {
+        'database': _check_database,
+        'data_folder': lambda: _check_writable(data_folder),
+        'theming_folder': lambda: _check_writable(get_theming_folder(app)),
+        'migrations': _check_migrations,
+    }
+
+    results = {}
+    for name, check in checks.items():
+        try:
+            results[name] = check()
+        except Exception as exc:
+            db.session.rollback()
+            results[name] = f'failed: {exc}'
+    return {'ready': all(result == 'ok' for result in results.values()), 'checks': results}
+
+
+def readiness(app) -> dict:
+    """Return the readiness result, cached for ``READY_CACHE_SECONDS`` per process."""
+    max_age = app.config.get('READY_CACHE_SECONDS', DEFAULT_READY_CACHE_SECONDS)
+    with _cache_lock:
+        cached = app.extensions.get('wordup_readiness')
+        now = time.monotonic()
+        if cached is None or now - cached[0] >= max_age:
+            cached = (now, run_readiness_checks(app))
+            app.extensions['wordup_readiness'] = cached
+        return cached[1]
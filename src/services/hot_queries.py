@@ -0,0 +1,149 @@
+"""Named hot queries and the indexes their plans may use.
+
+The application builds these statements with the functions below, and
+``check_hot_queries`` explains each of them against the current schema.
+A query rewritten by an ORM change, or an index that disappears, then
+shows up as a failing test or a ``[SCAN]`` in ``flask db-status --plans``
+instead of as a slow page on a large database.
+"""
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Sequence
+
+from sqlalchemy import case, func, select
+from sqlalchemy.sql import Select
+
+from src.models import ReviewHistory, VocabularyCard
+from src.services.read_models import CARD_COLUMNS, REVIEW_COLUMNS
+
+# Every index that starts with chapter_id answers a chapter filter equally
+# well; which one SQLite picks depends on its statistics
+CHAPTER_INDEXES = (
+    'ix_vocabulary_cards_chapter_id',
+    'ix_vocabulary_cards_chapter_next_review',
+    'ix_vocabulary_cards_chapter_box_level',
+    'ix_vocabulary_cards_chapter_source_word',
+    'ix_vocabulary_cards_chapter_normalized_key',
+)
+
+# Arguments the plans are explained with
+EXAMPLE_NOW = datetime(2100, 1, 1, tzinfo=timezone.utc)
+
+
+class HotQuery:
+    """A statement builder and the indexes its plan may search with."""
+
+    def __init__(self, name: str, build: Callable[..., Select], indexes: Sequence[str], example: dict):
+        self.name = name
+        self.build = build
+        self.indexes = tuple(indexes)
+        self.example = example
+
+
+HOT_QUERIES: Dict[str, HotQuery] = {}
+
+
+def hot_query(name: str, indexes: Sequence[str], **example):
+    """Register a statement builder; ``example`` are the arguments to explain it with."""
+    def decorator(build):
+        HOT_QUERIES[name] = HotQuery(name, build, indexes, example)
+        return build
+    return decorator
+
+
+@hot_query('due cards of a chapter', ['ix_vocabulary_cards_chapter_next_review'],
+           chapter_id=1, now=EXAMPLE_NOW)
+def due_card_count(chapter_id: int, now: datetime) -> Select:
+    return (
+        select(func.count())
+        .select_from(VocabularyCard)
+        .where(VocabularyCard.chapter_id == chapter_id, VocabularyCard.next_review <= now)
+    )
+
+
+@hot_query('session queue of due cards', ['ix_vocabulary_cards_chapter_next_review'],
+           chapter_id=1, now=EXAMPLE_NOW)
+def review_queue(chapter_id: int, now: datetime) -> Select:
+    return select(VocabularyCard).where(
+        VocabularyCard.chapter_id == chapter_id, VocabularyCard.next_review <= now
+    )
+
+
+@hot_query('chapter statistics by box', ['ix_vocabulary_cards_chapter_box_level'],
+           chapter_ids=[1, 2, 3], now=EXAMPLE_NOW)
+def chapter_box_stats(chapter_ids: Sequence[int], now: datetime) -> Select:
+    return (
+        select(
+            VocabularyCard.chapter_id,
+            VocabularyCard.box_level,
+            func.count().label('cards'),
+            func.sum(case((VocabularyCard.next_review <= now, 1), else_=0)).label('due'),
+            func.coalesce(func.sum(VocabularyCard.review_count), 0).label('reviews'),
+            func.coalesce(func.sum(VocabularyCard.correct_count), 0).label('correct'),
+        )
+        .where(VocabularyCard.chapter_id.in_(chapter_ids))
+        .group_by(VocabularyCard.chapter_id, VocabularyCard.box_level)
+    )
+
+
+@hot_query('chapter review totals', CHAPTER_INDEXES, chapter_id=1)
+def chapter_review_totals(chapter_id: int) -> Select:
+    return select(
+        func.coalesce(func.sum(VocabularyCard.review_count), 0),
+        func.coalesce(func.sum(VocabularyCard.correct_count), 0),
+    ).where(VocabularyCard.chapter_id == chapter_id)
+
+
+@hot_query('chapter export cards', ['ix_vocabulary_cards_chapter_id'], chapter_id=1)
+def chapter_export_cards(chapter_id: int) -> Select:
+    return select(*CARD_COLUMNS).where(VocabularyCard.chapter_id == chapter_id).order_by(VocabularyCard.id)
+
+
+@hot_query('chapter export review history',
+           ['ix_vocabulary_cards_chapter_id', 'ix_review_history_card_reviewed_at'], chapter_id=1)
+def chapter_export_reviews(chapter_id: int) -> Select:
+    # Card order from the chapter index, then each card's history from its
+    # own index, so no sort is needed
+    return (
+        select(*REVIEW_COLUMNS)
+        .join(VocabularyCard, ReviewHistory.card_id == VocabularyCard.id)
+        .where(VocabularyCard.chapter_id == chapter_id)
+        .order_by(VocabularyCard.id, ReviewHistory.reviewed_at, ReviewHistory.id)
+    )
+
+
+@hot_query('review history of cards', ['ix_review_history_card_reviewed_at'], card_ids=[1, 2, 3])
+def review_replay(card_ids: Sequence[int]) -> Select:
+    history = ReviewHistory.__table__
+    return (
+        select(history.c.card_id, history.c.correct, history.c.reviewed_at)
+        .where(history.c.card_id.in_(card_ids))
+        .order_by(history.c.card_id, history.c.reviewed_at, history.c.id)
+    )
+
+
+def explain(connection, statement: Select) -> List[str]:
+    """``EXPLAIN QUERY PLAN`` lines of a SQLAlchemy statement."""
+    from src.services.schema import query_plan
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True})
+    return query_plan(connection, str(compiled))
+
+
+def plan_problems(plan: List[str], indexes: Sequence[str]) -> List[str]:
+    """Plan lines that scan, sort, or search through an index not in ``indexes``."""
+    from src.services.schema import full_scans
+    problems = full_scans(plan)
+    for line in plan:
+        if not line.startswith('SEARCH ') or 'PRIMARY KEY' in line:
+            continue
+        if not any(f'INDEX {index} ' in f'{line} ' for index in indexes):
+            problems.append(line)
+    return problems
+
+
+def check_hot_queries(connection) -> Dict[str, List[str]]:
+    """Explain every hot query; return the plan problems of each by name."""
+    results = {}
+    for query in HOT_QUERIES.values():
+        plan = explain(connection, query.build(**query.example))
+        results[query.name] = plan_problems(plan, query.indexes)
+    return results
@@ -0,0 +1,113 @@
+import functools
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional
+
+from flask import current_app, request, session
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import OperationalError
+
+from src.__version__ import __version__
+from src.models import VocabularyCard, db
+from src.services.metrics import CACHE_REQUESTS
+
+DATA_VERSION_TABLE = 'data_version'
+
+# Tables whose rows the cached pages show; every change to them bumps the version
+VERSIONED_TABLES = ('chapters', 'vocabulary_cards', 'app_config')
+
+
+def create_data_version(connection) -> None:
+    """Create the version counter and the triggers that bump it (idempotent)."""
+    if connection.dialect.name != 'sqlite':
+        return
+    connection.exec_driver_sql(
+        f'CREATE TABLE IF NOT EXISTS {DATA_VERSION_TABLE} ('
+        'id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)'
+    )
+    connection.exec_driver_sql(f'INSERT OR IGNORE INTO {DATA_VERSION_TABLE} (id, version) VALUES (1, 0)')
+    for table in VERSIONED_TABLES:
+        for operation in ('INSERT', 'UPDATE', 'DELETE'):
+            connection.exec_driver_sql(
+                f'CREATE TRIGGER IF NOT EXISTS {table}_data_version_{operation.lower()} '
+                f'AFTER {operation} ON {table} BEGIN '
+                f'UPDATE {DATA_VERSION_TABLE} SET version = version + 1 WHERE id = 1; END'
+            )
+
+
+def drop_data_version(connection) -> None:
+    if connection.dialect.name != 'sqlite':
+        return
+    # The triggers go with their tables
+    connection.exec_driver_sql(f'DROP TABLE IF EXISTS {DATA_VERSION_TABLE}')
+
+
+def current_data_version() -> Optional[int]:
+    """Return the data version, or None if the counter does not exist yet."""
+    try:
+        return db.session.execute(text(f'SELECT version FROM {DATA_VERSION_TABLE} WHERE id = 1')).scalar()
+    except OperationalError:
+        db.session.rollback()
+        return None
+
+
+def next_due_at() -> Optional[datetime]:
+    """When the next card becomes due; pages showing due counts change then."""
+    now = datetime.now(timezone.utc)
+    return db.session.execute(
+        select(func.min(VocabularyCard.next_review)).where(VocabularyCard.next_review > now)
+    ).scalar()
+
+
+def _build_token(app) -> str:
+    # Changes with a release or any static file, since pages embed asset URLs
+    token = app.extensions.get('wordup_build_token')
+    if token is None:
+        from src.services.assets import get_asset_manifest
+        manifest = get_asset_manifest(app)
+        digest = hashlib.sha256(__version__.encode())
+        for hashed_name in sorted(manifest._by_hashed_name):
+            digest.update(hashed_name.encode())
+        token = digest.hexdigest()[:12]
+        app.extensions['wordup_build_token'] = token
+    return token
+
+
+def page_etag() -> Optional[str]:
+    """Weak ETag for a page built only from versioned data, or None."""
+    app = current_app._get_current_object()
+    if app.debug or session.get('_flashes'):
+        return None
+    version = current_data_version()
+    if version is None:
+        return None
+    # Cards fall due with time alone, without any write
+    next_due = next_due_at()
+    due_token = int(next_due.timestamp()) if next_due else 0
+    return f'{version}.{due_token}.{_build_token(app)}'
+
+
+def conditional_page(view):
+    """Answer ``If-None-Match`` with 304 before ``view`` runs.
+
+    For GET pages that only show chapters, cards and the app config. The
+    ETag is derived from the data version and the next due time, so any
+    write, or a card falling due, makes every such page fresh again.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != 'GET':
+            return view(*args, **kwargs)
+        etag = page_etag()
+        if etag is not None and request.if_none_match.contains_weak(etag):
+            CACHE_REQUESTS.inc(cache='page', result='hit')
+            response = current_app.response_class(status=304)
+        else:
+            CACHE_REQUESTS.inc(cache='page', result='miss')
+            response = current_app.make_response(view(*args, **kwargs))
+            if etag is None or response.status_code != 200:
+                return response
+        response.set_etag(etag, weak=True)
+        response.cache_control.no_cache = True  # Always revalidate
+        return response
+    return wrapper
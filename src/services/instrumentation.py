@@ -0,0 +1,168 @@
+import json
+import logging
+import time
+from typing import List, Optional, Tuple
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from flask.logging import default_handler, has_level_handler
+from sqlalchemy import event
+
+from src.models import db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_REQUEST_MS = 500
+
+# Enough to see an N+1 pattern without keeping a bulk import's statements
+MAX_RECORDED_STATEMENTS = 200
+MAX_STATEMENT_LENGTH = 500
+
+
+class RequestTiming:
+    """Counters for one request, kept in ``g`` while it runs."""
+
+    __slots__ = ('started', 'sql_count', 'sql_seconds', 'render_seconds', 'rows',
+                 'statements', '_renders')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.render_seconds = 0.0
+        self.rows = 0
+        self.statements: List[Tuple[str, float]] = []
+        self._renders: List[Tuple[float, float]] = []
+
+    def add_statement(self, statement: str, seconds: float) -> None:
+        self.sql_count += 1
+        self.sql_seconds += seconds
+        if len(self.statements) < MAX_RECORDED_STATEMENTS:
+            self.statements.append((statement[:MAX_STATEMENT_LENGTH], seconds))
+
+    def start_render(self) -> None:
+        self._renders.append((time.perf_counter(), self.sql_seconds))
+
+    def end_render(self) -> None:
+        if not self._renders:
+            return
+        started, sql_before = self._renders.pop()
+        # Lazy loads triggered by the template count as SQL, not as Jinja
+        elapsed = time.perf_counter() - started - (self.sql_seconds - sql_before)
+        if not self._renders:  # Nested renders are part of the outer one
+            self.render_seconds += max(elapsed, 0.0)
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self, total_ms: float) -> str:
+        return ', '.join([
+            f'total;dur={total_ms:.1f}',
+            f'db;dur={self.sql_seconds * 1000:.1f};desc="{self.sql_count} queries"',
+            f'render;dur={self.render_seconds * 1000:.1f}',
+            f'orm;desc="{self.rows} rows"',
+        ])
+
+
+def _current_timing() -> Optional[RequestTiming]:
+    # Writer and job threads have no request context and are not counted
+    if not has_request_context():
+        return None
+    return g.get('wordup_timing')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # A connection runs one statement at a time, so one start time is enough
+    if _current_timing() is not None:
+        conn.info['wordup_query_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timing = _current_timing()
+    started = conn.info.pop('wordup_query_started', None)
+    if timing is not None and started is not None:
+        timing.add_statement(statement, time.perf_counter() - started)
+
+
+def _statement_failed(context):
+    # after_cursor_execute does not fire for a failing statement; it still took time
+    connection = context.connection
+    started = connection.info.pop('wordup_query_started', None) if connection is not None else None
+    timing = _current_timing()
+    if timing is not None and started is not None and context.statement is not None:
+        timing.add_statement(context.statement, time.perf_counter() - started)
+
+
+def _count_loaded_row(target, context, *attrs):
+    # Fires for new and expired instances, not for identity-map hits that skip hydration
+    timing = _current_timing()
+    if timing is not None:
+        timing.rows += 1
+
+
+def _before_render(sender, template, context, **extra):
+    timing = _current_timing()
+    if timing is not None:
+        timing.start_render()
+
+
+def _after_render(sender, template, context, **extra):
+    timing = _current_timing()
+    if timing is not None:
+        timing.end_render()
+
+
+def init_instrumentation(app, engine) -> None:
+    """Time every request of ``app`` and report it (opt-in, see README).
+
+    Adds a ``Server-Timing`` header with wall time, SQL count and time,
+    Jinja render time and ORM rows loaded, and logs the same as one JSON
+    line. Requests slower than ``SLOW_REQUEST_MS`` are logged as warnings
+    together with their SQL statements.
+    """
+    if logger.level == logging.NOTSET:
+        logger.setLevel(logging.INFO)
+    if not has_level_handler(logger):
+        # Same fallback as Flask's app.logger: stderr unless logging is configured
+        logger.addHandler(default_handler)
+
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _statement_failed)
+    for name in ('load', 'refresh'):
+        if not event.contains(db.Model, name, _count_loaded_row):
+            event.listen(db.Model, name, _count_loaded_row, propagate=True)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def start_request_timing():
+        g.wordup_timing = RequestTiming()
+
+    @app.after_request
+    def report_request_timing(response):
+        timing = g.pop('wordup_timing', None)
+        if timing is None:
+            return response
+        total_ms = timing.total_ms()
+        response.headers['Server-Timing'] = timing.server_timing(total_ms)
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 1),
+            'sql_count': timing.sql_count,
+            'sql_ms': round(timing.sql_seconds * 1000, 1),
+            'render_ms': round(timing.render_seconds * 1000, 1),
+            'rows': timing.rows,
+        }
+        slow_ms = app.config.get('SLOW_REQUEST_MS', DEFAULT_SLOW_REQUEST_MS)
+        if slow_ms and total_ms >= slow_ms:
+            record['statements'] = [
+                {'sql': statement, 'ms': round(seconds * 1000, 2)} for statement, seconds in timing.statements
+            ]
+            logger.warning('Slow request %s', json.dumps(record))
+        else:
+            logger.info('Request %s', json.dumps(record))
+        return response
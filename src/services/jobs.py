@@ -0,0 +1,334 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import and_, func, select, update
+from werkzeug.utils import secure_filename
+
+from src.models import Job, db
+from src.services.metrics import JOB_DURATION
+from src.services.storage import get_data_folder
+
+DEFAULT_JOB_WORKERS = 2
+DEFAULT_JOB_RESULT_TTL = 24 * 60 * 60  # seconds
+DEFAULT_JOB_LEASE_TIMEOUT = 120  # seconds without a heartbeat before a running job is lost
+
+LOST_JOB_ERROR = 'The worker running this job stopped before it finished. Please start it again.'
+
+JOB_HANDLERS: Dict[str, Callable] = {}
+
+
+def job_handler(kind: str):
+    """Register ``func(context, **params)`` as the handler for ``kind`` jobs."""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def get_jobs_folder(app) -> str:
+    """Return the folder holding job uploads and artifacts."""
+    return get_data_folder(app, "jobs")
+
+
+class JobContext:
+    """Handle passed to job handlers for reporting progress and artifacts."""
+
+    def __init__(self, app, job: Job):
+        self.app = app
+        self.job = job
+
+    def update_progress(self, done: int, total: Optional[int] = None,
+                        message: Optional[str] = None) -> None:
+        """Persist progress. This commits the session, so only call it once
+        the handler's own work up to this point may be committed."""
+        self.job.progress = done
+        if total is not None:
+            self.job.total = total
+        if message is not None:
+            self.job.message = message[:500]
+        db.session.commit()
+
+    def artifact_path(self, filename: str) -> str:
+        """Return the path where this job should write ``filename``."""
+        return os.path.join(get_jobs_folder(self.app), f"{self.job.id}_{secure_filename(filename)}")
+
+    def set_artifact(self, path: str, download_name: str, mimetype: str) -> None:
+        self.job.artifact_path = path
+        self.job.artifact_name = download_name
+        self.job.artifact_mimetype = mimetype
+
+
+class JobRunner:
+    """Thread pool executing queued jobs for one process.
+
+    A heartbeat thread renews ``heartbeat_at`` of the jobs running here
+    every quarter of ``JOB_LEASE_TIMEOUT``; jobs whose heartbeat stops,
+    because their worker was recycled or killed, are failed by
+    ``recover_lost_jobs``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.pid = os.getpid()
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config.get('JOB_WORKERS', DEFAULT_JOB_WORKERS),
+            thread_name_prefix='wordup-job'
+        )
+        self.futures = {}
+        self.heartbeat_interval = app.config.get('JOB_LEASE_TIMEOUT', DEFAULT_JOB_LEASE_TIMEOUT) / 4
+        self.heartbeat = threading.Thread(target=self._beat, name='wordup-job-heartbeat', daemon=True)
+        self.heartbeat.start()
+
+    def submit(self, job_id: str) -> None:
+        future = self.futures.get(job_id)
+        if future is not None and not future.done():
+            return  # Already waiting here, e.g. requeued by recover_lost_jobs
+        self.futures[job_id] = self.executor.submit(run_job, self.app, job_id)
+
+    def _beat(self) -> None:
+        while True:
+            time.sleep(self.heartbeat_interval)
+            for job_id, future in list(self.futures.items()):
+                if future.done():
+                    self.futures.pop(job_id, None)
+            running = [job_id for job_id, future in list(self.futures.items()) if future.running()]
+            if not running:
+                continue
+            with self.app.app_context():
+                try:
+                    db.session.execute(
+                        update(Job).where(Job.id.in_(running), Job.status == 'running')
+                        .values(heartbeat_at=datetime.now(timezone.utc))
+                    )
+                    db.session.commit()
+                except Exception:
+                    self.app.logger.exception('Job heartbeat failed')
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> None:
+        """Block until ``job_id`` (if started by this runner) has finished."""
+        future = self.futures.get(job_id)
+        if future is not None:
+            future.result(timeout=timeout)
+
+
+_runner_lock = threading.Lock()
+
+
+def get_job_runner(app) -> JobRunner:
+    """Return this process's job runner, creating it on first use.
+
+    Runners are created lazily and per process so that pre-forking servers
+    do not inherit a pool whose threads only exist in the parent.
+    """
+    with _runner_lock:
+        runner = app.extensions.get('wordup_jobs')
+        if runner is None or runner.pid != os.getpid():
+            runner = JobRunner(app)
+            app.extensions['wordup_jobs'] = runner
+        return runner
+
+
+def remove_job_files(app, job_id: str, input_path: Optional[str] = None) -> None:
+    """Delete a job's input and everything it wrote to the jobs folder."""
+    paths = [input_path] if input_path else []
+    folder = get_jobs_folder(app)
+    paths.extend(os.path.join(folder, name) for name in os.listdir(folder) if name.startswith(f"{job_id}_"))
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def save_job_input(app, file_storage) -> str:
+    """Store an uploaded file for a job and return its path."""
+    folder = get_jobs_folder(app)
+    filename = f"input_{os.urandom(8).hex()}_{secure_filename(file_storage.filename or 'upload')}"
+    path = os.path.join(folder, filename)
+    file_storage.save(path)
+    return path
+
+
+def enqueue_job(app, kind: str, params: Optional[dict] = None,
+                input_path: Optional[str] = None) -> Job:
+    """Create a job row and hand it to the runner (or run it inline)."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job type: {kind}')
+
+    purge_expired_jobs(app)
+    recover_lost_jobs(app)
+
+    job = Job(kind=kind, params=json.dumps(params or {}), input_path=input_path)
+    db.session.add(job)
+    db.session.commit()
+
+    if app.config.get('JOBS_RUN_INLINE'):
+        run_job(app, job.id)
+        db.session.refresh(job)
+    else:
+        get_job_runner(app).submit(job.id)
+    return job
+
+
+def run_job(app, job_id: str) -> None:
+    """Execute a queued job inside its own application context."""
+    with app.app_context():
+        # Claimed with one conditional UPDATE: a requeued job may also be
+        # waiting in another worker's pool
+        now = datetime.now(timezone.utc)
+        claimed = db.session.execute(
+            update(Job).where(Job.id == job_id, Job.status == 'queued')
+            .values(status='running', started_at=now, heartbeat_at=now)
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            return
+        job = db.session.get(Job, job_id)
+
+        started = time.monotonic()
+        try:
+            handler = JOB_HANDLERS[job.kind]
+            result = handler(JobContext(app, job), **job.get_params())
+        except Exception as exc:
+            app.logger.exception('Job %s (%s) failed', job_id, job.kind)
+            db.session.rollback()
+            job = db.session.get(Job, job_id)
+            job.status = 'failed'
+            job.error = str(exc) or exc.__class__.__name__
+            job.artifact_path = None
+            remove_job_files(app, job_id)  # Partly written artifacts
+        else:
+            job.status = 'succeeded'
+            job.result = json.dumps(result or {})
+            if job.total is not None:
+                job.progress = job.total
+        finally:
+            if job.input_path and os.path.exists(job.input_path):
+                os.remove(job.input_path)
+
+        now = datetime.now(timezone.utc)
+        JOB_DURATION.observe(time.monotonic() - started, kind=job.kind, status=job.status)
+        job.finished_at = now
+        job.expires_at = now + timedelta(
+            seconds=app.config.get('JOB_RESULT_TTL', DEFAULT_JOB_RESULT_TTL)
+        )
+        db.session.commit()
+
+
+def purge_expired_jobs(app) -> int:
+    """Delete finished jobs past their expiry together with their artifacts."""
+    now = datetime.now(timezone.utc)
+    expired = Job.query.filter(Job.expires_at.isnot(None), Job.expires_at < now).all()
+    for job in expired:
+        if job.artifact_path and os.path.exists(job.artifact_path):
+            os.remove(job.artifact_path)
+        db.session.delete(job)
+    if expired:
+        db.session.commit()
+    return len(expired)
+
+
+def recover_lost_jobs(app) -> int:
+    """Fail running jobs whose worker stopped and requeue unclaimed ones.
+
+    A running job whose heartbeat is older than ``JOB_LEASE_TIMEOUT`` lost
+    its worker (recycled, crashed or killed): it is marked failed and its
+    input and partial artifacts are deleted. Handlers are not idempotent,
+    so it is not run again. A job still queued after the lease timeout was
+    accepted by a worker that stopped before starting it; it is submitted
+    to this process's runner. Returns the number of jobs recovered.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=app.config.get('JOB_LEASE_TIMEOUT', DEFAULT_JOB_LEASE_TIMEOUT))
+    lost = and_(Job.status == 'running', func.coalesce(Job.heartbeat_at, Job.started_at) < cutoff)
+
+    recovered = 0
+    for job_id, input_path in db.session.execute(select(Job.id, Job.input_path).where(lost)).all():
+        # Conditional, so a job whose heartbeat arrived meanwhile is left alone
+        failed = db.session.execute(
+            update(Job).where(Job.id == job_id, lost).values(
+                status='failed', error=LOST_JOB_ERROR, artifact_path=None, finished_at=now,
+                expires_at=now + timedelta(seconds=app.config.get('JOB_RESULT_TTL', DEFAULT_JOB_RESULT_TTL))
+            )
+        ).rowcount
+        db.session.commit()
+        if failed:
+            app.logger.warning('Job %s lost its worker and was marked failed', job_id)
+            remove_job_files(app, job_id, input_path)
+            recovered += 1
+
+    unclaimed = db.session.scalars(
+        select(Job.id).where(Job.status == 'queued', Job.created_at < cutoff)
+    ).all()
+    for job_id in unclaimed:
+        if app.config.get('JOBS_RUN_INLINE'):
+            run_job(app, job_id)
+        else:
+            get_job_runner(app).submit(job_id)
+    return recovered + len(unclaimed)
+
+
+@job_handler('export_all')
+def _export_all_job(context: JobContext):
+    from src.services.transfer import write_full_export
+
+    download_name = f"wordup_full_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    path = context.artifact_path(download_name)
+
+    def progress(done, total):
+        context.update_progress(done, total, f'Exported {done} of {total} chapters')
+
+    chapter_count = write_full_export(path, progress=progress)
+    context.set_artifact(path, download_name, 'application/zip')
+    return {'chapters': chapter_count}
+
+
+@job_handler('import_data')
+def _import_data_job(context: JobContext, filename: str, check_near_duplicates: bool = False):
+    from src.services.near_duplicates import near_duplicate_report
+    from src.services.transfer import import_chapter_json, import_zip_file
+
+    path = context.job.input_path
+    if filename.lower().endswith('.zip'):
+        def progress(done, total):
+            context.update_progress(done, total, f'Processed {done} of {total} chapter files')
+
+        chapter_ids = import_zip_file(path, progress=progress)
+        result = {'chapters': len(chapter_ids)}
+    else:
+        with open(path, encoding='utf-8') as handle:
+            chapter = import_chapter_json(handle)
+        chapter_ids = [chapter.id]
+        result = {'chapters': 1, 'chapter_id': chapter.id}
+
+    if check_near_duplicates and chapter_ids:
+        context.update_progress(0, message='Checking for near-duplicates')
+        result['near_duplicates'] = near_duplicate_report(chapter_ids, include_existing=True)
+    return result
+
+
+@job_handler('bulk_import')
+def _bulk_import_job(context: JobContext, chapter_id: int, check_near_duplicates: bool = False):
+    from src.services.bulk_import import import_card_lines
+
+    with open(context.job.input_path, encoding='utf-8') as handle:
+        return import_card_lines(chapter_id, handle, progress=context.update_progress,
+                                 check_near_duplicates=check_near_duplicates)
+
+
+@job_handler('near_duplicates')
+def _near_duplicates_job(context: JobContext, chapter_id: Optional[int] = None):
+    from src.services.near_duplicates import near_duplicate_report
+
+    def progress(done, total):
+        context.update_progress(done, total, f'Checked {done} of {total} cards')
+
+    report = near_duplicate_report([chapter_id] if chapter_id else None, progress=progress)
+    report['chapter_id'] = chapter_id
+    return report
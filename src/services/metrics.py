@@ -0,0 +1,375 @@
+import atexit
+import glob
+import hmac
+import json
+import math
+import os
+import threading
+import time
+from functools import wraps
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from flask import abort, current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.services.storage import get_data_folder
+
+try:
+    import fcntl
+except ImportError:  # Windows: dead workers' files are not merged
+    fcntl = None
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+JOB_BUCKETS = (0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+# Seconds between writes of a worker's samples to its file
+FLUSH_INTERVAL = 1.0
+
+ARCHIVE_FILENAME = 'archive.json'
+
+Labels = Tuple[Tuple[str, str], ...]
+SampleKey = Tuple[str, Labels]
+
+
+class MetricsStore:
+    """Samples of this process, written to a file that /metrics merges.
+
+    Every worker writes ``worker_<pid>_<token>.json`` at most once per
+    FLUSH_INTERVAL. A scrape sums the files of all workers; files of
+    workers that have exited are folded into ``archive.json`` so counters
+    never go backwards when gunicorn replaces a worker.
+
+    A worker holds an exclusive lock on its ``.alive`` file for as long as
+    it lives, and the kernel drops it when the process ends. Unlike a pid,
+    which the next container start may hand to another process, the lock
+    cannot outlive its worker.
+    """
+
+    def __init__(self, folder: Optional[str]):
+        self.folder = folder
+        self.pid = os.getpid()
+        self.path = None
+        if folder:
+            self.path = os.path.join(folder, f'worker_{self.pid}_{os.urandom(4).hex()}.json')
+        self.values: Dict[SampleKey, float] = {}
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.closed = False
+        self._flush_lock = threading.Lock()
+        self._alive = None
+
+    def add(self, key: SampleKey, amount: float) -> None:
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+            self.dirty = True
+        if self.path and _flusher_pid != self.pid:
+            _start_flusher()
+
+    def close(self) -> None:
+        """Stop writing this store's file, waiting for a write in progress."""
+        with self._flush_lock:
+            self.closed = True
+
+    def flush(self) -> None:
+        if not self.path or not self.dirty:
+            return
+        with self._flush_lock:
+            if self.closed:
+                return
+            with self.lock:
+                samples = [[name, list(labels), value] for (name, labels), value in self.values.items()]
+                self.dirty = False
+            temp_path = f'{self.path}.tmp'
+            try:
+                if self._alive is None and fcntl is not None:
+                    # Before the first write, so a scrape never sees the samples unlocked
+                    self._alive = open(_alive_path(self.path), 'w')
+                    fcntl.flock(self._alive, fcntl.LOCK_EX)
+                with open(temp_path, 'w') as handle:
+                    json.dump(samples, handle)
+                os.replace(temp_path, self.path)
+            except FileNotFoundError:
+                pass  # Folder removed (tests); nothing to keep
+
+    def collect(self) -> Dict[SampleKey, float]:
+        """Samples summed over every worker, live or exited."""
+        if not self.folder:
+            with self.lock:
+                return dict(self.values)
+
+        self.flush()
+        lock_handle = open(os.path.join(self.folder, '.lock'), 'w')
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_handle, fcntl.LOCK_EX)
+                self._archive_exited_workers()
+            totals: Dict[SampleKey, float] = {}
+            paths = glob.glob(os.path.join(self.folder, 'worker_*.json'))
+            for path in paths + [os.path.join(self.folder, ARCHIVE_FILENAME)]:
+                _merge(totals, _read_samples(path))
+            return totals
+        finally:
+            lock_handle.close()
+
+    def _archive_exited_workers(self) -> None:
+        archive_path = os.path.join(self.folder, ARCHIVE_FILENAME)
+        exited = [path for path in glob.glob(os.path.join(self.folder, 'worker_*.json'))
+                  if not _worker_alive(path)]
+        if not exited:
+            return
+        archive = _read_samples(archive_path)
+        for path in exited:
+            _merge(archive, _read_samples(path))
+        _write_samples(archive_path, archive)
+        for path in exited:
+            os.remove(path)
+            if os.path.exists(_alive_path(path)):
+                os.remove(_alive_path(path))
+
+
+def _alive_path(path: str) -> str:
+    return path[:-len('.json')] + '.alive'
+
+
+def _worker_alive(path: str) -> bool:
+    """Whether the worker that writes ``path`` still holds its ``.alive`` lock."""
+    try:
+        handle = open(_alive_path(path), 'r')
+    except FileNotFoundError:
+        return False
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        handle.close()  # Also releases the lock if we got it
+    return False
+
+
+def _read_samples(path: str) -> Dict[SampleKey, float]:
+    try:
+        with open(path) as handle:
+            samples = json.load(handle)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return {(name, tuple(tuple(pair) for pair in labels)): value for name, labels, value in samples}
+
+
+def _write_samples(path: str, values: Dict[SampleKey, float]) -> None:
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as handle:
+        json.dump([[name, list(labels), value] for (name, labels), value in values.items()], handle)
+    os.replace(temp_path, path)
+
+
+def _merge(totals: Dict[SampleKey, float], values: Dict[SampleKey, float]) -> None:
+    for key, value in values.items():
+        totals[key] = totals.get(key, 0.0) + value
+
+
+_store = MetricsStore(None)
+_store_lock = threading.Lock()
+_flusher_pid = None
+
+
+def _current_store() -> MetricsStore:
+    global _store
+    if _store.pid != os.getpid():
+        # Forked worker: start from zero with a file of its own
+        with _store_lock:
+            if _store.pid != os.getpid():
+                _store = MetricsStore(_store.folder)
+    return _store
+
+
+def _start_flusher() -> None:
+    # One thread per process flushes whichever store is current. It never
+    # exits: from Python 3.12 cProfile sees every thread, and a thread
+    # returning from frames entered before a request's profile started
+    # cuts that request's outer frames from the profile.
+    global _flusher_pid
+    with _store_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_loop, name='wordup-metrics', daemon=True).start()
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        _current_store().flush()
+
+
+@atexit.register
+def _flush_at_exit():
+    if _store.pid == os.getpid():
+        _store.flush()
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+    def _labels(self, labels: dict) -> Labels:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} takes labels {self.labelnames}, got {tuple(labels)}')
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        _current_store().add((f'{self.name}_total', self._labels(labels)), amount)
+
+    def render(self, samples: Dict[SampleKey, float]) -> List[str]:
+        name = f'{self.name}_total'
+        return [_sample_line(name, labels, value)
+                for (sample, labels), value in sorted(samples.items()) if sample == name]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value: float, **labels) -> None:
+        store = _current_store()
+        labels = self._labels(labels)
+        # Buckets are stored cumulative, as they are exposed
+        for bound in self.buckets:
+            if value <= bound:
+                store.add((f'{self.name}_bucket', labels + (('le', _format_bound(bound)),)), 1)
+        store.add((f'{self.name}_sum', labels), value)
+        store.add((f'{self.name}_count', labels), 1)
+
+    def render(self, samples: Dict[SampleKey, float]) -> List[str]:
+        lines = []
+        label_sets = sorted(labels for (sample, labels) in samples if sample == f'{self.name}_count')
+        for labels in label_sets:
+            for bound in self.buckets:
+                bucket_labels = labels + (('le', _format_bound(bound)),)
+                lines.append(_sample_line(f'{self.name}_bucket', bucket_labels,
+                                          samples.get((f'{self.name}_bucket', bucket_labels), 0)))
+            lines.append(_sample_line(f'{self.name}_sum', labels, samples[(f'{self.name}_sum', labels)]))
+            lines.append(_sample_line(f'{self.name}_count', labels, samples[(f'{self.name}_count', labels)]))
+        return lines
+
+
+def _format_bound(bound: float) -> str:
+    return '+Inf' if math.isinf(bound) else repr(float(bound))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _sample_line(name: str, labels: Labels, value: float) -> str:
+    if labels:
+        pairs = ','.join(f'{key}="{_escape(val)}"' for key, val in labels)
+        name = f'{name}{{{pairs}}}'
+    value = float(value)
+    return f'{name} {int(value) if value.is_integer() else repr(value)}'
+
+
+REGISTRY: List[_Metric] = []
+
+REQUEST_DURATION = Histogram('wordup_request_duration_seconds', 'Time to answer a request.',
+                             ['endpoint', 'method'])
+ANSWERS = Counter('wordup_answers', 'Answers submitted in learning sessions.', ['result'])
+LEARNING_SESSIONS = Counter('wordup_learning_sessions', 'Learning sessions started.', ['kind'])
+DB_COMMIT_DURATION = Histogram('wordup_db_commit_seconds', 'Time to flush and commit a session.')
+SQLITE_LOCK_TIMEOUTS = Counter('wordup_sqlite_lock_timeouts',
+                               'Statements that failed with "database is locked" after waiting busy_timeout.')
+WRITE_LOCK_WAIT = Histogram('wordup_db_write_lock_wait_seconds',
+                            'Time the write queue waited for the database write lock, per batch.')
+CACHE_REQUESTS = Counter('wordup_cache_requests', 'Cache lookups by cache and result (hit or miss).',
+                         ['cache', 'result'])
+JOB_DURATION = Histogram('wordup_job_duration_seconds', 'Run time of background jobs (imports and exports).',
+                         ['kind', 'status'], buckets=JOB_BUCKETS)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    samples = _current_store().collect()
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.render(samples))
+    return '\n'.join(lines) + '\n'
+
+
+def _before_commit(session):
+    session.info['wordup_commit_started'] = time.perf_counter()
+
+
+def _after_commit(session):
+    started = session.info.pop('wordup_commit_started', None)
+    if started is not None:
+        DB_COMMIT_DURATION.observe(time.perf_counter() - started)
+
+
+def _after_rollback(session):
+    session.info.pop('wordup_commit_started', None)
+
+
+def _count_lock_errors(context):
+    if 'database is locked' in str(context.original_exception):
+        SQLITE_LOCK_TIMEOUTS.inc()
+
+
+def metrics_token_required(view):
+    """Require ``Authorization: Bearer <METRICS_TOKEN>`` when a token is set.
+
+    Without ``METRICS_ENABLED`` the view answers 404.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config.get('METRICS_ENABLED'):
+            abort(404)
+        token = current_app.config.get('METRICS_TOKEN')
+        if token:
+            supplied = request.headers.get('Authorization', '')
+            if not hmac.compare_digest(supplied.encode('utf-8'), f'Bearer {token}'.encode('utf-8')):
+                abort(403)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_metrics(app, engine) -> None:
+    """Record metrics for ``app`` and keep them in its data folder."""
+    global _store
+    with _store_lock:
+        replaced, _store = _store, MetricsStore(get_data_folder(app, 'metrics'))
+    replaced.close()
+
+    event.listen(engine, 'handle_error', _count_lock_errors)
+    for name, listener in (('before_commit', _before_commit), ('after_commit', _after_commit),
+                           ('after_rollback', _after_rollback)):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+    @app.before_request
+    def start_request_clock():
+        g.wordup_request_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request_duration(response):
+        started = g.pop('wordup_request_started', None)
+        if started is not None:
+            REQUEST_DURATION.observe(time.perf_counter() - started,
+                                     endpoint=request.endpoint or 'unmatched', method=request.method)
+        return response
@@ -0,0 +1,268 @@
+import hashlib
+import re
+import struct
+import unicodedata
+from collections import defaultdict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+
+from src.models import Chapter, VocabularyCard, db
+from src.services.normalization import normalize_term
+
+# Similarity (Jaccard of character trigrams) from which two cards are reported
+DEFAULT_THRESHOLD = 0.5
+
+NGRAM_SIZE = 3
+
+# MinHash-LSH layout: LSH_BANDS bands of LSH_ROWS min-hashes each. A pair
+# becomes a candidate when one whole band matches, which happens with
+# probability 1 - (1 - J**3)**16: ~88% at J = 0.5, ~98% at 0.6 and
+# ~99.9% at 0.7. Candidates are then verified against the exact similarity.
+LSH_BANDS = 16
+LSH_ROWS = 3
+
+# Members of one bucket compared with a new card. Buckets only grow large
+# for very common word shapes; the cap keeps the check linear.
+MAX_BUCKET_CANDIDATES = 20
+
+# Groups kept in a report; the count always covers everything
+REPORT_LIMIT = 500
+
+# Leading articles (and the English infinitive "to") dropped before
+# comparing: "der Hund" ~ "Hund", "to run" ~ "run"
+ARTICLES = frozenset({
+    'the', 'a', 'an', 'to',
+    'der', 'die', 'das', 'den', 'dem', 'des', 'ein', 'eine', 'einen', 'einem', 'einer',
+    'le', 'la', 'les', 'un', 'une', 'des',
+    'el', 'los', 'las', 'una', 'unos', 'unas',
+    'il', 'lo', 'gli', 'uno',
+    'o', 'os', 'as', 'um', 'uma',
+    'de', 'het', 'een',
+})
+
+_ELISION = re.compile(r"^(?:l|d|un)['’]")
+
+# blake2b digests of 64 bytes give 16 independent 32-bit hashes each
+_HASH_SALTS = [f'wordup-{index}'.encode('ascii') for index in range(-(-LSH_BANDS * LSH_ROWS // 16))]
+
+
+def fold_term(value: Optional[str]) -> str:
+    """Normalize a term for similarity: case, spacing, accents and articles."""
+    term = unicodedata.normalize('NFKD', normalize_term(value))
+    term = ''.join(char for char in term if not unicodedata.combining(char))
+    term = _ELISION.sub('', term)
+    words = term.split(' ')
+    if len(words) > 1 and words[0] in ARTICLES:
+        words = words[1:]
+    return ' '.join(words)
+
+
+def card_shingles(source_word: Optional[str], target_word: Optional[str]) -> frozenset:
+    """Character n-grams of both sides of a card, tagged by side."""
+    shingles = set()
+    for side, value in (('s', source_word), ('t', target_word)):
+        term = fold_term(value)
+        if not term:
+            continue
+        padded = f'#{term}#'
+        if len(padded) <= NGRAM_SIZE:
+            shingles.add(side + padded)
+            continue
+        for start in range(len(padded) - NGRAM_SIZE + 1):
+            shingles.add(side + padded[start:start + NGRAM_SIZE])
+    return frozenset(shingles)
+
+
+def jaccard(first: frozenset, second: frozenset) -> float:
+    if not first or not second:
+        return 0.0
+    shared = len(first & second)
+    return shared / (len(first) + len(second) - shared)
+
+
+class NearDuplicateIndex:
+    """MinHash-LSH index of cards for finding similar word pairs.
+
+    Every card gets a MinHash signature over its trigrams, cut into bands.
+    Cards sharing a band are candidates and are verified with the exact
+    similarity, so a card is only ever compared with a handful of others.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self._buckets: List[Dict[tuple, List[Hashable]]] = [{} for _ in range(LSH_BANDS)]
+        self._shingles: Dict[Hashable, frozenset] = {}
+        # Vocabulary shares most trigrams, so each distinct one is hashed once
+        self._hash_cache: Dict[str, Tuple[int, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._shingles)
+
+    def _hashes(self, shingle: str) -> Tuple[int, ...]:
+        values = self._hash_cache.get(shingle)
+        if values is None:
+            data = shingle.encode('utf-8')
+            values = ()
+            for salt in _HASH_SALTS:
+                values += struct.unpack('<16I', hashlib.blake2b(data, digest_size=64, salt=salt).digest())
+            self._hash_cache[shingle] = values
+        return values
+
+    def _band_keys(self, shingles: frozenset) -> List[tuple]:
+        hashes = self._hashes
+        signature = list(map(min, zip(*[hashes(shingle) for shingle in shingles])))
+        # Band b holds min-hashes b, b + LSH_BANDS, b + 2 * LSH_BANDS, ...
+        return list(zip(*[signature[row * LSH_BANDS:(row + 1) * LSH_BANDS] for row in range(LSH_ROWS)]))
+
+    def _matches(self, shingles: frozenset, band_keys: List[tuple]) -> List[Tuple[Hashable, float]]:
+        candidates = set()
+        for buckets, band_key in zip(self._buckets, band_keys):
+            members = buckets.get(band_key)
+            if members:
+                candidates.update(members[-MAX_BUCKET_CANDIDATES:])
+
+        matches = []
+        for key in candidates:
+            similarity = jaccard(shingles, self._shingles[key])
+            if similarity >= self.threshold:
+                matches.append((key, round(similarity, 3)))
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+    def add_shingles(self, key: Hashable, shingles: frozenset) -> List[Tuple[Hashable, float]]:
+        """Add a card by its trigrams and return the similar cards added before it."""
+        if not shingles:
+            return []
+        band_keys = self._band_keys(shingles)
+        matches = self._matches(shingles, band_keys)
+        self._shingles[key] = shingles
+        for buckets, band_key in zip(self._buckets, band_keys):
+            members = buckets.get(band_key)
+            if members is None:
+                buckets[band_key] = [key]
+            else:
+                members.append(key)
+        return matches
+
+    def add(self, key: Hashable, source_word: str, target_word: str) -> List[Tuple[Hashable, float]]:
+        return self.add_shingles(key, card_shingles(source_word, target_word))
+
+    def query(self, source_word: str, target_word: str) -> List[Tuple[Hashable, float]]:
+        """Return ``(key, similarity)`` of similar cards, most similar first."""
+        shingles = card_shingles(source_word, target_word)
+        if not shingles:
+            return []
+        return self._matches(shingles, self._band_keys(shingles))
+
+
+def find_near_duplicates(cards: Iterable, threshold: float = DEFAULT_THRESHOLD,
+                         progress: Optional[Callable[[int], None]] = None,
+                         existing: Iterable = ()) -> List[dict]:
+    """Group similar cards; ``cards`` yields objects with id/source_word/target_word.
+
+    Each card is checked against the cards before it and then added to the
+    index, so every similar pair is seen once. Pairs are merged into groups
+    (connected components). Returns groups sorted by size, each with the
+    card ids and the highest similarity inside the group.
+
+    ``existing`` cards are indexed first without being compared with each
+    other: they only appear in groups together with one of ``cards``.
+    """
+    index = NearDuplicateIndex(threshold)
+    parent: Dict[int, int] = {}
+    pairs: List[Tuple[int, float]] = []
+
+    for card in existing:
+        parent[card.id] = card.id
+        index.add(card.id, card.source_word, card.target_word)
+
+    def find(card_id: int) -> int:
+        while parent[card_id] != card_id:
+            parent[card_id] = parent[parent[card_id]]
+            card_id = parent[card_id]
+        return card_id
+
+    for count, card in enumerate(cards, start=1):
+        card_id = card.id
+        parent[card_id] = card_id
+        for other_id, similarity in index.add(card_id, card.source_word, card.target_word):
+            root, other_root = find(card_id), find(other_id)
+            if root != other_root:
+                parent[root] = other_root
+            pairs.append((card_id, similarity))
+        if progress and count % 1000 == 0:
+            progress(count)
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for card_id in parent:
+        groups[find(card_id)].append(card_id)
+    similarity_by_root: Dict[int, float] = defaultdict(float)
+    for card_id, similarity in pairs:
+        root = find(card_id)
+        similarity_by_root[root] = max(similarity_by_root[root], similarity)
+
+    result = [
+        {'card_ids': sorted(members), 'similarity': similarity_by_root[root]}
+        for root, members in groups.items() if len(members) > 1
+    ]
+    result.sort(key=lambda group: (-len(group['card_ids']), -group['similarity'], group['card_ids'][0]))
+    return result
+
+
+def near_duplicate_report(chapter_ids: Optional[List[int]] = None,
+                          threshold: float = DEFAULT_THRESHOLD,
+                          progress: Optional[Callable[[int, int], None]] = None,
+                          include_existing: bool = False) -> dict:
+    """Find near-duplicate groups among the cards of ``chapter_ids`` (all if None).
+
+    With ``include_existing`` they are also compared with the cards of the
+    other chapters in the same languages, as after an import.
+    """
+    query = select(
+        VocabularyCard.id, VocabularyCard.source_word,
+        VocabularyCard.target_word, VocabularyCard.chapter_id
+    ).order_by(VocabularyCard.id)
+    existing = []
+    if chapter_ids is not None:
+        if include_existing:
+            languages = select(Chapter.source_language, Chapter.target_language).where(Chapter.id.in_(chapter_ids))
+            existing = db.session.execute(
+                query.join(Chapter, Chapter.id == VocabularyCard.chapter_id).where(
+                    VocabularyCard.chapter_id.notin_(chapter_ids),
+                    tuple_(Chapter.source_language, Chapter.target_language).in_(languages)
+                )
+            ).all()
+        query = query.where(VocabularyCard.chapter_id.in_(chapter_ids))
+    rows = db.session.execute(query).all()
+
+    def step(done):
+        progress(done, len(rows))
+
+    groups = find_near_duplicates(rows, threshold, progress=step if progress else None, existing=existing)
+    cards = {row.id: row for row in existing}
+    cards.update((row.id, row) for row in rows)
+    chapter_names = dict(db.session.execute(select(Chapter.id, Chapter.name)).all())
+
+    return {
+        'cards': len(rows),
+        'existing_cards': len(existing),
+        'threshold': threshold,
+        'group_count': len(groups),
+        'groups': [
+            {
+                'similarity': group['similarity'],
+                'cards': [
+                    {
+                        'id': card_id,
+                        'source_word': cards[card_id].source_word,
+                        'target_word': cards[card_id].target_word,
+                        'chapter_id': cards[card_id].chapter_id,
+                        'chapter_name': chapter_names.get(cards[card_id].chapter_id)
+                    }
+                    for card_id in group['card_ids']
+                ]
+            }
+            for group in groups[:REPORT_LIMIT]
+        ]
+    }
@@ -0,0 +1,16 @@
+import unicodedata
+from typing import Optional
+
+
+def normalize_term(value: Optional[str]) -> str:
+    """Normalize a word for duplicate detection (NFC, case-folded, single spaces)."""
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFC', value).casefold()
+    return unicodedata.normalize('NFC', ' '.join(value.split()))
+
+
+def normalized_card_key(source_word: Optional[str], target_word: Optional[str]) -> str:
+    """Return the key identifying a source/target pair regardless of spelling noise."""
+    # Whitespace is collapsed by normalize_term, so a tab cannot occur inside a term
+    return f'{normalize_term(source_word)}\t{normalize_term(target_word)}'
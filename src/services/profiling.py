@@ -0,0 +1,225 @@
+import cProfile
+import glob
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Dict, List, Optional
+
+from flask import abort, current_app, g, request
+
+from src.services.storage import get_data_folder
+
+MAX_PROFILED_REQUESTS = 100
+MAX_SAMPLE_SECONDS = 300
+DEFAULT_SAMPLE_SECONDS = 10
+# 100 samples per second: each one only walks the frames of every thread
+DEFAULT_SAMPLE_INTERVAL = 0.01
+MIN_SAMPLE_INTERVAL = 0.001
+
+# Oldest profiles are deleted beyond this many files
+MAX_PROFILE_FILES = 100
+
+PROFILE_SUFFIXES = ('.pstats', '.collapsed')
+
+
+class Profiler:
+    """Profiling state of one worker process.
+
+    Requests are armed per endpoint: the next ``count`` requests to it are
+    run under cProfile, one at a time (the interpreter allows a single
+    active profiler), and each is saved as a ``.pstats`` file. From Python
+    3.12 cProfile also records the other threads of the worker while a
+    request is profiled. The stack sampler is a thread that records the
+    stacks of all other threads at a fixed interval and writes them in the
+    collapsed format flamegraph tools read.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.armed: Dict[str, int] = {}
+        self.profiling = False
+        self.sampler: Optional['StackSampler'] = None
+
+    def arm(self, endpoint: str, count: int) -> None:
+        with self.lock:
+            self.armed[endpoint] = count
+
+    def start_request(self, endpoint: Optional[str]) -> Optional[cProfile.Profile]:
+        with self.lock:
+            remaining = self.armed.get(endpoint)
+            # A request arriving while another is profiled runs unprofiled
+            if not remaining or self.profiling:
+                return None
+            if remaining > 1:
+                self.armed[endpoint] = remaining - 1
+            else:
+                del self.armed[endpoint]
+            self.profiling = True
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # Another profiling tool is active
+            with self.lock:
+                self.profiling = False
+            return None
+        return profile
+
+    def finish_request(self, profile: cProfile.Profile, endpoint: str) -> str:
+        profile.disable()
+        with self.lock:
+            self.profiling = False
+        path = self.new_path(endpoint, '.pstats')
+        profile.dump_stats(path)
+        self.prune()
+        return path
+
+    def start_sampler(self, seconds: float, interval: float) -> 'StackSampler':
+        with self.lock:
+            if self.sampler is not None and self.sampler.is_alive():
+                raise RuntimeError('The stack sampler is already running in this worker')
+            self.sampler = StackSampler(self, seconds, interval)
+            self.sampler.start()
+            return self.sampler
+
+    def new_path(self, label: str, suffix: str) -> str:
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+        safe_label = ''.join(char if char.isalnum() else '_' for char in label)
+        return os.path.join(self.folder, f'{stamp}_{safe_label}_{self.pid}{suffix}')
+
+    def files(self) -> List[dict]:
+        """Saved profiles of all workers, newest first."""
+        paths = [path for suffix in PROFILE_SUFFIXES for path in glob.glob(os.path.join(self.folder, f'*{suffix}'))]
+        entries = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append({'name': os.path.basename(path), 'size': stat.st_size,
+                            'modified': datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat()})
+        return sorted(entries, key=lambda entry: entry['name'], reverse=True)
+
+    def prune(self) -> None:
+        for entry in self.files()[MAX_PROFILE_FILES:]:
+            try:
+                os.remove(os.path.join(self.folder, entry['name']))
+            except FileNotFoundError:
+                pass
+
+    def status(self) -> dict:
+        with self.lock:
+            sampler = self.sampler if self.sampler is not None and self.sampler.is_alive() else None
+            return {
+                'pid': self.pid,
+                'armed': dict(self.armed),
+                'sampler': {'file': os.path.basename(sampler.path), 'ends_in': round(sampler.remaining(), 1)}
+                if sampler else None,
+            }
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f'{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def collapse_stack(frame) -> List[str]:
+    """Function labels of a stack, outermost first."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+class StackSampler(threading.Thread):
+    """Sample the stacks of every other thread for ``seconds``.
+
+    The result is one ``thread;outer;...;inner count`` line per distinct
+    stack, as read by ``flamegraph.pl`` and speedscope.
+    """
+
+    def __init__(self, profiler: Profiler, seconds: float, interval: float):
+        super().__init__(name='wordup-stack-sampler', daemon=True)
+        self.seconds = seconds
+        self.interval = interval
+        self.path = profiler.new_path('sample', '.collapsed')
+        self.profiler = profiler
+        self.deadline = time.monotonic() + seconds
+        self.samples = 0
+
+    def remaining(self) -> float:
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def run(self) -> None:
+        own_id = threading.get_ident()
+        stacks: Counter = Counter()
+        while time.monotonic() < self.deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                thread_name = names.get(thread_id, f'thread-{thread_id}').replace(';', '_')
+                stacks[';'.join([thread_name] + collapse_stack(frame))] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+
+        temporary_path = f'{self.path}.tmp'
+        with open(temporary_path, 'w') as handle:
+            for stack, count in stacks.most_common():
+                handle.write(f'{stack} {count}\n')
+        os.replace(temporary_path, self.path)
+        self.profiler.prune()
+
+
+def get_profiler(app) -> Profiler:
+    """Return this process's profiler, replacing one inherited across fork."""
+    profiler = app.extensions.get('wordup_profiler')
+    if profiler is None or profiler.pid != os.getpid():
+        profiler = Profiler(get_data_folder(app, 'profiles'))
+        app.extensions['wordup_profiler'] = profiler
+    return profiler
+
+
+def profiling_token_required(view):
+    """Allow a view only with ``Authorization: Bearer <PROFILING_TOKEN>``.
+
+    Without a configured token profiling is off and the views answer 404.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config.get('PROFILING_TOKEN')
+        if not token:
+            abort(404)
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode('utf-8'), f'Bearer {token}'.encode('utf-8')):
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_profiling(app) -> None:
+    """Profile armed endpoints of ``app`` (see ``Profiler``)."""
+    get_profiler(app)
+
+    @app.before_request
+    def start_request_profile():
+        profiler = get_profiler(app)
+        if not profiler.armed:
+            return
+        profile = profiler.start_request(request.endpoint)
+        if profile is not None:
+            g.wordup_profile = profile
+
+    @app.teardown_request
+    def finish_request_profile(exc):
+        profile = g.pop('wordup_profile', None)
+        if profile is not None:
+            get_profiler(app).finish_request(profile, request.endpoint or 'unmatched')
@@ -0,0 +1,102 @@
+"""Read-only rows for pages and jobs that only display or serialize data.
+
+An ORM ``VocabularyCard`` is registered in the session's identity map and
+keeps a snapshot of its loaded state for change tracking, which costs
+several times the memory of its column values. Card lists, search results
+and exports never modify what they load, so they select plain columns
+with Core and keep them in the ``__slots__`` classes below. Nothing here
+is added to the session; use the models to change data.
+"""
+from datetime import datetime, timezone
+from typing import Iterable, List
+
+from src.models import ReviewHistory, VocabularyCard
+
+CARD_COLUMNS = (
+    VocabularyCard.id,
+    VocabularyCard.chapter_id,
+    VocabularyCard.source_word,
+    VocabularyCard.target_word,
+    VocabularyCard.example_sentence,
+    VocabularyCard.context_hint,
+    VocabularyCard.box_level,
+    VocabularyCard.next_review,
+    VocabularyCard.review_count,
+    VocabularyCard.correct_count,
+    VocabularyCard.lapse_count,
+    VocabularyCard.last_reviewed_at,
+)
+
+REVIEW_COLUMNS = (
+    ReviewHistory.id,
+    ReviewHistory.card_id,
+    ReviewHistory.correct,
+    ReviewHistory.direction,
+    ReviewHistory.reviewed_at,
+)
+
+
+class CardRow:
+    """Column values of one ``vocabulary_cards`` row, selected with ``CARD_COLUMNS``."""
+
+    __slots__ = tuple(column.key for column in CARD_COLUMNS)
+
+    def __init__(self, row):
+        (self.id, self.chapter_id, self.source_word, self.target_word, self.example_sentence,
+         self.context_hint, self.box_level, self.next_review, self.review_count,
+         self.correct_count, self.lapse_count, self.last_reviewed_at) = row
+
+    # Same results as the VocabularyCard methods of the same name
+    def is_due(self):
+        next_review = self.next_review
+        if next_review.tzinfo is None:
+            next_review = next_review.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) >= next_review
+
+    def get_success_rate(self):
+        if not self.review_count:
+            return 0
+        return round((self.correct_count / self.review_count) * 100, 1)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'source_word': self.source_word,
+            'target_word': self.target_word,
+            'example_sentence': self.example_sentence,
+            'context_hint': self.context_hint,
+            'box_level': self.box_level,
+            'next_review': self.next_review.isoformat(),
+            'is_due': self.is_due(),
+            'review_count': self.review_count,
+            'correct_count': self.correct_count,
+            'lapse_count': self.lapse_count,
+            'last_reviewed_at': self.last_reviewed_at.isoformat() if self.last_reviewed_at else None,
+            'chapter_id': self.chapter_id
+        }
+
+
+class ReviewRow:
+    """Column values of one ``review_history`` row, selected with ``REVIEW_COLUMNS``."""
+
+    __slots__ = tuple(column.key for column in REVIEW_COLUMNS)
+
+    def __init__(self, row):
+        self.id, self.card_id, self.correct, self.direction, self.reviewed_at = row
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'correct': self.correct,
+            'direction': self.direction,
+            'reviewed_at': self.reviewed_at.isoformat(),
+            'card_id': self.card_id
+        }
+
+
+def card_rows(rows: Iterable) -> List[CardRow]:
+    return [CardRow(row) for row in rows]
+
+
+def review_rows(rows: Iterable) -> List[ReviewRow]:
+    return [ReviewRow(row) for row in rows]
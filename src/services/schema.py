@@ -0,0 +1,364 @@
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
+
+from src.models import db
+from src.services.card_stats import rebuild_card_stats
+from src.services.http_cache import VERSIONED_TABLES, create_data_version
+from src.services.normalization import normalized_card_key
+from src.services.search import FTS_TABLE, create_search_index
+
+BACKFILL_BATCH_SIZE = 1000
+
+VERSION_TABLE = 'schema_version'
+
+# Columns added after the initial release: table -> [(column, DDL type)]
+ADDED_COLUMNS = {
+    'vocabulary_cards': [
+        ('normalized_key', 'VARCHAR(500)'),
+        ('review_count', 'INTEGER NOT NULL DEFAULT 0'),
+        ('correct_count', 'INTEGER NOT NULL DEFAULT 0'),
+        ('lapse_count', 'INTEGER NOT NULL DEFAULT 0'),
+        ('last_reviewed_at', 'DATETIME'),
+    ],
+    'jobs': [
+        ('heartbeat_at', 'DATETIME'),
+    ],
+}
+
+# (label, SQL, parameters) of a query a migration is meant to speed up
+PlanQuery = Tuple[str, str, dict]
+
+
+class Migration:
+    """One schema step: ``apply(connection, tables)`` plus what it indexes.
+
+    ``indexes`` names model indexes the step creates and ``plan_queries``
+    the queries whose plans they fix; both are used by the query-plan
+    checks and by ``python -m benchmarks.migrations``. Steps that rebuild
+    tables set ``foreign_keys_off``: SQLite then runs them with foreign key
+    enforcement off, which can only be switched outside a transaction.
+    """
+
+    def __init__(self, version: int, description: str, apply: Callable,
+                 indexes: Sequence[Tuple[str, str]] = (), plan_queries: Sequence[PlanQuery] = (),
+                 foreign_keys_off: bool = False):
+        self.version = version
+        self.description = description
+        self.apply = apply
+        self.indexes = tuple(indexes)
+        self.plan_queries = tuple(plan_queries)
+        self.foreign_keys_off = foreign_keys_off
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str, indexes: Sequence[Tuple[str, str]] = (),
+              plan_queries: Sequence[PlanQuery] = (), foreign_keys_off: bool = False):
+    """Register ``func(connection, tables)`` as schema migration ``version``.
+
+    ``indexes`` are ``(table, index name)`` pairs of model indexes, created
+    before ``func`` runs. Migrations must tolerate tables created by
+    ``db.create_all()`` that already have the current shape.
+    """
+    def decorator(func):
+        if MIGRATIONS and version <= MIGRATIONS[-1].version:
+            raise ValueError(f'Migration {version} registered out of order')
+        MIGRATIONS.append(Migration(version, description, func, indexes, plan_queries, foreign_keys_off))
+        return func
+    return decorator
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def create_model_indexes(connection, indexes: Sequence[Tuple[str, str]], tables=None) -> None:
+    """Create the named model indexes whose tables exist."""
+    for table_name, index_name in indexes:
+        if tables is not None and table_name not in tables:
+            continue
+        table = db.metadata.tables[table_name]
+        index = next(index for index in table.indexes if index.name == index_name)
+        index.create(connection, checkfirst=True)
+
+
+def _ensure_version_table(connection) -> None:
+    connection.execute(text(
+        f'CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ('
+        'version INTEGER PRIMARY KEY, description VARCHAR(200) NOT NULL, applied_at DATETIME NOT NULL)'
+    ))
+
+
+def current_version(connection) -> int:
+    if VERSION_TABLE not in inspect(connection).get_table_names():
+        return 0
+    return connection.execute(text(f'SELECT MAX(version) FROM {VERSION_TABLE}')).scalar() or 0
+
+
+def upgrade_schema(engine, target: Optional[int] = None) -> List[int]:
+    """Apply pending migrations up to ``target`` (default: all).
+
+    ``db.create_all()`` only creates missing tables; migrations add the
+    columns, indexes and derived data introduced later. Each migration runs
+    in its own write transaction and is recorded in ``schema_version``, so
+    concurrent workers starting together apply it once. Returns the
+    versions applied.
+    """
+    applied = []
+    with engine.connect() as connection:
+        _ensure_version_table(connection)
+        connection.commit()
+
+        for step in MIGRATIONS:
+            if target is not None and step.version > target:
+                break
+            foreign_keys = None
+            if step.foreign_keys_off and engine.dialect.name == 'sqlite':
+                foreign_keys = connection.exec_driver_sql('PRAGMA foreign_keys').scalar()
+                connection.exec_driver_sql('PRAGMA foreign_keys = OFF')
+            try:
+                if _apply_migration(connection, step):
+                    applied.append(step.version)
+            finally:
+                if foreign_keys is not None:
+                    connection.rollback()  # Pragma changes are ignored inside a transaction
+                    connection.exec_driver_sql(f'PRAGMA foreign_keys = {"ON" if foreign_keys else "OFF"}')
+    return applied
+
+
+def _apply_migration(connection, step: Migration) -> bool:
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+    if step.version <= current_version(connection):
+        connection.rollback()
+        return False
+
+    tables = set(inspect(connection).get_table_names())
+    create_model_indexes(connection, step.indexes, tables)
+    step.apply(connection, tables)
+    connection.execute(
+        text(f'INSERT INTO {VERSION_TABLE} (version, description, applied_at) '
+             'VALUES (:version, :description, :applied_at)'),
+        {'version': step.version, 'description': step.description,
+         'applied_at': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')}
+    )
+    connection.commit()
+    return True
+
+
+def schema_status(engine) -> dict:
+    """Return the schema version, pending migrations and unindexed foreign keys."""
+    with engine.connect() as connection:
+        version = current_version(connection)
+    return {
+        'version': version,
+        'latest': latest_version(),
+        'pending': [(step.version, step.description) for step in MIGRATIONS if step.version > version],
+        'unindexed_foreign_keys': unindexed_foreign_keys(engine),
+    }
+
+
+def unindexed_foreign_keys(engine) -> List[str]:
+    """List ``table.column`` foreign keys no index starts with.
+
+    Without such an index every join on the key, and every delete of a
+    parent row, scans the child table.
+    """
+    inspector = inspect(engine)
+    missing = []
+    for table_name in inspector.get_table_names():
+        leading = [tuple(index['column_names']) for index in inspector.get_indexes(table_name)]
+        primary_key = tuple(inspector.get_pk_constraint(table_name)['constrained_columns'])
+        leading.append(primary_key)
+        for foreign_key in inspector.get_foreign_keys(table_name):
+            columns = tuple(foreign_key['constrained_columns'])
+            if not any(index[:len(columns)] == columns for index in leading):
+                missing.append(f'{table_name}.{", ".join(columns)}')
+    return missing
+
+
+def query_plan(connection, sql: str, params: Optional[dict] = None) -> List[str]:
+    """Return the ``EXPLAIN QUERY PLAN`` lines of ``sql``."""
+    rows = connection.execute(text(f'EXPLAIN QUERY PLAN {sql}'), params or {})
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    """Plan lines reading a whole table or index, or sorting without an index."""
+    return [line for line in plan if line.startswith('SCAN ') or 'TEMP B-TREE' in line]
+
+
+def backfill_normalized_keys(connection, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Fill ``normalized_key`` for cards created before the column existed."""
+    updated = 0
+    while True:
+        rows = connection.execute(text(
+            'SELECT id, source_word, target_word FROM vocabulary_cards '
+            'WHERE normalized_key IS NULL LIMIT :limit'
+        ), {'limit': batch_size}).fetchall()
+        if not rows:
+            return updated
+        connection.execute(
+            text('UPDATE vocabulary_cards SET normalized_key = :key WHERE id = :id'),
+            [{'id': row.id, 'key': normalized_card_key(row.source_word, row.target_word)}
+             for row in rows]
+        )
+        updated += len(rows)
+
+
+def _foreign_key_actions(foreign_keys) -> set:
+    return {
+        (tuple(key['constrained_columns']), key['referred_table'], (key['options'].get('ondelete') or '').upper())
+        for key in foreign_keys
+    }
+
+
+def foreign_keys_match_model(connection, table_name: str) -> bool:
+    """Whether the table's foreign keys, with their ON DELETE actions, are the model's."""
+    table = db.metadata.tables[table_name]
+    expected = _foreign_key_actions(
+        {'constrained_columns': [column.name for column in constraint.columns],
+         'referred_table': constraint.referred_table.name,
+         'options': {'ondelete': constraint.ondelete}}
+        for constraint in table.foreign_key_constraints
+    )
+    return _foreign_key_actions(inspect(connection).get_foreign_keys(table_name)) == expected
+
+
+def rebuild_table(connection, table_name: str) -> int:
+    """Recreate a SQLite table from its model definition; return the rows dropped.
+
+    SQLite cannot alter constraints, so this is its documented rebuild:
+    create the new table, copy the rows, drop the old one, rename the new
+    one and recreate the old table's indexes and triggers. Rows whose
+    parent row no longer exists (possible while foreign keys were not
+    enforced) are not copied. Must run inside a migration with
+    ``foreign_keys_off``: otherwise dropping the old table deletes through
+    the foreign keys of the tables that reference it.
+    """
+    table = db.metadata.tables[table_name]
+    temporary = f'{table_name}_rebuild'
+    existing = {column['name'] for column in inspect(connection).get_columns(table_name)}
+    columns = ', '.join(column.name for column in table.columns if column.name in existing)
+    total = connection.exec_driver_sql(f'SELECT COUNT(*) FROM {table_name}').scalar()
+    dependents = connection.execute(text(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = :table AND type IN ('index', 'trigger') "
+        "AND sql IS NOT NULL"
+    ), {'table': table_name}).scalars().all()
+
+    ddl = str(CreateTable(table).compile(dialect=connection.dialect))
+    connection.exec_driver_sql(ddl.replace(f'CREATE TABLE {table_name} (', f'CREATE TABLE {temporary} (', 1))
+    conditions = [
+        f'({key.parent.name} IS NULL OR {key.parent.name} IN '
+        f'(SELECT {key.column.name} FROM {key.column.table.name}))'
+        for key in table.foreign_keys
+    ]
+    where = f' WHERE {" AND ".join(conditions)}' if conditions else ''
+    copied = connection.exec_driver_sql(
+        f'INSERT INTO {temporary} ({columns}) SELECT {columns} FROM {table_name}{where}'
+    ).rowcount
+    connection.exec_driver_sql(f'DROP TABLE {table_name}')
+    connection.exec_driver_sql(f'ALTER TABLE {temporary} RENAME TO {table_name}')
+    for statement in dependents:
+        connection.exec_driver_sql(statement)
+
+    violations = connection.exec_driver_sql(f'PRAGMA foreign_key_check({table_name})').fetchall()
+    if violations:
+        raise RuntimeError(f'{table_name} has {len(violations)} rows with a missing parent after the rebuild')
+    return total - copied
+
+
+def _add_columns(connection, tables) -> Dict[str, set]:
+    added: Dict[str, set] = {}
+    for table_name, columns in ADDED_COLUMNS.items():
+        if table_name not in tables:
+            continue
+        existing = {column['name'] for column in inspect(connection).get_columns(table_name)}
+        for column_name, ddl_type in columns:
+            if column_name not in existing:
+                connection.execute(text(
+                    f'ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl_type}'
+                ))
+                added.setdefault(table_name, set()).add(column_name)
+    return added
+
+
+@migration(
+    1, 'Card lookup columns, counters and indexes',
+    indexes=[
+        ('vocabulary_cards', 'ix_vocabulary_cards_chapter_id'),
+        ('vocabulary_cards', 'ix_vocabulary_cards_next_review'),
+        ('vocabulary_cards', 'ix_vocabulary_cards_chapter_next_review'),
+        ('vocabulary_cards', 'ix_vocabulary_cards_chapter_box_level'),
+        ('vocabulary_cards', 'ix_vocabulary_cards_chapter_source_word'),
+    ],
+    plan_queries=[
+        ('due cards of a chapter',
+         'SELECT id FROM vocabulary_cards WHERE chapter_id = :chapter_id AND next_review <= :now '
+         'ORDER BY next_review',
+         {'chapter_id': 1, 'now': '2100-01-01'}),
+        ('cards of a chapter by box',
+         'SELECT box_level, COUNT(*) FROM vocabulary_cards WHERE chapter_id = :chapter_id GROUP BY box_level',
+         {'chapter_id': 1}),
+    ]
+)
+def _card_columns_and_indexes(connection, tables):
+    if 'vocabulary_cards' not in tables:
+        return
+    added = _add_columns(connection, tables)
+    # Created here rather than listed above: it needs the new column
+    create_model_indexes(connection, [('vocabulary_cards', 'ix_vocabulary_cards_chapter_normalized_key')])
+    backfill_normalized_keys(connection)
+    if 'review_count' in added.get('vocabulary_cards', ()) and 'review_history' in tables:
+        rebuild_card_stats(connection)
+
+
+@migration(2, 'Full-text search index over cards')
+def _search_index(connection, tables):
+    if 'vocabulary_cards' in tables and FTS_TABLE not in tables:
+        create_search_index(connection, rebuild=True)
+
+
+@migration(
+    3, 'Index review history by card',
+    indexes=[('review_history', 'ix_review_history_card_reviewed_at')],
+    plan_queries=[
+        ('history of a card',
+         'SELECT correct, reviewed_at FROM review_history WHERE card_id = :card_id ORDER BY reviewed_at',
+         {'card_id': 1}),
+        ('review replay for counters',
+         'SELECT card_id, correct, reviewed_at FROM review_history WHERE card_id IN (1, 2, 3) '
+         'ORDER BY card_id, reviewed_at, id',
+         {}),
+    ]
+)
+def _review_history_card_index(connection, tables):
+    pass  # Index only
+
+
+@migration(4, 'Data version counter for conditional page requests')
+def _data_version(connection, tables):
+    if set(VERSIONED_TABLES) <= tables:
+        create_data_version(connection)
+
+
+@migration(5, 'Delete cards and review history with their chapter in the database', foreign_keys_off=True)
+def _cascading_foreign_keys(connection, tables):
+    # Parents first: the rebuild drops rows whose parent is missing
+    for table_name in ('vocabulary_cards', 'review_history'):
+        if connection.dialect.name != 'sqlite' or table_name not in tables:
+            continue
+        if not foreign_keys_match_model(connection, table_name):
+            dropped = rebuild_table(connection, table_name)
+            if dropped and table_name == 'vocabulary_cards' and FTS_TABLE in tables:
+                # The dropped cards never reached the index's delete trigger
+                create_search_index(connection, rebuild=True)
+
+
+@migration(6, 'Job heartbeats for recovering jobs of stopped workers')
+def _job_heartbeats(connection, tables):
+    _add_columns(connection, tables)
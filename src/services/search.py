@@ -0,0 +1,124 @@
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+from src.models import Chapter, VocabularyCard, db
+from src.services.read_models import CARD_COLUMNS, CardRow, card_rows
+
+FTS_TABLE = 'vocabulary_cards_fts'
+DEFAULT_SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 200
+
+# bm25() column weights: source_word, target_word, example_sentence, context_hint
+BM25_WEIGHTS = (10.0, 10.0, 1.0, 2.0)
+
+_FTS_COLUMNS = 'source_word, target_word, example_sentence, context_hint'
+
+SEARCH_INDEX_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {_FTS_COLUMNS},
+        content='vocabulary_cards', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS vocabulary_cards_fts_insert AFTER INSERT ON vocabulary_cards BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_FTS_COLUMNS})
+        VALUES (new.id, new.source_word, new.target_word, new.example_sentence, new.context_hint);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS vocabulary_cards_fts_delete AFTER DELETE ON vocabulary_cards BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_FTS_COLUMNS})
+        VALUES ('delete', old.id, old.source_word, old.target_word, old.example_sentence, old.context_hint);
+    END
+    """,
+    # Only text edits touch the index; SRS updates (box, next_review) do not
+    f"""
+    CREATE TRIGGER IF NOT EXISTS vocabulary_cards_fts_update
+    AFTER UPDATE OF {_FTS_COLUMNS} ON vocabulary_cards BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_FTS_COLUMNS})
+        VALUES ('delete', old.id, old.source_word, old.target_word, old.example_sentence, old.context_hint);
+        INSERT INTO {FTS_TABLE}(rowid, {_FTS_COLUMNS})
+        VALUES (new.id, new.source_word, new.target_word, new.example_sentence, new.context_hint);
+    END
+    """,
+]
+
+
+def create_search_index(connection, rebuild: bool = False) -> None:
+    """Create the FTS5 table and its sync triggers on ``connection``."""
+    if connection.dialect.name != 'sqlite':
+        return
+    for statement in SEARCH_INDEX_DDL:
+        connection.exec_driver_sql(statement)
+    if rebuild:
+        connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_search_index(connection) -> None:
+    if connection.dialect.name != 'sqlite':
+        return
+    connection.exec_driver_sql(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """Turn user input into an FTS5 query: every word must match as a prefix.
+
+    Words are quoted so user input never becomes FTS5 syntax. Single
+    characters match whole words only; as prefixes they would match most
+    of the index.
+    """
+    terms = re.findall(r'\w+', query or '')
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' if len(term) > 1 else f'"{term}"' for term in terms)
+
+
+def search_cards(query: str, chapter_id: Optional[int] = None,
+                 limit: int = DEFAULT_SEARCH_LIMIT) -> List[Tuple[CardRow, float]]:
+    """Return ``(card, score)`` pairs ranked by bm25 (best first)."""
+    match = build_match_query(query)
+    if match is None:
+        return []
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    sql = (
+        f'SELECT {FTS_TABLE}.rowid AS card_id, bm25({FTS_TABLE}, {weights}) AS score '
+        f'FROM {FTS_TABLE} '
+    )
+    params = {'match': match, 'limit': limit}
+    if chapter_id is not None:
+        sql += f'JOIN vocabulary_cards ON vocabulary_cards.id = {FTS_TABLE}.rowid '
+        sql += f'WHERE {FTS_TABLE} MATCH :match AND vocabulary_cards.chapter_id = :chapter_id '
+        params['chapter_id'] = chapter_id
+    else:
+        sql += f'WHERE {FTS_TABLE} MATCH :match '
+    sql += 'ORDER BY score LIMIT :limit'
+
+    ranked = db.session.execute(text(sql), params).fetchall()
+    if not ranked:
+        return []
+
+    cards = {
+        card.id: card
+        for card in card_rows(db.session.execute(
+            db.select(*CARD_COLUMNS).where(VocabularyCard.id.in_([row.card_id for row in ranked]))
+        ))
+    }
+    return [(cards[row.card_id], row.score) for row in ranked if row.card_id in cards]
+
+
+def chapter_names(chapter_ids) -> dict:
+    """Map chapter ids to names with a single query."""
+    ids = set(chapter_ids)
+    if not ids:
+        return {}
+    rows = db.session.execute(
+        db.select(Chapter.id, Chapter.name).where(Chapter.id.in_(ids))
+    )
+    return {row.id: row.name for row in rows}
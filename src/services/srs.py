@@ -1,6 +1,9 @@
 from datetime import datetime, timedelta, timezone
 import random
 
+from src.models import db
+from src.services.hot_queries import chapter_box_stats, review_queue
+
 class SRSService:
     """Service for Spaced Repetition System logic"""
     
@@ -54,7 +57,8 @@ class SRSService:
     @staticmethod
     def get_review_queue(chapter, direction='random', limit=10):
         """Get cards for review session"""
-        due_cards = SRSService.get_due_cards(chapter.cards)
+        now = datetime.now(timezone.utc)
+        due_cards = db.session.scalars(review_queue(chapter.id, now)).all()
         
         # Shuffle and limit
         random.shuffle(due_cards)
@@ -72,38 +76,39 @@ class SRSService:
     @staticmethod
     def calculate_chapter_stats(chapter):
         """Calculate comprehensive stats for a chapter"""
-        if not chapter.cards:
-            return {
+        return SRSService.calculate_stats_for_chapters([chapter.id])[chapter.id]
+    
+    @staticmethod
+    def calculate_stats_for_chapters(chapter_ids):
+        """Stats of several chapters from one query grouped by box, keyed by chapter id"""
+        stats = {
+            chapter_id: {
                 'total_cards': 0,
                 'due_cards': 0,
                 'success_rate': 0,
                 'box_distribution': {1: 0, 2: 0, 3: 0, 4: 0, 5: 0},
                 'total_reviews': 0
             }
+            for chapter_id in chapter_ids
+        }
+        if not stats:
+            return stats
         
-        total_cards = len(chapter.cards)
-        due_cards = len(SRSService.get_due_cards(chapter.cards))
-        
-        # Box distribution
-        box_distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-        for card in chapter.cards:
-            box_distribution[card.box_level] += 1
+        successful_reviews = dict.fromkeys(stats, 0)
+        rows = db.session.execute(chapter_box_stats(list(stats), datetime.now(timezone.utc)))
+        for row in rows:
+            chapter_stats = stats[row.chapter_id]
+            chapter_stats['total_cards'] += row.cards
+            chapter_stats['due_cards'] += row.due
+            chapter_stats['total_reviews'] += row.reviews
+            successful_reviews[row.chapter_id] += row.correct
+            if row.box_level in chapter_stats['box_distribution']:
+                chapter_stats['box_distribution'][row.box_level] += row.cards
         
         # Success rate calculation
-        total_reviews = sum(len(card.reviews) for card in chapter.cards)
-        if total_reviews > 0:
-            successful_reviews = sum(
-                len([r for r in card.reviews if r.correct]) 
-                for card in chapter.cards
-            )
-            success_rate = round((successful_reviews / total_reviews) * 100, 1)
-        else:
-            success_rate = 0
-        
-        return {
-            'total_cards': total_cards,
-            'due_cards': due_cards,
-            'success_rate': success_rate,
-            'box_distribution': box_distribution,
-            'total_reviews': total_reviews
-        }
\ No newline at end of file
+        for chapter_id, chapter_stats in stats.items():
+            if chapter_stats['total_reviews'] > 0:
+                chapter_stats['success_rate'] = round(
+                    (successful_reviews[chapter_id] / chapter_stats['total_reviews']) * 100, 1
+                )
+        return stats
\ No newline at end of file
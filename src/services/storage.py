@@ -0,0 +1,29 @@
+import os
+from typing import Optional
+
+from sqlalchemy.engine.url import make_url
+
+
+def resolve_database_path(app) -> Optional[str]:
+    """Return the filesystem path for the configured SQLite database."""
+    database_uri = app.config.get("SQLALCHEMY_DATABASE_URI", "")
+    if not database_uri:
+        return None
+
+    url = make_url(database_uri)
+    if url.drivername != "sqlite":
+        return None
+    return url.database
+
+
+def get_data_folder(app, name: str) -> str:
+    """Return a named folder next to the database, creating it if necessary."""
+    db_path = resolve_database_path(app)
+    if not db_path or db_path == ":memory:":
+        base_dir = app.instance_path
+    else:
+        base_dir = os.path.dirname(db_path)
+
+    folder = os.path.join(base_dir, name)
+    os.makedirs(folder, exist_ok=True)
+    return folder
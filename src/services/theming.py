@@ -1,37 +1,25 @@
+import hashlib
 import os
 import secrets
 from typing import Optional
 
-from sqlalchemy.engine.url import make_url
 from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
-ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "webp"}
+from src.services.storage import get_data_folder
 
+ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "webp"}
 
-def _resolve_database_path(app) -> Optional[str]:
-    """Return the filesystem path for the configured SQLite database."""
-    database_uri = app.config.get("SQLALCHEMY_DATABASE_URI", "")
-    if not database_uri:
-        return None
+# Background URLs are content-hashed, so browsers may keep them for a year
+BACKGROUND_MAX_AGE = 365 * 24 * 60 * 60
 
-    url = make_url(database_uri)
-    if url.drivername != "sqlite":
-        return None
-    return url.database
+# How background files are sent: by the app, or by the reverse proxy
+BACKGROUND_OFFLOAD_MODES = ("", "x-accel-redirect", "x-sendfile")
 
 
 def get_theming_folder(app) -> str:
     """Return the theming folder path, creating it if necessary."""
-    db_path = _resolve_database_path(app)
-    if not db_path or db_path == ":memory:":
-        base_dir = app.instance_path
-    else:
-        base_dir = os.path.dirname(db_path)
-
-    folder = os.path.join(base_dir, "theming")
-    os.makedirs(folder, exist_ok=True)
-    return folder
+    return get_data_folder(app, "theming")
 
 
 def allowed_file(filename: str) -> bool:
@@ -47,13 +35,26 @@ def save_background_image(app, file_storage: FileStorage) -> str:
         raise ValueError("Unsupported file type. Allowed: PNG, JPG, JPEG, WEBP")
 
     ext = os.path.splitext(secure_filename(file_storage.filename))[1].lower()
-    filename = f"background_{secrets.token_hex(8)}{ext}"
     target_folder = get_theming_folder(app)
-    target_path = os.path.join(target_folder, filename)
-    file_storage.save(target_path)
+    temporary_path = os.path.join(target_folder, f".upload_{secrets.token_hex(8)}{ext}")
+    file_storage.save(temporary_path)
+
+    # Named by content: the URL changes exactly when the image does, so it
+    # can be cached forever and the hash doubles as its ETag
+    digest = hashlib.sha256()
+    with open(temporary_path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    filename = f"background_{digest.hexdigest()[:16]}{ext}"
+    os.replace(temporary_path, os.path.join(target_folder, filename))
     return filename
 
 
+def background_etag(filename: str) -> str:
+    """Strong ETag of a stored background: the token in its name."""
+    return os.path.splitext(filename)[0].rsplit("_", 1)[-1]
+
+
 def delete_background_image(app, filename: Optional[str]) -> None:
     if not filename:
         return
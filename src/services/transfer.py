@@ -0,0 +1,183 @@
+import io
+import json
+import zipfile
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from werkzeug.utils import secure_filename
+
+from src.models import Chapter, VocabularyCard, ReviewHistory, db
+from src.services.card_stats import rebuild_card_stats
+from src.services.hot_queries import chapter_export_cards, chapter_export_reviews
+from src.services.read_models import card_rows, review_rows
+
+ProgressCallback = Optional[Callable[[int, int], None]]
+
+
+def build_chapter_export(chapter) -> dict:
+    """Serialize a chapter with its cards and review history."""
+    chapter_data = {
+        'chapter': {
+            'name': chapter.name,
+            'source_language': chapter.source_language,
+            'target_language': chapter.target_language,
+            'created_at': chapter.created_at.isoformat() if chapter.created_at else None
+        },
+        'cards': [],
+        'review_history': []
+    }
+
+    cards = card_rows(db.session.execute(chapter_export_cards(chapter.id)))
+    cards_by_id = {}
+    for card in cards:
+        cards_by_id[card.id] = card
+        chapter_data['cards'].append({
+            'source_word': card.source_word,
+            'target_word': card.target_word,
+            'example_sentence': card.example_sentence,
+            'context_hint': card.context_hint,
+            'box_level': card.box_level,
+            'next_review': card.next_review.isoformat() if card.next_review else None
+        })
+
+    # One query for the whole chapter instead of one per card
+    reviews = review_rows(db.session.execute(chapter_export_reviews(chapter.id)))
+    for review in reviews:
+        card = cards_by_id[review.card_id]
+        chapter_data['review_history'].append({
+            'card_source_word': card.source_word,  # For reference during import
+            'card_target_word': card.target_word,  # For reference during import
+            'review_date': review.reviewed_at.isoformat(),
+            'correct': review.correct,
+            'direction': review.direction
+        })
+
+    return chapter_data
+
+
+def write_full_export(target, progress: ProgressCallback = None) -> int:
+    """Write every chapter as JSON into a ZIP archive; return the chapter count."""
+    chapters = Chapter.query.order_by(Chapter.id).all()
+
+    with zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for index, chapter in enumerate(chapters, start=1):
+            json_data = json.dumps(build_chapter_export(chapter), indent=2, ensure_ascii=False)
+            filename = f"chapter_{secure_filename(chapter.name)}.json"
+            zip_file.writestr(filename, json_data.encode('utf-8'))
+            if progress:
+                progress(index, len(chapters))
+
+    return len(chapters)
+
+
+def import_chapter_json(file):
+    """Import a single chapter export and return the new chapter."""
+    data = json.load(file)
+
+    # Validate data structure
+    if 'chapter' not in data or 'cards' not in data:
+        raise ValueError('Invalid file format: missing chapter or cards data')
+
+    chapter_info = data['chapter']
+
+    # Check if chapter already exists
+    existing_chapter = Chapter.query.filter_by(
+        name=chapter_info['name'],
+        source_language=chapter_info['source_language'],
+        target_language=chapter_info['target_language']
+    ).first()
+
+    if existing_chapter:
+        raise ValueError(f'Chapter "{chapter_info["name"]}" already exists')
+
+    # Create new chapter
+    chapter = Chapter(
+        name=chapter_info['name'],
+        source_language=chapter_info['source_language'],
+        target_language=chapter_info['target_language']
+    )
+
+    if chapter_info.get('created_at'):
+        try:
+            chapter.created_at = datetime.fromisoformat(chapter_info['created_at'])
+        except (TypeError, ValueError):
+            pass  # Use default if parsing fails
+
+    db.session.add(chapter)
+    db.session.flush()  # Get the chapter ID
+
+    # Import vocabulary cards
+    card_mapping = {}  # Map old card identifiers to new card objects
+
+    for card_data in data['cards']:
+        card = VocabularyCard(
+            chapter_id=chapter.id,
+            source_word=card_data['source_word'],
+            target_word=card_data['target_word'],
+            example_sentence=card_data.get('example_sentence', ''),
+            context_hint=card_data.get('context_hint', ''),
+            box_level=card_data.get('box_level', 1)
+        )
+
+        if card_data.get('next_review'):
+            try:
+                card.next_review = datetime.fromisoformat(card_data['next_review'])
+            except (TypeError, ValueError):
+                pass  # Use default if parsing fails
+
+        db.session.add(card)
+
+        # Store mapping for review history
+        card_key = f"{card_data['source_word']}:{card_data['target_word']}"
+        card_mapping[card_key] = card
+
+    db.session.flush()  # Get card IDs
+
+    # Import review history if available
+    if 'review_history' in data:
+        for review_data in data['review_history']:
+            card_key = f"{review_data['card_source_word']}:{review_data['card_target_word']}"
+            if card_key in card_mapping:
+                card = card_mapping[card_key]
+
+                review = ReviewHistory(
+                    card_id=card.id,
+                    correct=review_data['correct'],
+                    direction=review_data.get('direction', 'source_to_target')
+                )
+
+                if review_data.get('review_date'):
+                    try:
+                        review.reviewed_at = datetime.fromisoformat(review_data['review_date'])
+                    except (TypeError, ValueError):
+                        pass  # Use default if parsing fails
+
+                db.session.add(review)
+
+    db.session.flush()
+    rebuild_card_stats(db.session.connection(), [card.id for card in card_mapping.values()])
+    db.session.commit()
+    return chapter
+
+
+def import_zip_file(file, progress: ProgressCallback = None) -> List[int]:
+    """Import multiple chapters from a ZIP file; return the new chapter ids."""
+    chapter_ids = []
+
+    with zipfile.ZipFile(file, 'r') as zip_file:
+        names = [name for name in zip_file.namelist() if name.endswith('.json')]
+        for index, filename in enumerate(names, start=1):
+            with zip_file.open(filename) as json_file:
+                json_data = json_file.read().decode('utf-8')
+
+            try:
+                chapter = import_chapter_json(io.StringIO(json_data))
+                chapter_ids.append(chapter.id)
+            except ValueError:
+                # Skip chapters that already exist or have errors
+                db.session.rollback()
+
+            if progress:
+                progress(index, len(names))
+
+    return chapter_ids
@@ -0,0 +1,259 @@
+import atexit
+import contextlib
+import itertools
+import os
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+from flask import current_app
+
+from src.models import db
+from src.services.metrics import WRITE_LOCK_WAIT
+from src.services.storage import resolve_database_path
+
+try:
+    import fcntl
+except ImportError:  # Windows: the writers of different processes are not serialized
+    fcntl = None
+
+# Lower values are written first: answers jump ahead of queued import batches
+PRIORITY_ANSWER = 0
+PRIORITY_NORMAL = 5
+PRIORITY_BULK = 10
+_PRIORITY_STOP = 100
+
+DEFAULT_WRITE_QUEUE_SIZE = 1000
+DEFAULT_WRITE_QUEUE_TIMEOUT = 5.0  # seconds a request waits for its write
+DEFAULT_WRITE_BATCH_SIZE = 50  # intents committed together
+
+# Background jobs are allowed to wait much longer than requests
+BACKGROUND_WRITE_TIMEOUT = 10 * 60
+
+
+class WriteQueueError(Exception):
+    """A write could not be applied in time; the client should retry."""
+
+
+class WriteQueueFull(WriteQueueError):
+    pass
+
+
+class WriteTimeout(WriteQueueError):
+    pass
+
+
+class _WriteIntent:
+    __slots__ = ('func', 'args', 'kwargs', 'state', 'result', 'error', 'done')
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.state = 'queued'
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class _WriterLock:
+    """Exclusive lock file next to the SQLite database.
+
+    Every worker process has its own writer thread; they take this lock
+    around each batch, so only one process writes at a time and the others
+    wait here, in arrival order, instead of retrying against SQLite's
+    ``busy_timeout``. The lock is released by the kernel if a worker dies.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        if self._file is None:
+            self._file = open(self.path, 'ab')
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        return False
+
+
+def _writer_lock(app):
+    db_path = resolve_database_path(app)
+    if fcntl is None or not db_path or db_path == ':memory:':
+        return contextlib.nullcontext()
+    return _WriterLock(db_path + '.writer-lock')
+
+
+class WriteQueue:
+    """Writer thread applying write intents for one process.
+
+    Each worker process runs its own writer; batches of different workers
+    are serialized through a lock file (see ``_WriterLock``). Writes that do
+    not go through ``run_write`` (jobs bookkeeping, migrations) still rely
+    on SQLite's ``busy_timeout``.
+
+    Intents are taken in priority order and up to ``WRITE_BATCH_SIZE`` of
+    them share one transaction (group commit). In a batch of several each
+    runs in its own savepoint, so a failing intent is rolled back alone and
+    its error is raised in the thread that submitted it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.pid = os.getpid()
+        self.batch_size = app.config.get('WRITE_BATCH_SIZE', DEFAULT_WRITE_BATCH_SIZE)
+        self.queue = queue.PriorityQueue(maxsize=app.config.get('WRITE_QUEUE_SIZE', DEFAULT_WRITE_QUEUE_SIZE))
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._writer_lock = _writer_lock(app)
+        self.thread = threading.Thread(target=self._run, name='wordup-writer', daemon=True)
+        self.thread.start()
+
+    def submit(self, func: Callable, args: tuple = (), kwargs: Optional[dict] = None,
+               priority: int = PRIORITY_NORMAL, timeout: Optional[float] = None):
+        """Queue ``func(*args, **kwargs)`` and wait for its commit.
+
+        Raises WriteQueueFull if the queue stays full and WriteTimeout if the
+        write has not started within ``timeout`` seconds (it is then dropped).
+        A write that has started is always waited for.
+        """
+        intent = _WriteIntent(func, args, kwargs or {})
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            self.queue.put((priority, next(self._sequence), intent), timeout=timeout)
+        except queue.Full:
+            raise WriteQueueFull('Too many pending writes, please try again.')
+
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if not intent.done.wait(remaining):
+            with self._lock:
+                if intent.state == 'queued':
+                    intent.state = 'cancelled'
+                    raise WriteTimeout('The database is busy, please try again.')
+            intent.done.wait()
+
+        if intent.error is not None:
+            raise intent.error
+        return intent.result
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """Finish the queued writes and stop the writer thread."""
+        if self.thread.is_alive():
+            self.queue.put((_PRIORITY_STOP, next(self._sequence), None))
+            self.thread.join(timeout)
+
+    def _run(self) -> None:
+        with self.app.app_context():
+            while True:
+                _, _, intent = self.queue.get()
+                if intent is None:
+                    return
+                batch = [intent]
+                stop = False
+                while len(batch) < self.batch_size:
+                    try:
+                        _, _, intent = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if intent is None:
+                        stop = True
+                        break
+                    batch.append(intent)
+                self._apply(batch)
+                if stop:
+                    return
+
+    def _apply(self, batch) -> None:
+        waiting = time.perf_counter()
+        with self._writer_lock:
+            self._apply_locked(batch, waiting)
+
+    def _apply_locked(self, batch, waiting: float) -> None:
+        # Intents whose request gave up while another process held the lock are dropped here
+        with self._lock:
+            batch = [intent for intent in batch if intent.state == 'queued']
+            for intent in batch:
+                intent.state = 'running'
+        if not batch:
+            return
+
+        try:
+            if db.engine.dialect.name == 'sqlite':
+                # Take the write lock up front instead of upgrading a read
+                # lock half way, and make the savepoints nest inside it
+                db.session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+                WRITE_LOCK_WAIT.observe(time.perf_counter() - waiting)
+            if len(batch) == 1:
+                # Nothing to isolate it from: the transaction is its savepoint
+                intent = batch[0]
+                try:
+                    intent.result = intent.func(*intent.args, **intent.kwargs)
+                except Exception as exc:
+                    intent.error = exc
+                    db.session.rollback()
+                    return
+            else:
+                for intent in batch:
+                    try:
+                        with db.session.begin_nested():
+                            intent.result = intent.func(*intent.args, **intent.kwargs)
+                    except Exception as exc:
+                        intent.error = exc
+            db.session.commit()
+        except Exception as exc:
+            self.app.logger.exception('Write batch of %d failed', len(batch))
+            db.session.rollback()
+            for intent in batch:
+                if intent.error is None:
+                    intent.result = None
+                    intent.error = exc
+        finally:
+            db.session.remove()
+            for intent in batch:
+                intent.done.set()
+
+
+_queue_lock = threading.Lock()
+
+
+def get_write_queue(app) -> WriteQueue:
+    """Return this process's write queue, starting its thread on first use."""
+    with _queue_lock:
+        write_queue = app.extensions.get('wordup_writer')
+        if write_queue is None or write_queue.pid != os.getpid():
+            write_queue = WriteQueue(app)
+            app.extensions['wordup_writer'] = write_queue
+            atexit.register(write_queue.stop)
+        return write_queue
+
+
+def run_write(func: Callable, *args, priority: int = PRIORITY_NORMAL,
+              timeout: Optional[float] = None, **kwargs):
+    """Apply ``func(*args, **kwargs)`` and commit it.
+
+    With ``WRITE_QUEUE_ENABLED`` the call goes through this process's writer
+    thread and ``func`` runs there, in the writer's session: it must load
+    what it changes by id and return plain values, not ORM objects.
+    ``timeout`` defaults to ``WRITE_QUEUE_TIMEOUT``. Without the queue
+    ``func`` runs here and the current session is committed.
+    """
+    app = current_app._get_current_object()
+    if not app.config.get('WRITE_QUEUE_ENABLED'):
+        try:
+            result = func(*args, **kwargs)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return result
+
+    write_queue = get_write_queue(app)
+    if threading.current_thread() is write_queue.thread:
+        return func(*args, **kwargs)  # Already inside a queued write
+    if timeout is None:
+        timeout = app.config.get('WRITE_QUEUE_TIMEOUT', DEFAULT_WRITE_QUEUE_TIMEOUT)
+    return write_queue.submit(func, args, kwargs, priority=priority, timeout=timeout)
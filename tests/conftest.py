@@ -6,6 +6,8 @@ import sys
 import tempfile
 
 import pytest
+from flask import request as flask_request, request_finished, request_started
+from sqlalchemy import event
 
 # Add project root to Python path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -13,6 +15,7 @@ sys.path.insert(0, project_root)
 
 from src.app import create_app
 from src.models import db, Chapter, VocabularyCard
+from src.services.metrics import _current_store
 
 @pytest.fixture
 def app():
@@ -25,7 +28,11 @@ def app():
         'TESTING': True,
         'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
         'SECRET_KEY': 'test-secret-key',
-        'WTF_CSRF_ENABLED': False
+        'WTF_CSRF_ENABLED': False,
+        'JOBS_RUN_INLINE': True,
+        'SQLITE_OPTIMIZE_ON_EXIT': False,
+        'STRICT_LOADING': True,
+        'METRICS_ENABLED': True
     }
     
     # Create app with test config
@@ -37,12 +44,57 @@ def app():
         
     # Cleanup
     os.close(db_fd)
-    if os.path.exists(db_path):
-        os.unlink(db_path)
+    for path in (db_path, f'{db_path}-wal', f'{db_path}-shm', f'{db_path}.writer-lock'):
+        if os.path.exists(path):
+            os.unlink(path)
 
-    theming_dir = os.path.join(os.path.dirname(db_path), 'theming')
-    if os.path.exists(theming_dir):
-        shutil.rmtree(theming_dir)
+    # The metrics flusher must not write into the folder while it is removed
+    _current_store().close()
+    for folder in ('theming', 'snapshots', 'jobs', 'cache', 'metrics', 'profiles'):
+        data_dir = os.path.join(os.path.dirname(db_path), folder)
+        if os.path.exists(data_dir):
+            shutil.rmtree(data_dir)
+
+@pytest.fixture(autouse=True)
+def statement_budget(request):
+    """Fail a test marked ``statement_budget(n)`` if one of its requests runs more than n SQL statements.
+
+    Budgets keep N+1 patterns (one query per chapter, card or review) from
+    coming back: give the test enough rows that a per-row query would
+    exceed the budget.
+    """
+    marker = request.node.get_closest_marker('statement_budget')
+    if marker is None:
+        yield
+        return
+    budget = marker.args[0]
+    app = request.getfixturevalue('app')
+    engine = db.engine
+    state = {'statements': None, 'over': []}
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        if state['statements'] is not None:
+            state['statements'].append(statement)
+
+    def request_began(sender, **extra):
+        state['statements'] = []
+
+    def request_ended(sender, response, **extra):
+        statements, state['statements'] = state['statements'], None
+        if statements is not None and len(statements) > budget:
+            state['over'].append((f'{flask_request.method} {flask_request.full_path}', statements))
+
+    event.listen(engine, 'before_cursor_execute', count_statement)
+    try:
+        with request_started.connected_to(request_began, app), request_finished.connected_to(request_ended, app):
+            yield
+    finally:
+        event.remove(engine, 'before_cursor_execute', count_statement)
+
+    if state['over']:
+        path, statements = state['over'][0]
+        listing = '\n'.join(f'  {statement}' for statement in statements)
+        pytest.fail(f'{path} ran {len(statements)} SQL statements (budget {budget}):\n{listing}')
 
 @pytest.fixture
 def client(app):
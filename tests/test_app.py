@@ -1,5 +1,9 @@
 """Test the Flask application factory and basic functionality."""
 
+import os
+
+import pytest
+
 def test_app_creation(app):
     """Test that the app is created correctly."""
     assert app is not None
@@ -21,4 +25,566 @@ def test_database_tables(app):
         
         assert 'chapters' in tables
         assert 'vocabulary_cards' in tables
-        assert 'review_history' in tables
\ No newline at end of file
+        assert 'review_history' in tables
+
+
+def test_snapshot_and_restore_commands(app, runner, tmp_path):
+    """The snapshot CLI writes a copy that restore-snapshot swaps back in."""
+    from src.models import db, Chapter
+
+    with app.app_context():
+        db.session.add(Chapter(name="Kept", source_language="German", target_language="English"))
+        db.session.commit()
+
+    snapshot_path = tmp_path / 'snapshot.db'
+    result = runner.invoke(args=['snapshot', str(snapshot_path), '--pages', '1'])
+    assert result.exit_code == 0, result.output
+    assert snapshot_path.exists()
+
+    with app.app_context():
+        db.session.add(Chapter(name="Discarded", source_language="German", target_language="English"))
+        db.session.commit()
+
+    result = runner.invoke(args=['restore-snapshot', str(snapshot_path), '--yes'])
+    assert result.exit_code == 0, result.output
+    assert 'Previous database kept at' in result.output
+    previous_path = result.output.rsplit('Previous database kept at ', 1)[1].strip()
+    assert os.path.exists(previous_path)
+    os.unlink(previous_path)
+
+    with app.app_context():
+        db.session.remove()
+        names = [chapter.name for chapter in Chapter.query.all()]
+        assert names == ["Kept"]
+
+
+def test_restore_snapshot_rejects_invalid_file(runner, tmp_path):
+    """Restoring something that is not a WordUp database fails cleanly."""
+    bogus = tmp_path / 'bogus.db'
+    bogus.write_bytes(b'not a database')
+    result = runner.invoke(args=['restore-snapshot', str(bogus), '--yes'])
+    assert result.exit_code != 0
+    assert 'Not a valid SQLite database' in result.output
+
+
+def test_snapshot_completes_while_learners_write(app, tmp_path, monkeypatch):
+    """Concurrent commits neither restart a snapshot forever nor leave a staging file."""
+    import sqlite3
+    import threading
+    import time
+    from src.models import Chapter, db
+    from src.services import backup
+    from src.services.storage import resolve_database_path
+
+    with app.app_context():
+        db.session.add_all(Chapter(name=f'Chapter {index} ' + 'x' * 400, source_language='German',
+                                   target_language='English') for index in range(2000))
+        db.session.commit()
+
+    def keep_writing(path, stop):
+        connection = sqlite3.connect(path, timeout=10)
+        while not stop.is_set():
+            connection.execute("INSERT INTO chapters (name, source_language, target_language) "
+                               "VALUES ('Live', 'German', 'English')")
+            connection.commit()
+            time.sleep(0.002)
+        connection.close()
+
+    def snapshot_with_writer(path, make_snapshot):
+        stop = threading.Event()
+        writer = threading.Thread(target=keep_writing, args=(path, stop))
+        writer.start()
+        try:
+            done = threading.Thread(target=make_snapshot)
+            done.start()
+            done.join(30)
+            assert not done.is_alive(), 'snapshot kept restarting'
+        finally:
+            stop.set()
+            writer.join(10)
+
+    # WAL (the default): copied in one step under a read snapshot
+    target = tmp_path / 'wal.db'
+    snapshot_with_writer(resolve_database_path(app),
+                         lambda: backup.create_snapshot(app, str(target), pages=1, pause=0.001))
+    backup.verify_snapshot(str(target))
+
+    # Rollback journal: stepped, and finished in one step after too many restarts
+    journal_db = tmp_path / 'journal.db'
+    connection = sqlite3.connect(journal_db)
+    connection.execute('PRAGMA journal_mode = DELETE')
+    connection.execute('CREATE TABLE chapters (id INTEGER PRIMARY KEY, name TEXT, '
+                       'source_language TEXT, target_language TEXT)')
+    connection.executemany('INSERT INTO chapters (name) VALUES (?)', [('x' * 400,)] * 2000)
+    connection.commit()
+    connection.close()
+    copy = tmp_path / 'journal-copy.db'
+
+    def copy_journal_database():
+        source = sqlite3.connect(journal_db)
+        try:
+            backup._copy_database(source, str(copy), pages=1, pause=0.001)
+        finally:
+            source.close()
+
+    snapshot_with_writer(str(journal_db), copy_journal_database)
+    assert sqlite3.connect(copy).execute('SELECT COUNT(*) FROM chapters').fetchone()[0] >= 2000
+
+    def failing_copy(source, staging_path, pages, pause):
+        sqlite3.connect(staging_path).close()
+        raise sqlite3.OperationalError('disk full')
+
+    monkeypatch.setattr(backup, '_copy_database', failing_copy)
+    failed = tmp_path / 'failed.db'
+    with pytest.raises(sqlite3.OperationalError):
+        backup.create_snapshot(app, str(failed))
+    assert not os.path.exists(f'{failed}.partial')
+
+
+def test_job_runner_executes_in_background(app):
+    """Without inline mode jobs run on the runner's worker threads."""
+    from src.models import Job, db
+    from src.services.jobs import enqueue_job, get_job_runner
+
+    app.config['JOBS_RUN_INLINE'] = False
+    with app.app_context():
+        job = enqueue_job(app, 'export_all')
+        get_job_runner(app).wait(job.id, timeout=10)
+        db.session.expire_all()
+        job = db.session.get(Job, job.id)
+        assert job.status == 'succeeded'
+        assert os.path.exists(job.artifact_path)
+        assert job.expires_at is not None
+
+
+def test_expired_jobs_are_purged(app):
+    """Expired jobs lose their row and artifact file."""
+    from datetime import datetime, timedelta, timezone
+    from src.models import Job, db
+    from src.services.jobs import get_jobs_folder, purge_expired_jobs
+
+    with app.app_context():
+        artifact = os.path.join(get_jobs_folder(app), 'old_export.zip')
+        with open(artifact, 'wb') as handle:
+            handle.write(b'zip')
+        db.session.add(Job(kind='export_all', status='succeeded', artifact_path=artifact,
+                           expires_at=datetime.now(timezone.utc) - timedelta(minutes=1)))
+        db.session.commit()
+
+        assert purge_expired_jobs(app) == 1
+        assert Job.query.count() == 0
+        assert not os.path.exists(artifact)
+
+
+def test_jobs_of_stopped_workers_are_recovered(app):
+    """Running jobs without a heartbeat fail and lose their files; unclaimed ones run."""
+    from datetime import datetime, timedelta, timezone
+    from src.models import Job, db
+    from src.services.jobs import LOST_JOB_ERROR, get_jobs_folder, recover_lost_jobs
+
+    with app.app_context():
+        folder = get_jobs_folder(app)
+        long_ago = datetime.now(timezone.utc) - timedelta(minutes=10)
+        lost = Job(kind='export_all', status='running', started_at=long_ago, heartbeat_at=long_ago,
+                   input_path=os.path.join(folder, 'input_lost.json'))
+        alive = Job(kind='export_all', status='running', started_at=long_ago,
+                    heartbeat_at=datetime.now(timezone.utc))
+        unclaimed = Job(kind='export_all', created_at=long_ago)
+        db.session.add_all([lost, alive, unclaimed])
+        db.session.commit()
+        partial = os.path.join(folder, f'{lost.id}_backup.zip')
+        for path in (lost.input_path, partial):
+            with open(path, 'wb') as handle:
+                handle.write(b'partial')
+
+        assert recover_lost_jobs(app) == 2
+        db.session.expire_all()
+        assert (lost.status, lost.error) == ('failed', LOST_JOB_ERROR)
+        assert lost.expires_at is not None
+        assert not os.path.exists(lost.input_path)
+        assert not os.path.exists(partial)
+        assert alive.status == 'running'
+        assert unclaimed.status == 'succeeded'  # Run inline in tests
+        assert recover_lost_jobs(app) == 0
+
+
+def test_upgrade_schema_adds_columns_to_legacy_database(tmp_path):
+    """Existing databases gain new columns and indexes, with keys backfilled."""
+    import sqlite3
+    from sqlalchemy import create_engine, inspect
+    from src.services.schema import upgrade_schema
+
+    db_path = tmp_path / 'legacy.db'
+    connection = sqlite3.connect(db_path)
+    connection.executescript('''
+        CREATE TABLE chapters (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL,
+            source_language VARCHAR(50) NOT NULL, target_language VARCHAR(50) NOT NULL, created_at DATETIME);
+        CREATE TABLE vocabulary_cards (id INTEGER PRIMARY KEY, source_word VARCHAR(200) NOT NULL,
+            target_word VARCHAR(200) NOT NULL, example_sentence TEXT, context_hint VARCHAR(500),
+            created_at DATETIME, box_level INTEGER, next_review DATETIME, chapter_id INTEGER NOT NULL);
+        INSERT INTO chapters VALUES (1, 'Old', 'German', 'English', NULL);
+        INSERT INTO vocabulary_cards (id, source_word, target_word, chapter_id) VALUES (1, 'Haus', 'House', 1);
+        -- Left behind by a chapter deleted while foreign keys were not enforced
+        INSERT INTO vocabulary_cards (id, source_word, target_word, chapter_id) VALUES (2, 'Baum', 'Tree', 9);
+    ''')
+    connection.close()
+
+    engine = create_engine(f'sqlite:///{db_path}')
+    assert upgrade_schema(engine) == [1, 2, 3, 4, 5, 6]
+    assert upgrade_schema(engine) == []  # already at the latest version
+
+    inspector = inspect(engine)
+    assert 'normalized_key' in {c['name'] for c in inspector.get_columns('vocabulary_cards')}
+    assert 'ix_vocabulary_cards_chapter_normalized_key' in {
+        i['name'] for i in inspector.get_indexes('vocabulary_cards')
+    }
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql('SELECT MAX(version) FROM schema_version').scalar() == 6
+        assert conn.exec_driver_sql('SELECT normalized_key FROM vocabulary_cards').scalar() == 'haus\thouse'
+        assert conn.exec_driver_sql('SELECT review_count FROM vocabulary_cards').scalar() == 0
+        # The search index is created and filled from the existing rows
+        assert conn.exec_driver_sql(
+            "SELECT rowid FROM vocabulary_cards_fts WHERE vocabulary_cards_fts MATCH 'haus'"
+        ).scalar() == 1
+        # The rebuilt table cascades deletes, kept its triggers and dropped the orphan
+        assert conn.exec_driver_sql('SELECT COUNT(*) FROM vocabulary_cards').scalar() == 1
+        assert conn.exec_driver_sql(
+            "SELECT rowid FROM vocabulary_cards_fts WHERE vocabulary_cards_fts MATCH 'baum'"
+        ).scalar() is None
+        conn.exec_driver_sql('PRAGMA foreign_keys = ON')
+        conn.exec_driver_sql('DELETE FROM chapters')
+        assert conn.exec_driver_sql('SELECT COUNT(*) FROM vocabulary_cards').scalar() == 0
+        assert conn.exec_driver_sql(
+            "SELECT rowid FROM vocabulary_cards_fts WHERE vocabulary_cards_fts MATCH 'haus'"
+        ).scalar() is None
+    assert {key['options'].get('ondelete') for key in inspector.get_foreign_keys('vocabulary_cards')} == {'CASCADE'}
+    engine.dispose()
+
+
+def test_rebuild_card_stats_command(app, runner, sample_card):
+    """The rebuild command recomputes counters from the review history."""
+    from datetime import datetime, timedelta, timezone
+    from src.models import ReviewHistory, VocabularyCard, db
+
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    with app.app_context():
+        for offset, correct in enumerate([True, False, True]):
+            db.session.add(ReviewHistory(card_id=sample_card.id, correct=correct, direction='source_to_target',
+                                         reviewed_at=start + timedelta(days=offset)))
+        db.session.commit()
+
+    result = runner.invoke(args=['rebuild-card-stats'])
+    assert result.exit_code == 0, result.output
+    assert 'Rebuilt review counters for 1 cards' in result.output
+
+    with app.app_context():
+        card = db.session.get(VocabularyCard, sample_card.id)
+        assert (card.review_count, card.correct_count, card.lapse_count) == (3, 2, 1)
+        assert card.last_reviewed_at == datetime(2025, 1, 3)
+
+
+def test_sqlite_pragmas_applied_to_connections(app):
+    """Every pooled connection gets the configured pragmas."""
+    from src.models import db
+
+    with app.app_context():
+        with db.engine.connect() as connection:
+            pragma = lambda name: connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+            assert pragma('journal_mode') == 'wal'
+            assert pragma('synchronous') == 1  # NORMAL
+            assert pragma('foreign_keys') == 1
+            assert pragma('busy_timeout') == 5000
+            assert pragma('temp_store') == 2  # MEMORY
+            assert pragma('cache_size') == -32000
+
+
+def test_invalid_sqlite_setting_is_rejected(tmp_path):
+    """Misconfigured pragmas fail at startup instead of being sent to SQLite."""
+    import pytest
+    from src.app import create_app
+
+    with pytest.raises(ValueError, match='SQLITE_SYNCHRONOUS'):
+        create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path}/x.db',
+                    'SQLITE_SYNCHRONOUS': 'fast; DROP TABLE chapters'})
+
+
+def test_write_queue_isolates_failing_writes(app):
+    """Queued writes share one commit, but a failing write is rolled back alone."""
+    import threading
+    import time
+    from src.models import Chapter, db
+    from src.services.metrics import _current_store
+    from src.services.writer import get_write_queue
+
+    app.config['WRITE_QUEUE_ENABLED'] = True
+    started, gate = threading.Event(), threading.Event()
+    errors = []
+
+    def hold():
+        started.set()
+        gate.wait(10)
+
+    def add_chapter(name):
+        db.session.add(Chapter(name=name, source_language='German', target_language='English'))
+        db.session.flush()
+        if name == 'bad':
+            raise ValueError('bad chapter')
+
+    def submit(name):
+        try:
+            write_queue.submit(add_chapter, (name,))
+        except ValueError as exc:
+            errors.append(str(exc))
+
+    with app.app_context():
+        write_queue = get_write_queue(app)
+        holder = threading.Thread(target=write_queue.submit, args=(hold,))
+        holder.start()
+        started.wait(10)
+
+        # Queued while the writer is busy, so they are committed as one batch
+        writers = [threading.Thread(target=submit, args=(name,)) for name in ('one', 'bad', 'two')]
+        for thread in writers:
+            thread.start()
+        deadline = time.monotonic() + 10
+        while write_queue.queue.qsize() < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        gate.set()
+        for thread in [holder] + writers:
+            thread.join(10)
+
+        assert errors == ['bad chapter']
+        assert sorted(name for (name,) in db.session.query(Chapter.name)) == ['one', 'two']
+        write_queue.stop()
+        # The hold and the batch of three each waited for the write lock once
+        assert _current_store().collect()[('wordup_db_write_lock_wait_seconds_count', ())] == 2
+
+
+def test_db_status_and_upgrade_commands(app, runner):
+    """The CLI reports pending migrations and applies them."""
+    result = runner.invoke(args=['db-status'])
+    assert 'Schema version 0' in result.output
+    assert 'pending 3: Index review history by card' in result.output
+
+    result = runner.invoke(args=['db-upgrade'])
+    assert result.exit_code == 0
+    assert 'Applied migration 3' in result.output
+    assert 'Applied migration 5' in result.output
+    assert 'up to date' in runner.invoke(args=['db-upgrade']).output
+    with app.app_context():
+        from src.models import db
+        with db.engine.connect() as connection:
+            # Turned off for the table rebuild only
+            assert connection.exec_driver_sql('PRAGMA foreign_keys').scalar() == 1
+
+    result = runner.invoke(args=['db-status', '--plans'])
+    assert 'Schema version 6 (latest 6)' in result.output
+    assert 'pending' not in result.output
+    assert 'foreign key without index' not in result.output
+    assert '[SCAN]' not in result.output
+
+
+def test_migration_indexes_fix_their_query_plans(app):
+    """Each migration's queries scan without its indexes and search with them."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import NullPool
+    from src.services.schema import MIGRATIONS, create_model_indexes, full_scans, query_plan, unindexed_foreign_keys
+
+    # A fresh connection per plan, so no statement prepared against the
+    # previous schema is reused
+    engine = create_engine(app.config['SQLALCHEMY_DATABASE_URI'], poolclass=NullPool)
+    assert unindexed_foreign_keys(engine) == []
+    for step in [step for step in MIGRATIONS if step.plan_queries]:
+        with engine.begin() as connection:
+            for _, index_name in step.indexes:
+                connection.exec_driver_sql(f'DROP INDEX {index_name}')
+        with engine.connect() as connection:
+            assert all(full_scans(query_plan(connection, sql, params))
+                       for _, sql, params in step.plan_queries)
+        with engine.begin() as connection:
+            create_model_indexes(connection, step.indexes)
+        with engine.connect() as connection:
+            for label, sql, params in step.plan_queries:
+                assert full_scans(query_plan(connection, sql, params)) == [], label
+    engine.dispose()
+
+
+def test_hot_queries_use_their_indexes(app):
+    """Every registered hot query searches through its indexes, and losing one is reported."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import NullPool
+    from src.services.hot_queries import HOT_QUERIES, check_hot_queries
+
+    engine = create_engine(app.config['SQLALCHEMY_DATABASE_URI'], poolclass=NullPool)
+    with engine.connect() as connection:
+        assert check_hot_queries(connection) == {name: [] for name in HOT_QUERIES}
+
+    with engine.begin() as connection:
+        connection.exec_driver_sql('DROP INDEX ix_vocabulary_cards_chapter_next_review')
+    with engine.connect() as connection:
+        problems = check_hot_queries(connection)
+    assert problems['due cards of a chapter']
+    assert problems['session queue of due cards']
+    assert problems['chapter export review history'] == []
+    engine.dispose()
+
+
+def test_gunicorn_config_reads_environment(monkeypatch):
+    """The production server is configured with WORDUP_* variables."""
+    import runpy
+
+    monkeypatch.setenv('WORDUP_HOST', '0.0.0.0')
+    monkeypatch.setenv('WORDUP_PORT', '8080')
+    monkeypatch.setenv('WORDUP_WORKERS', '3')
+    monkeypatch.setenv('WORDUP_MAX_REQUESTS', '0')
+    monkeypatch.setenv('WORDUP_PRELOAD', 'false')
+    config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'gunicorn.conf.py')
+    config = runpy.run_path(config_path)
+
+    assert config['bind'] == '0.0.0.0:8080'
+    assert config['workers'] == 3
+    assert config['threads'] == 4
+    assert config['max_requests'] == 0
+    assert config['preload_app'] is False
+
+
+def test_instrumentation_reports_server_timing(app, client, sample_card, caplog):
+    """Instrumented requests report SQL, render and row counts; slow ones dump their SQL."""
+    import json
+    import logging
+    from src.models import db
+    from src.services.instrumentation import init_instrumentation
+
+    def failing_statement():
+        from sqlalchemy import text
+        from sqlalchemy.exc import OperationalError
+        try:
+            db.session.execute(text('SELECT missing FROM nowhere'))
+        except OperationalError:
+            leaked = 'wordup_query_started' in db.session.connection().info
+            db.session.rollback()
+        return str(leaked)
+
+    app.add_url_rule('/test/failing-statement', 'test_failing_statement', failing_statement)
+
+    init_instrumentation(app, db.engine)
+    with caplog.at_level(logging.INFO, logger='src.services.instrumentation'):
+        response = client.get(f'/chapters/{sample_card.chapter_id}')
+    metrics = {part.split(';')[0]: part for part in response.headers['Server-Timing'].split(', ')}
+    assert set(metrics) == {'total', 'db', 'render', 'orm'}
+    assert 'queries"' in metrics['db'] and 'rows"' in metrics['orm']
+
+    record = json.loads(caplog.records[-1].getMessage().split(' ', 1)[1])
+    assert record['endpoint'] == 'chapters.view_chapter'
+    assert record['sql_count'] > 0 and record['rows'] > 0
+    assert 'statements' not in record
+
+    app.config['SLOW_REQUEST_MS'] = 0.001
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger='src.services.instrumentation'):
+        client.get(f'/cards/{sample_card.id}')
+    assert caplog.records[-1].levelname == 'WARNING'
+    record = json.loads(caplog.records[-1].getMessage().split(' ', 2)[2])
+    assert any('FROM vocabulary_cards' in s['sql'] for s in record['statements'])
+
+    # A failing statement is timed and leaves no start time behind
+    response = client.get('/test/failing-statement')
+    assert response.get_data(as_text=True) == 'False'
+    assert '"1 queries"' in response.headers['Server-Timing']
+
+
+def test_profiling_requests_and_stack_samples(app, client, sample_card):
+    """With the token, the next requests to an endpoint are profiled and stacks are sampled."""
+    import pstats
+    from src.services.profiling import get_profiler, init_profiling
+
+    init_profiling(app)
+    assert client.get('/admin/profiling').status_code == 404
+    app.config['PROFILING_TOKEN'] = 'secret'
+    headers = {'Authorization': 'Bearer secret'}
+    assert client.get('/admin/profiling', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+
+    response = client.post('/admin/profiling/requests', data={'endpoint': 'nope'}, headers=headers)
+    assert response.status_code == 400
+    response = client.post('/admin/profiling/requests', headers=headers,
+                           data={'endpoint': 'chapters.view_chapter', 'count': 2})
+    assert response.status_code == 202
+    assert response.get_json()['armed'] == {'chapters.view_chapter': 2}
+
+    for _ in range(3):
+        client.get(f'/chapters/{sample_card.chapter_id}')
+    status = client.get('/admin/profiling', headers=headers).get_json()
+    assert status['armed'] == {}
+    profiles = [entry['name'] for entry in status['files'] if entry['name'].endswith('.pstats')]
+    assert len(profiles) == 2 and all('chapters_view_chapter' in name for name in profiles)
+
+    folder = get_profiler(app).folder
+    for profile in profiles:
+        stats = pstats.Stats(os.path.join(folder, profile))
+        assert any(name == 'view_chapter' for _, _, name in stats.stats), profile
+    response = client.get(f'/admin/profiling/files/{profiles[0]}', headers=headers)
+    assert response.status_code == 200
+    response.close()
+
+    response = client.post('/admin/profiling/sample', data={'seconds': 0.2, 'interval_ms': 5}, headers=headers)
+    assert response.status_code == 202
+    assert client.post('/admin/profiling/sample', data={'seconds': 1}, headers=headers).status_code == 409
+    sampler = get_profiler(app).sampler
+    sampler.join()
+    assert sampler.samples > 0
+    with open(sampler.path) as handle:
+        lines = handle.read().splitlines()
+    assert any(line.startswith('MainThread;') for line in lines)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+
+
+def test_strict_loading_rejects_lazy_loads_in_requests(app, client, sample_card):
+    """With STRICT_LOADING a view's lazy load raises; eager loads and scripts still work."""
+    from sqlalchemy.exc import InvalidRequestError
+    from sqlalchemy.orm import selectinload
+    from src.models import Chapter, db
+
+    def lazy_count(chapter_id):
+        return str(len(db.session.get(Chapter, chapter_id, populate_existing=True).cards))
+
+    def eager_count(chapter_id):
+        chapter = db.session.get(Chapter, chapter_id, options=[selectinload(Chapter.cards)],
+                                 populate_existing=True)
+        return str(len(chapter.cards))
+
+    app.add_url_rule('/test/lazy/<int:chapter_id>', 'test_lazy', lazy_count)
+    app.add_url_rule('/test/eager/<int:chapter_id>', 'test_eager', eager_count)
+
+    with pytest.raises(InvalidRequestError, match='Chapter.cards was lazy-loaded'):
+        client.get(f'/test/lazy/{sample_card.chapter_id}')
+    assert client.get(f'/test/eager/{sample_card.chapter_id}').get_data(as_text=True) == '1'
+    assert lazy_count(sample_card.chapter_id) == '1'
+
+
+def test_metrics_are_merged_across_worker_processes(app):
+    """A scrape sums every worker's file and keeps exited workers' counts."""
+    import fcntl
+    import json
+    from src.services.metrics import ANSWERS, ARCHIVE_FILENAME, _current_store
+    from src.services.storage import get_data_folder
+
+    folder = get_data_folder(app, 'metrics')
+    sample = [['wordup_answers_total', [['result', 'correct']], 2.0]]
+    # The exited worker's pid is in use again, as after a container restart
+    for name in (f'worker_{os.getpid()}_dead.json', 'worker_1_live.json'):
+        with open(os.path.join(folder, name), 'w') as handle:
+            json.dump(sample, handle)
+    live_lock = open(os.path.join(folder, 'worker_1_live.alive'), 'w')
+    fcntl.flock(live_lock, fcntl.LOCK_EX)
+
+    try:
+        ANSWERS.inc(result='correct')
+        samples = _current_store().collect()
+        assert samples[('wordup_answers_total', (('result', 'correct'),))] == 5
+        # The exited worker's counts moved into the archive; the live one's stayed
+        assert not os.path.exists(os.path.join(folder, f'worker_{os.getpid()}_dead.json'))
+        assert os.path.exists(os.path.join(folder, 'worker_1_live.json'))
+        assert os.path.exists(os.path.join(folder, ARCHIVE_FILENAME))
+        assert _current_store().collect()[('wordup_answers_total', (('result', 'correct'),))] == 5
+    finally:
+        live_lock.close()
@@ -99,4 +99,40 @@ def test_review_history_creation(app, sample_card):
         assert review.id is not None
         assert review.correct is True
         assert review.direction == "source_to_target"
-        assert review.reviewed_at is not None
\ No newline at end of file
+        assert review.reviewed_at is not None
+
+def test_vocabulary_card_normalized_key(app, sample_chapter):
+    """The duplicate-detection key follows edits of the word pair."""
+    with app.app_context():
+        card = VocabularyCard(
+            source_word="  Große   Stadt ",
+            target_word="Big City",
+            chapter_id=sample_chapter.id
+        )
+        db.session.add(card)
+        db.session.commit()
+        assert card.normalized_key == "grosse stadt\tbig city"
+
+        card.target_word = "Large  City"
+        db.session.commit()
+        assert card.normalized_key == "grosse stadt\tlarge city"
+
+def test_vocabulary_card_record_review_counters(app, sample_chapter):
+    """Answers update SRS data, history and the denormalized counters."""
+    with app.app_context():
+        card = VocabularyCard(source_word="Baum", target_word="Tree", chapter_id=sample_chapter.id)
+        db.session.add(card)
+        db.session.commit()
+        assert card.review_count == 0
+
+        for correct in (True, True, False, False):
+            card.record_review(correct, "source_to_target")
+            db.session.commit()
+
+        assert card.review_count == 4
+        assert card.correct_count == 2
+        assert card.lapse_count == 1  # Only the wrong answer from box 3 is a lapse
+        assert card.last_reviewed_at is not None
+        assert card.get_success_rate() == 50.0
+        assert ReviewHistory.query.filter_by(card_id=card.id).count() == 4
+        assert sample_chapter.get_success_rate() == 50.0
@@ -3,6 +3,8 @@
 import io
 import os
 
+import pytest
+
 from src.models import AppConfig
 from src.services.theming import get_theming_folder
 
@@ -444,6 +446,69 @@ def test_admin_theming_remove_background(client, app):
         assert not os.path.exists(background_path)
 
 
+def test_theming_background_hashed_name_and_conditional_requests(client, app):
+    """Backgrounds get content-hashed names, strong ETags, ranges and proxy offload."""
+    import hashlib
+    image = b'\x89PNG\r\n\x1a\n' + b'\x02' * 64
+
+    for _ in range(2):  # Re-uploading the same image keeps its file
+        client.post('/admin/theming', data={
+            'enable_theming': 'on', 'background_image': (io.BytesIO(image), 'bg.png'), 'action': 'save'
+        }, content_type='multipart/form-data')
+    with app.app_context():
+        filename = AppConfig.get_config().theming_background
+    assert filename == f'background_{hashlib.sha256(image).hexdigest()[:16]}.png'
+    url = f'/theming/background/{filename}'
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data == image
+    assert 'immutable' in response.headers['Cache-Control']
+    etag = response.headers['ETag']
+    assert etag == f'"{hashlib.sha256(image).hexdigest()[:16]}"'
+
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    partial = client.get(url, headers={'Range': 'bytes=0-7'})
+    assert partial.status_code == 206
+    assert partial.data == image[:8]
+
+    app.config['THEMING_OFFLOAD'] = 'x-accel-redirect'
+    response = client.get(url)
+    assert response.headers['X-Accel-Redirect'] == f'/_wordup_theming/{filename}'
+    assert response.data == b''
+
+
+def test_theming_config_is_cached_across_renders(client, app):
+    """Renders reuse the cached config until a change bumps its version."""
+    from sqlalchemy import event
+    from src.models import db
+    from src.services.config_cache import invalidate_config_cache
+
+    client.get('/help')  # Loads and caches the config
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        assert client.get('/help').status_code == 200
+        assert client.get('/theming/background/missing.png').status_code == 404
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    assert statements == []
+
+    # Another worker changes the row and bumps the version file
+    with app.app_context():
+        config = AppConfig.get_config()
+        config.theming_enabled = True
+        config.theming_background = 'background_cached.png'
+        db.session.commit()
+        stale = app.extensions['wordup_app_config']
+        invalidate_config_cache(app)
+        app.extensions['wordup_app_config'] = stale  # This process has not seen the change
+    assert 'background_cached.png' in client.get('/help').get_data(as_text=True)
+
+
 # Recap Mode Tests
 
 def test_session_complete_shows_recap_option_when_wrong_cards(client, app, sample_chapter):
@@ -772,3 +837,696 @@ def test_recap_preserves_direction_random_mode(client, app, sample_chapter):
         recap_dir = sess['learning_session']['cards'][0]['direction']
     assert recap_dir == original_dir
 
+
+
+def test_admin_snapshot_download(client, app, sample_card):
+    """The snapshot endpoint streams a consistent SQLite copy of the database."""
+    import sqlite3
+    import tempfile
+
+    response = client.get('/admin/backup/snapshot')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/vnd.sqlite3'
+    assert response.data.startswith(b'SQLite format 3\x00')
+
+    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as handle:
+        handle.write(response.data)
+        snapshot_path = handle.name
+    try:
+        connection = sqlite3.connect(snapshot_path)
+        words = [row[0] for row in connection.execute('SELECT source_word FROM vocabulary_cards')]
+        connection.close()
+        assert words == ['Hallo']
+    finally:
+        os.unlink(snapshot_path)
+
+
+def test_admin_compact_snapshot_download(client):
+    """The compacted snapshot is produced with VACUUM INTO."""
+    response = client.get('/admin/backup/snapshot?compact=1')
+    assert response.status_code == 200
+    assert response.data.startswith(b'SQLite format 3\x00')
+    assert 'compact' in response.headers['Content-Disposition']
+
+
+# Background job tests
+
+def test_export_all_runs_as_job(client, app, sample_card):
+    """The full export is queued as a job whose artifact is a ZIP download."""
+    import zipfile
+
+    response = client.post('/admin/export/all')
+    assert response.status_code == 302
+    job_url = response.location
+    assert '/admin/jobs/' in job_url
+
+    status = client.get(job_url + '/status').get_json()
+    assert status['status'] == 'succeeded'
+    assert status['result'] == {'chapters': 1}
+    assert status['has_artifact'] is True
+
+    page = client.get(job_url)
+    assert b'Download wordup_full_backup_' in page.data
+
+    download = client.get(job_url + '/download')
+    assert download.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(download.data)) as archive:
+        assert archive.namelist() == ['chapter_Test_German.json']
+
+
+def test_import_data_runs_as_job(client, app):
+    """Uploaded chapter files are imported by a background job."""
+    import json
+    from src.models import Chapter, VocabularyCard, ReviewHistory
+
+    payload = {
+        'chapter': {'name': 'Imported', 'source_language': 'French', 'target_language': 'English'},
+        'cards': [{'source_word': 'chat', 'target_word': 'cat', 'box_level': 3}],
+        'review_history': [{'card_source_word': 'chat', 'card_target_word': 'cat',
+                            'review_date': '2025-01-01T10:00:00', 'correct': True,
+                            'direction': 'source_to_target'}]
+    }
+    response = client.post('/admin/import', data={
+        'file': (io.BytesIO(json.dumps(payload).encode('utf-8')), 'chapter.json')
+    }, content_type='multipart/form-data')
+    assert response.status_code == 302
+
+    status = client.get(response.location + '/status').get_json()
+    assert status['status'] == 'succeeded'
+    assert status['result']['chapters'] == 1
+
+    with app.app_context():
+        chapter = Chapter.query.filter_by(name='Imported').one()
+        card = VocabularyCard.query.filter_by(chapter_id=chapter.id).one()
+        assert card.box_level == 3
+        assert ReviewHistory.query.filter_by(card_id=card.id).count() == 1
+        assert (card.review_count, card.correct_count) == (1, 1)
+
+
+def test_failed_job_reports_error(client, app):
+    """A job that raises is marked failed with its error message."""
+    response = client.post('/admin/import', data={
+        'file': (io.BytesIO(b'{"cards": []}'), 'broken.json')
+    }, content_type='multipart/form-data')
+    status = client.get(response.location + '/status').get_json()
+    assert status['status'] == 'failed'
+    assert 'missing chapter or cards data' in status['error']
+    assert client.get(response.location + '/download').status_code == 404
+    with app.app_context():
+        from src.services.jobs import get_jobs_folder
+        assert os.listdir(get_jobs_folder(app)) == []  # Input removed, nothing half-written left
+
+
+def test_bulk_import_runs_as_job(client, app, sample_chapter):
+    """Bulk import enqueues a job and redirects to its status page."""
+    from src.models import VocabularyCard
+
+    response = client.post(f'/cards/bulk-import/chapter/{sample_chapter.id}', data={
+        'text_data': 'Hund | Dog\nKatze | Cat | Die Katze schläft.\nmalformed line'
+    })
+    assert response.status_code == 302
+    assert '/admin/jobs/' in response.location
+
+    page = client.get(response.location)
+    assert b'Cards imported: <strong>2</strong>' in page.data
+
+    with app.app_context():
+        assert VocabularyCard.query.filter_by(chapter_id=sample_chapter.id).count() == 2
+
+
+def test_bulk_import_skips_duplicates_and_reports(client, app, sample_chapter):
+    """Repeated and already existing word pairs are skipped and reported."""
+    from src.models import VocabularyCard, db
+
+    with app.app_context():
+        db.session.add(VocabularyCard(source_word='Hund', target_word='Dog', chapter_id=sample_chapter.id))
+        db.session.commit()
+
+    text = '\n'.join([
+        '  HUND |  dog ',            # existing card, different case/spacing
+        'Katze | Cat',
+        'katze | cat',               # repeated within the import
+        'Cafe\u0301 | coffee',      # decomposed é
+        'Café | Coffee',             # same pair in NFC
+        'only one field',
+    ])
+    response = client.post(f'/cards/bulk-import/chapter/{sample_chapter.id}', data={'text_data': text})
+    status = client.get(response.location + '/status').get_json()
+    result = status['result']
+
+    assert result['imported'] == 2
+    assert result['duplicate_count'] == 3
+    assert result['malformed_count'] == 1
+    assert {d['reason'] for d in result['duplicates']} == {'already in chapter', 'repeated in import'}
+    assert result['malformed'][0] == {'line': 6, 'text': 'only one field'}
+
+    # Importing the same list again adds nothing
+    response = client.post(f'/cards/bulk-import/chapter/{sample_chapter.id}', data={'text_data': text})
+    result = client.get(response.location + '/status').get_json()['result']
+    assert result['imported'] == 0
+
+    with app.app_context():
+        assert VocabularyCard.query.filter_by(chapter_id=sample_chapter.id).count() == 3
+
+
+def test_bulk_import_accepts_file_upload(client, app, sample_chapter):
+    """Large lists can be uploaded as a text file instead of the textarea."""
+    from src.models import VocabularyCard
+
+    lines = '\n'.join(f'wort{i} | word{i}' for i in range(1200)).encode('utf-8')
+    response = client.post(f'/cards/bulk-import/chapter/{sample_chapter.id}', data={
+        'text_file': (io.BytesIO(b'\xef\xbb\xbf' + lines), 'words.txt')
+    }, content_type='multipart/form-data')
+    result = client.get(response.location + '/status').get_json()['result']
+
+    assert result['imported'] == 1200
+    assert result['malformed_count'] == 0
+    with app.app_context():
+        assert VocabularyCard.query.filter_by(chapter_id=sample_chapter.id).count() == 1200
+        assert VocabularyCard.query.filter_by(normalized_key='wort0\tword0').count() == 1
+
+
+# Card list pagination tests
+
+def _create_cards(app, chapter_id, count, **overrides):
+    from src.models import VocabularyCard, db
+
+    with app.app_context():
+        cards = [VocabularyCard(source_word=f'wort{i:03d}', target_word=f'word{i:03d}',
+                                chapter_id=chapter_id, **overrides) for i in range(count)]
+        db.session.add_all(cards)
+        db.session.commit()
+        return [card.id for card in cards]
+
+
+def _collect_pages(client, chapter_id, **params):
+    """Follow next_cursor links of the JSON page endpoint."""
+    seen, cursor = [], None
+    while True:
+        query = dict(params, format='json', limit=7)
+        if cursor:
+            query['cursor'] = cursor
+        page = client.get(f'/cards/chapter/{chapter_id}/page', query_string=query).get_json()
+        seen.extend(page['cards'])
+        cursor = page['next_cursor']
+        if not cursor:
+            return seen
+
+
+def test_card_list_renders_first_page_only(client, app, sample_chapter):
+    """The list page renders one page and links to the next one."""
+    _create_cards(app, sample_chapter.id, 60)
+    response = client.get(f'/cards/chapter/{sample_chapter.id}')
+    assert response.status_code == 200
+    assert response.data.count(b'class="card-item"') == 50
+    assert b'id="load-more"' in response.data
+
+
+def test_card_page_keyset_pagination_covers_all_cards(client, app, sample_chapter):
+    """Walking the cursor visits every card exactly once, in sort order."""
+    ids = _create_cards(app, sample_chapter.id, 20, box_level=2)
+    _create_cards(app, sample_chapter.id, 5, box_level=1)
+
+    by_id = _collect_pages(client, sample_chapter.id)
+    assert [card['id'] for card in by_id] == sorted(card['id'] for card in by_id)
+    assert len(by_id) == 25
+
+    # Many equal box levels: the id tie-breaker keeps pages stable
+    by_box = _collect_pages(client, sample_chapter.id, sort='box')
+    assert [card['box_level'] for card in by_box] == [1] * 5 + [2] * 20
+    assert len({card['id'] for card in by_box}) == 25
+
+    by_source = _collect_pages(client, sample_chapter.id, sort='source')
+    assert [card['source_word'] for card in by_source] == sorted(card['source_word'] for card in by_source)
+
+    by_next_review = _collect_pages(client, sample_chapter.id, sort='next_review')
+    assert len({card['id'] for card in by_next_review}) == 25
+    assert set(ids) <= {card['id'] for card in by_next_review}
+
+
+def test_card_page_filters(client, app, sample_chapter):
+    """Box, due and context filters are applied on the server."""
+    from datetime import datetime, timedelta, timezone
+
+    future = datetime.now(timezone.utc) + timedelta(days=3)
+    _create_cards(app, sample_chapter.id, 3, box_level=3, next_review=future)
+    _create_cards(app, sample_chapter.id, 4, box_level=1, context_hint='hint', example_sentence='Satz.')
+
+    assert len(_collect_pages(client, sample_chapter.id, box=3)) == 3
+    assert len(_collect_pages(client, sample_chapter.id, due='not_due')) == 3
+    assert len(_collect_pages(client, sample_chapter.id, due='due')) == 4
+    assert len(_collect_pages(client, sample_chapter.id, context='1')) == 4
+
+    response = client.get(f'/cards/chapter/{sample_chapter.id}?box=5')
+    assert b'No matching cards' in response.data
+
+
+def test_card_page_html_fragment_and_invalid_cursor(client, app, sample_chapter):
+    """The default page format is an HTML fragment; bad cursors are rejected."""
+    _create_cards(app, sample_chapter.id, 3)
+    page = client.get(f'/cards/chapter/{sample_chapter.id}/page').get_json()
+    assert page['count'] == 3
+    assert page['next_cursor'] is None
+    assert page['html'].count('class="card-item"') == 3
+
+    response = client.get(f'/cards/chapter/{sample_chapter.id}/page?cursor=not-a-cursor')
+    assert response.status_code == 400
+
+
+def test_card_rows_match_cards_without_entering_the_session(client, app, sample_card):
+    """Listed cards serialize like the model and are not tracked by the session."""
+    from src.models import VocabularyCard, db
+    from src.services.card_listing import fetch_card_page
+
+    db.session.expunge_all()
+    (row,), _ = fetch_card_page(sample_card.chapter_id, {})
+    assert len(db.session.identity_map) == 0
+    assert not hasattr(row, '__dict__')
+    with pytest.raises(AttributeError):
+        row.review_direction = 'random'
+
+    card = db.session.get(VocabularyCard, sample_card.id)
+    assert row.to_dict() == card.to_dict()
+    assert (row.is_due(), row.get_success_rate()) == (card.is_due(), card.get_success_rate())
+
+    page = client.get(f'/cards/chapter/{sample_card.chapter_id}/page?format=json').get_json()
+    assert page['cards'] == [card.to_dict()]
+
+
+def test_search_matches_prefixes_across_chapters(client, app, sample_chapter):
+    """Search ranks word matches above example matches and spans chapters."""
+    from src.models import Chapter, VocabularyCard, db
+
+    with app.app_context():
+        other = Chapter(name='Spanish', source_language='Spanish', target_language='English')
+        db.session.add(other)
+        db.session.flush()
+        db.session.add_all([
+            VocabularyCard(source_word='Haustür', target_word='Front door', chapter_id=sample_chapter.id),
+            VocabularyCard(source_word='gehen', target_word='to go',
+                           example_sentence='Ich gehe nach Hause', chapter_id=sample_chapter.id),
+            VocabularyCard(source_word='café', target_word='coffee', chapter_id=other.id),
+        ])
+        db.session.commit()
+        other_id = other.id
+
+    results = client.get('/cards/search?q=hau&format=json').get_json()['results']
+    assert [r['source_word'] for r in results] == ['Haustür', 'gehen']
+    assert results[0]['chapter_name'] == sample_chapter.name
+
+    # Diacritics are folded; chapter scoping filters the ranked matches
+    results = client.get(f'/cards/search?q=cafe&chapter_id={other_id}&format=json').get_json()['results']
+    assert [r['source_word'] for r in results] == ['café']
+    results = client.get(f'/cards/search?q=cafe&chapter_id={sample_chapter.id}&format=json').get_json()
+    assert results['results'] == []
+
+    response = client.get('/cards/search?q=haus')
+    assert response.status_code == 200
+    assert 'Haustür' in response.get_data(as_text=True)
+
+
+def test_search_index_follows_edits_and_deletes(client, app, sample_chapter):
+    """Triggers keep the index in sync with card edits and deletes."""
+    from src.models import VocabularyCard, db
+
+    with app.app_context():
+        card = VocabularyCard(source_word='Hallo', target_word='Hello', chapter_id=sample_chapter.id)
+        db.session.add(card)
+        db.session.commit()
+        card_id = card.id
+
+    client.post(f'/cards/{card_id}/edit', data={
+        'source_word': 'Katze', 'target_word': 'Cat',
+        'example_sentence': '', 'context_hint': ''
+    })
+    assert client.get('/cards/search?q=katz&format=json').get_json()['results'][0]['id'] == card_id
+    assert client.get('/cards/search?q=hallo&format=json').get_json()['results'] == []
+
+    client.post(f'/cards/{card_id}/delete')
+    assert client.get('/cards/search?q=katz&format=json').get_json()['results'] == []
+
+    # Punctuation-only input does not reach FTS5 as query syntax
+    assert client.get('/cards/search?q=%22*%28&format=json').get_json()['results'] == []
+
+
+def test_answers_update_review_counters(client, app, sample_card):
+    """Word-mode answers maintain the counters shown on the card page."""
+    from src.models import VocabularyCard, db
+
+    client.post(f'/learn/chapter/{sample_card.chapter_id}/session', data={
+        'context_mode': 'word', 'practice_mode': 'all_cards',
+        'direction': 'source_to_target', 'limit': 10
+    })
+    client.post('/learn/api/answer', json={'card_id': sample_card.id, 'correct': True,
+                                           'direction': 'source_to_target'})
+
+    with app.app_context():
+        card = db.session.get(VocabularyCard, sample_card.id)
+        assert (card.review_count, card.correct_count, card.lapse_count) == (1, 1, 0)
+
+    response = client.get(f'/cards/{sample_card.id}')
+    assert 'Success Rate' in response.get_data(as_text=True)
+
+    client.post(f'/chapters/{sample_card.chapter_id}/reset-stats')
+    with app.app_context():
+        card = db.session.get(VocabularyCard, sample_card.id)
+        assert (card.review_count, card.correct_count, card.last_reviewed_at) == (0, 0, None)
+
+
+def test_near_duplicate_report_job(client, app, sample_chapter):
+    """The admin report groups cards differing in accents, articles or typos."""
+    from src.models import VocabularyCard, db
+
+    with app.app_context():
+        db.session.add_all([
+            VocabularyCard(source_word='der Bahnhof', target_word='train station', chapter_id=sample_chapter.id),
+            VocabularyCard(source_word='Bahnhoff', target_word='train station', chapter_id=sample_chapter.id),
+            VocabularyCard(source_word='Café', target_word='cafe', chapter_id=sample_chapter.id),
+            VocabularyCard(source_word='Cafe', target_word='café', chapter_id=sample_chapter.id),
+            VocabularyCard(source_word='Fenster', target_word='window', chapter_id=sample_chapter.id),
+        ])
+        db.session.commit()
+
+    response = client.post('/admin/near-duplicates', data={'chapter_id': sample_chapter.id})
+    assert response.status_code == 302
+    status = client.get(response.location + '/status').get_json()
+    assert status['status'] == 'succeeded'
+    result = status['result']
+    assert result['cards'] == 5
+    assert result['group_count'] == 2
+    groups = sorted(sorted(card['source_word'] for card in group['cards']) for group in result['groups'])
+    assert groups == [['Bahnhoff', 'der Bahnhof'], ['Cafe', 'Café']]
+
+    page = client.get(response.location)
+    assert 'Bahnhoff' in page.get_data(as_text=True)
+
+
+def test_bulk_import_flags_near_duplicates(client, app, sample_chapter):
+    """Near-duplicates are imported but listed when the check is enabled."""
+    from src.models import VocabularyCard, db
+
+    with app.app_context():
+        db.session.add(VocabularyCard(source_word='die Katze', target_word='the cat', chapter_id=sample_chapter.id))
+        db.session.commit()
+
+    response = client.post(f'/cards/bulk-import/chapter/{sample_chapter.id}', data={
+        'text_data': 'Katze | cat\nHund | dog\nHunde | dog',
+        'check_near_duplicates': '1'
+    })
+    result = client.get(response.location + '/status').get_json()['result']
+    assert result['imported'] == 3
+    assert result['near_duplicate_count'] == 2
+    flagged = {entry['source_word']: entry['similar_to'][0] for entry in result['near_duplicates']}
+    assert flagged['Katze']['source_word'] == 'die Katze'
+    assert flagged['Hunde']['line'] == 2
+
+    # Without the option nothing is checked
+    response = client.post(f'/cards/bulk-import/chapter/{sample_chapter.id}', data={'text_data': 'Katz | cat'})
+    result = client.get(response.location + '/status').get_json()['result']
+    assert result['near_duplicate_count'] == 0
+
+
+def test_import_data_reports_near_duplicates(client, app):
+    """JSON imports can report near-duplicates inside the imported chapter and with existing cards."""
+    import json
+    from src.models import Chapter, VocabularyCard, db
+
+    with app.app_context():
+        for name, source_language in (('Castles', 'French'), ('Burgen', 'German')):
+            chapter = Chapter(name=name, source_language=source_language, target_language='English')
+            db.session.add(chapter)
+            db.session.flush()
+            db.session.add(VocabularyCard(chapter_id=chapter.id, source_word='Château', target_word='castle'))
+        db.session.commit()
+
+    payload = {
+        'chapter': {'name': 'Typos', 'source_language': 'French', 'target_language': 'English'},
+        'cards': [{'source_word': 'le château', 'target_word': 'castle'},
+                  {'source_word': 'chateau', 'target_word': 'castle'},
+                  {'source_word': 'pomme', 'target_word': 'apple'}]
+    }
+    response = client.post('/admin/import', data={
+        'file': (io.BytesIO(json.dumps(payload).encode('utf-8')), 'chapter.json'),
+        'check_near_duplicates': '1'
+    }, content_type='multipart/form-data')
+    result = client.get(response.location + '/status').get_json()['result']
+    assert result['near_duplicates']['group_count'] == 1
+    group = result['near_duplicates']['groups'][0]['cards']
+    # The German chapter's card is not compared
+    assert {(card['source_word'], card['chapter_name']) for card in group} == {
+        ('le château', 'Typos'), ('chateau', 'Typos'), ('Château', 'Castles')
+    }
+
+
+def test_answer_returns_503_when_write_queue_is_full(client, app, sample_card):
+    """Answers are written by the writer thread; a full queue answers 503."""
+    import threading
+    from src.models import VocabularyCard, db
+    from src.services.writer import get_write_queue
+
+    app.config.update(WRITE_QUEUE_ENABLED=True, WRITE_QUEUE_SIZE=1, WRITE_QUEUE_TIMEOUT=0.2)
+    write_queue = get_write_queue(app)
+    started, gate = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        gate.wait(10)
+
+    holder = threading.Thread(target=write_queue.submit, args=(hold,))
+    holder.start()
+    started.wait(10)
+    filler = threading.Thread(target=write_queue.submit, args=(lambda: None,))
+    filler.start()
+
+    client.post(f'/learn/chapter/{sample_card.chapter_id}/session', data={
+        'context_mode': 'word', 'practice_mode': 'all_cards',
+        'direction': 'source_to_target', 'limit': 10
+    })
+    answer = {'card_id': sample_card.id, 'correct': True, 'direction': 'source_to_target'}
+    response = client.post('/learn/api/answer', json=answer)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert 'error' in response.get_json()
+
+    gate.set()
+    holder.join(10)
+    filler.join(10)
+
+    assert client.post('/learn/api/answer', json=answer).status_code == 200
+    with app.app_context():
+        card = db.session.get(VocabularyCard, sample_card.id)
+        assert card.review_count == 1
+    write_queue.stop()
+
+
+def test_health_and_readiness_endpoints(client, app):
+    """/healthz is static; /readyz reports pending migrations until applied."""
+    from src.models import db
+    from src.services.schema import upgrade_schema
+
+    response = client.get('/healthz')
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'ok'}
+
+    response = client.get('/readyz')
+    assert response.status_code == 503
+    checks = response.get_json()['checks']
+    assert checks['database'] == 'ok'
+    assert checks['data_folder'] == 'ok'
+    assert checks['theming_folder'] == 'ok'
+    assert checks['migrations'].startswith('failed')
+
+    with app.app_context():
+        upgrade_schema(db.engine)
+    # The result is cached for READY_CACHE_SECONDS
+    assert client.get('/readyz').status_code == 503
+
+    app.config['READY_CACHE_SECONDS'] = 0
+    response = client.get('/readyz')
+    assert response.status_code == 200
+    assert response.get_json()['ready'] is True
+
+
+def test_fingerprinted_assets_are_cached_and_compressed(client):
+    """Pages link hashed stylesheets served immutable, gzip-compressed and with ETags."""
+    import gzip
+    import re
+
+    html = client.get('/help').get_data(as_text=True)
+    assert '<style>' not in html
+    paths = re.findall(r'href="(/assets/[^"]+\.css)"', html)
+    assert any(re.search(r'/assets/style\.[0-9a-f]{12}\.css$', path) for path in paths)
+    page_css = next(path for path in paths if '/css/help.' in path)
+
+    response = client.get(page_css, headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert b'.help-content' in gzip.decompress(response.data)
+
+    plain = client.get(page_css)
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['ETag'] != response.headers['ETag']
+    assert client.get(page_css, headers={'If-None-Match': plain.headers['ETag']}).status_code == 304
+
+    assert client.get('/assets/css/help.000000000000.css').status_code == 404
+
+
+def test_html_and_json_responses_are_gzip_compressed(client, app):
+    """Large HTML and JSON bodies are gzipped for clients that accept it."""
+    import gzip
+
+    response = client.get('/help', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    html = gzip.decompress(response.data)
+    assert b'Leitner' in html
+    assert int(response.headers['Content-Length']) == len(response.data) < len(html)
+
+    assert 'Content-Encoding' not in client.get('/help').headers
+    # Below the size threshold the body goes out as is
+    small = client.get('/healthz', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+    assert small.get_json() == {'status': 'ok'}
+
+    app.config['COMPRESS_MIN_SIZE'] = 10
+    assert client.get('/healthz', headers={'Accept-Encoding': 'gzip'}).headers['Content-Encoding'] == 'gzip'
+
+
+def test_pages_answer_conditional_requests_until_data_changes(client, app, sample_card):
+    """Dashboard, chapter and card pages return 304 while the data is unchanged."""
+    from src.models import db
+
+    urls = ['/', f'/chapters/{sample_card.chapter_id}', f'/cards/chapter/{sample_card.chapter_id}',
+            f'/cards/{sample_card.id}']
+    client.get('/')  # The first render creates the app config row
+    etags = {}
+    for url in urls:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.headers['ETag'].startswith('W/')
+        assert 'no-cache' in response.headers['Cache-Control']
+        etags[url] = response.headers['ETag']
+        assert client.get(url, headers={'If-None-Match': etags[url]}).status_code == 304
+
+    with app.app_context():
+        sample_card.example_sentence = 'Hallo!'
+        db.session.commit()
+
+    for url in urls:
+        response = client.get(url, headers={'If-None-Match': etags[url]})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etags[url]
+
+    # A page showing a flashed message is never answered from cache
+    etag = client.get('/').headers['ETag']
+    with client.session_transaction() as flask_session:
+        flask_session['_flashes'] = [('success', 'Saved')]
+    response = client.get('/', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+
+
+def test_metrics_endpoint_reports_requests_answers_and_sessions(client, sample_card):
+    """/metrics exposes request latency, answers, sessions, commits and cache lookups."""
+    client.post(f'/learn/chapter/{sample_card.chapter_id}/session', data={
+        'context_mode': 'word', 'practice_mode': 'all_cards',
+        'direction': 'source_to_target', 'limit': 10
+    })
+    client.post('/learn/api/answer', json={'card_id': sample_card.id, 'correct': True,
+                                           'direction': 'source_to_target'})
+    client.get('/')
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert '# TYPE wordup_request_duration_seconds histogram' in text
+    assert 'wordup_request_duration_seconds_count{endpoint="main.dashboard",method="GET"} 1' in text
+    assert 'wordup_request_duration_seconds_bucket{endpoint="main.dashboard",method="GET",le="+Inf"} 1' in text
+    assert 'wordup_answers_total{result="correct"} 1' in text
+    assert 'wordup_learning_sessions_total{kind="regular"} 1' in text
+    assert 'wordup_db_commit_seconds_count' in text
+    assert 'wordup_cache_requests_total{cache="app_config",result="miss"}' in text
+
+
+def test_metrics_endpoint_requires_its_token(client, app):
+    """/metrics needs the bearer token when one is set and is off without METRICS_ENABLED."""
+    app.config['METRICS_TOKEN'] = 'scrape-secret'
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
+
+    app.config['METRICS_ENABLED'] = False
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'}).status_code == 404
+
+
+@pytest.mark.statement_budget(8)
+def test_chapter_requests_stay_within_statement_budget(client, app, sample_chapter):
+    """Pages and answers of a chapter run a fixed number of queries, however many cards it has."""
+    from src.models import ReviewHistory, db
+
+    card_ids = _create_cards(app, sample_chapter.id, 30)
+    with app.app_context():
+        db.session.add_all(ReviewHistory(card_id=card_id, correct=True, direction='source_to_target')
+                           for card_id in card_ids for _ in range(2))
+        db.session.commit()
+
+    assert client.get(f'/chapters/{sample_chapter.id}').status_code == 200
+    assert client.get(f'/cards/chapter/{sample_chapter.id}').status_code == 200
+    assert client.get(f'/cards/chapter/{sample_chapter.id}/page', query_string={'format': 'json'}).status_code == 200
+    assert client.get(f'/admin/export/chapter/{sample_chapter.id}').status_code == 200
+    assert client.get(f'/learn/chapter/{sample_chapter.id}').status_code == 200
+    response = client.post(f'/learn/chapter/{sample_chapter.id}/session', data={
+        'context_mode': 'word', 'practice_mode': 'due_only', 'direction': 'source_to_target', 'limit': 20
+    })
+    assert response.status_code == 302
+    assert client.get('/learn/review').status_code == 200
+    response = client.post('/learn/api/answer', json={
+        'card_id': card_ids[0], 'correct': True, 'direction': 'source_to_target'
+    })
+    assert response.status_code == 200
+
+
+@pytest.mark.statement_budget(10)
+@pytest.mark.parametrize('write_queue', [False, True])
+def test_chapter_reset_and_delete_are_set_based(client, app, sample_chapter, write_queue):
+    """Reset and delete touch only their chapter, in chunks, without loading its cards."""
+    from src.models import Chapter, ReviewHistory, VocabularyCard, db
+    from src.services.chapter_maintenance import delete_chapter_and_cards, reset_chapter_progress
+    from src.services.writer import get_write_queue
+
+    app.config['WRITE_QUEUE_ENABLED'] = write_queue
+    with app.app_context():
+        chapters = [Chapter(name=name, source_language='German', target_language='English')
+                    for name in ('Other', 'Small')]
+        db.session.add_all(chapters)
+        db.session.commit()
+        other_id, small_id = (chapter.id for chapter in chapters)
+    card_ids = _create_cards(app, sample_chapter.id, 25, box_level=4, review_count=2, correct_count=2)
+    other_ids = _create_cards(app, other_id, 25, box_level=3)
+    small_ids = _create_cards(app, small_id, 2)
+    with app.app_context():
+        db.session.add_all(ReviewHistory(card_id=card_id, correct=True, direction='source_to_target')
+                           for card_id in card_ids + other_ids + small_ids for _ in range(2))
+        db.session.commit()
+
+    assert client.post(f'/chapters/{sample_chapter.id}/reset-stats').status_code == 302
+    assert client.post(f'/chapters/{small_id}/delete').status_code == 302
+    with app.app_context():
+        assert {(card.box_level, card.review_count, card.correct_count) for card in
+                VocabularyCard.query.filter_by(chapter_id=sample_chapter.id)} == {(1, 0, 0)}
+        assert ReviewHistory.query.filter(ReviewHistory.card_id.in_(card_ids + small_ids)).count() == 0
+        assert Chapter.query.filter_by(id=small_id).count() == 0
+        assert VocabularyCard.query.filter_by(chapter_id=other_id, box_level=3).count() == 25
+
+        # 25 cards in chunks of 10
+        assert reset_chapter_progress(sample_chapter.id, chunk_size=10) == 3
+        assert delete_chapter_and_cards(other_id, chunk_size=10) == 3
+        assert Chapter.query.filter_by(id=other_id).count() == 0
+        assert VocabularyCard.query.count() == 25
+        assert ReviewHistory.query.count() == 0
+
+    if write_queue:
+        get_write_queue(app).stop()